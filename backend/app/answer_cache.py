@@ -0,0 +1,157 @@
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 시맨틱 답변 캐시 설정
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", "512"))
+# 실행 중 색인(CLI ingest 등)으로 코퍼스가 바뀌었는지 확인하는 주기(초). 0이면 확인하지 않음
+ANSWER_CACHE_CORPUS_CHECK_INTERVAL = float(os.environ.get("ANSWER_CACHE_CORPUS_CHECK_INTERVAL", "30"))
+
+def normalize_profile(user_profile):
+    """캐시 키용 사용자 프로필 정규화 (공백 정리, '정보 없음'은 빈 값으로)"""
+    if not user_profile or user_profile == "정보 없음":
+        return ""
+    return " ".join(str(user_profile).split())
+
+def history_fingerprint(chat_history):
+    """캐시 키용 대화 이력 지문. 이력이 없으면 빈 문자열
+
+    같은 질문이라도 앞선 대화에 따라 답변이 달라지므로 이력이 다르면 다른 버킷이 된다.
+    """
+    if not chat_history:
+        return ""
+    if isinstance(chat_history, str):
+        text = chat_history
+    else:
+        text = "\n".join(f"{getattr(m, 'type', '')}:{getattr(m, 'content', m)}" for m in chat_history)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class SemanticAnswerCache:
+    """QA 답변 시맨틱 캐시
+
+    키는 (검색된 문서 id 목록, 정규화된 프로필, 대화 이력 지문)으로 버킷을 나누고,
+    같은 버킷 안에서 검색 쿼리 임베딩의 코사인 유사도가 임계값 이상이면 적중으로 본다.
+    임베딩이 None인 항목(정책명 일치로 임베딩 없이 검색한 경우)은 문서 id 목록만으로 적중을 판단한다.
+    TTL 만료와 최대 항목 수(LRU) 기준으로 제거하며, 코퍼스 버전이 바뀌면 전부 비운다.
+    """
+
+    def __init__(self, similarity_threshold=ANSWER_CACHE_THRESHOLD, ttl_sec=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.similarity_threshold = similarity_threshold
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.corpus_version = None
+        self._entries = OrderedDict()  # entry_id -> entry (LRU 순서)
+        self._buckets = {}             # bucket_key -> set(entry_id)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _bucket_key(doc_ids, user_profile, history):
+        return (tuple(doc_ids), normalize_profile(user_profile), history or "")
+
+    @staticmethod
+    def _normalize(embedding):
+        if embedding is None:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets.get(entry["bucket"])
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[entry["bucket"]]
+
+    def get(self, query_embedding, doc_ids, user_profile, history=""):
+        """적중 시 (answer, remaining_docs), 아니면 None. history는 history_fingerprint() 값"""
+        bucket_key = self._bucket_key(doc_ids, user_profile, history)
+        query = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id in list(self._buckets.get(bucket_key, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_sec:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if (query is None) != (entry["embedding"] is None):
+                    continue
+                score = 1.0 if query is None else float(np.dot(query, entry["embedding"]))
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None or best_score < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            logger.info(f"[AnswerCache] 적중 (유사도={best_score:.4f})")
+            return entry["answer"], list(entry["remaining_docs"])
+
+    def put(self, query_embedding, doc_ids, user_profile, history, answer, remaining_docs):
+        bucket_key = self._bucket_key(doc_ids, user_profile, history)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "bucket": bucket_key,
+                "embedding": self._normalize(query_embedding),
+                "answer": answer,
+                "remaining_docs": list(remaining_docs),
+                "created_at": time.time(),
+            }
+            self._buckets.setdefault(bucket_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self):
+        """캐시 전체 비우기"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.invalidations += 1
+
+    def set_corpus_version(self, version):
+        """벡터스토어 내용 버전(지문)을 설정. 이전과 다르면 캐시를 비운다."""
+        if version != self.corpus_version:
+            if self.corpus_version is not None:
+                logger.info("[AnswerCache] 코퍼스 변경 감지 -> 캐시 무효화")
+            self.invalidate()
+            self.corpus_version = version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+# 프로세스 전역 답변 캐시
+answer_cache = SemanticAnswerCache()
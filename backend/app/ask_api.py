@@ -1,26 +1,203 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
 import openai
+import httpx
 import os
+import time
+import random
+import asyncio
+import logging
+import threading
 
-router = APIRouter()
-
-class AskRequest(BaseModel):
-    prompt: str
-
-def run_llm(prompt: str) -> str:
-    client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content
-
-@router.post("/ask")
-async def ask_gpt(request: AskRequest):
-    client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[{"role": "user", "content": request.prompt}]
-    )
-    return {"response": response.choices[0].message.content} 
\ No newline at end of file
+from .metrics import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_ERRORS, record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+# 단계별 타임아웃 (초) - 환경변수로 조정 가능
+LLM_TIMEOUTS = {
+    "default": float(os.environ.get("LLM_TIMEOUT", "30")),
+    "routing": float(os.environ.get("LLM_TIMEOUT_ROUTING", "10")),
+    "analysis": float(os.environ.get("LLM_TIMEOUT_ANALYSIS", "15")),
+    "triage": float(os.environ.get("LLM_TIMEOUT_TRIAGE", "15")),
+    "qa": float(os.environ.get("LLM_TIMEOUT_QA", "60")),
+    "fallback": float(os.environ.get("LLM_TIMEOUT_FALLBACK", "60")),
+}
+# 429/5xx/연결 오류 재시도 정책
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "8"))
+# 커넥션 풀 설정
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "30"))
+
+LLM_MODEL = "gpt-4o"
+
+def _is_retryable(error: Exception) -> bool:
+    """재시도 대상 오류인지 판단 (429, 5xx, 타임아웃, 연결 오류)"""
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+class LLMClientManager:
+    """프로세스 전체에서 공유하는 OpenAI 클라이언트 관리자
+
+    - 동기/비동기 클라이언트를 한 번만 만들고 커넥션 풀(keep-alive)을 재사용
+    - 단계(stage)별 타임아웃 적용
+    - 429/5xx 오류는 지터가 들어간 지수 백오프로 제한된 횟수만큼 재시도
+    """
+
+    def __init__(self, model=LLM_MODEL, timeouts=None, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX):
+        self.model = model
+        self.timeouts = dict(LLM_TIMEOUTS if timeouts is None else timeouts)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        )
+
+    def get_client(self) -> openai.OpenAI:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # 재시도는 이 클래스에서 직접 처리하므로 SDK 재시도는 끔
+                    self._client = openai.OpenAI(
+                        api_key=os.environ["OPENAI_API_KEY"],
+                        max_retries=0,
+                        http_client=openai.DefaultHttpxClient(limits=self._limits()),
+                    )
+        return self._client
+
+    def get_async_client(self) -> openai.AsyncOpenAI:
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    self._async_client = openai.AsyncOpenAI(
+                        api_key=os.environ["OPENAI_API_KEY"],
+                        max_retries=0,
+                        http_client=openai.DefaultAsyncHttpxClient(limits=self._limits()),
+                    )
+        return self._async_client
+
+    def timeout_for(self, stage: str) -> float:
+        return self.timeouts.get(stage, self.timeouts["default"])
+
+    def backoff_delay(self, attempt: int) -> float:
+        """full jitter 백오프: 0 ~ min(max, base * 2^attempt) 사이 임의 값"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _completion_kwargs(self, prompt: str, stage: str, json_mode: bool) -> dict:
+        kwargs = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "timeout": self.timeout_for(stage),
+        }
+        if json_mode:
+            # JSON 모드: 항상 파싱 가능한 JSON 객체를 반환 (프롬프트에 "JSON" 언급 필요)
+            kwargs["response_format"] = {"type": "json_object"}
+        return kwargs
+
+    def complete(self, prompt: str, stage: str = "default", json_mode: bool = False) -> str:
+        kwargs = self._completion_kwargs(prompt, stage, json_mode)
+        for attempt in range(self.max_retries + 1):
+            try:
+                start = time.perf_counter()
+                response = self.get_client().chat.completions.create(**kwargs)
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, stage=stage)
+                record_llm_usage(stage, response.usage)
+                return response.choices[0].message.content
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    LLM_ERRORS.inc(stage=stage)
+                    raise
+                LLM_RETRIES.inc(stage=stage)
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"[LLM] {stage} 호출 실패 ({type(e).__name__}), {delay:.2f}s 후 재시도 ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    async def acomplete(self, prompt: str, stage: str = "default", json_mode: bool = False) -> str:
+        kwargs = self._completion_kwargs(prompt, stage, json_mode)
+        for attempt in range(self.max_retries + 1):
+            try:
+                start = time.perf_counter()
+                response = await self.get_async_client().chat.completions.create(**kwargs)
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, stage=stage)
+                record_llm_usage(stage, response.usage)
+                return response.choices[0].message.content
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    LLM_ERRORS.inc(stage=stage)
+                    raise
+                LLM_RETRIES.inc(stage=stage)
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"[LLM] {stage} 호출 실패 ({type(e).__name__}), {delay:.2f}s 후 재시도 ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def astream(self, prompt: str, stage: str = "default"):
+        """토큰(델타 문자열)을 생성되는 대로 내보내는 스트리밍 호출
+
+        재시도는 스트림을 열기 전(첫 응답 전)에만 수행한다.
+        """
+        kwargs = self._completion_kwargs(prompt, stage, json_mode=False)
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 마지막 청크에 토큰 사용량(usage)을 받기 위해 include_usage 요청
+                stream = await self.get_async_client().chat.completions.create(
+                    stream=True, stream_options={"include_usage": True}, **kwargs
+                )
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    LLM_ERRORS.inc(stage=stage)
+                    raise
+                LLM_RETRIES.inc(stage=stage)
+                delay = self.backoff_delay(attempt)
+                logger.warning(f"[LLM] {stage} 스트림 시작 실패 ({type(e).__name__}), {delay:.2f}s 후 재시도 ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                record_llm_usage(stage, chunk.usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+    async def aclose(self):
+        """커넥션 풀 정리 (서버 종료 시)"""
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+# 프로세스 전역 클라이언트 관리자
+client_manager = LLMClientManager()
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """공유 AsyncOpenAI 클라이언트 반환 (최초 호출 시 생성)"""
+    return client_manager.get_async_client()
+
+def run_llm(prompt: str, json_mode: bool = False, stage: str = "default") -> str:
+    return client_manager.complete(prompt, stage=stage, json_mode=json_mode)
+
+async def run_llm_async(prompt: str, json_mode: bool = False, stage: str = "default") -> str:
+    """run_llm의 비동기 버전 (이벤트 루프를 막지 않음)"""
+    return await client_manager.acomplete(prompt, stage=stage, json_mode=json_mode)
+
+async def stream_llm_async(prompt: str, stage: str = "default"):
+    """LLM 응답을 토큰 단위로 스트리밍 (async generator)"""
+    async for delta in client_manager.astream(prompt, stage=stage):
+        yield delta
@@ -0,0 +1,87 @@
+"""
+검색 점수 기반 컨텍스트 선택
+
+리트리버 결과를 (Document, score) 쌍으로 끝까지 전달하고, 프롬프트에 넣을 정책 수를
+점수 분포로 정한다.
+1. 같은 정책 id의 청크는 점수가 가장 높은 것 하나만 남김
+2. 상위 CONTEXT_MAX_DOCS개 안에서 가장 큰 점수 하락(gap)이 평균 하락의 CONTEXT_GAP_RATIO배 이상이면
+   그 지점에서 자름 (질문이 명확해 1~2개 정책만 두드러지면 프롬프트가 짧아짐)
+3. 잘린 나머지는 remaining_docs(참고 목록)로 점수 순서대로 사용
+
+점수는 벡터 유사도 눈금이다. 하이브리드 리트리버는 BM25 점수를 같은 눈금으로 옮겨(최고 BM25 = 최고 벡터 점수)
+벡터 점수와 큰 쪽을 붙여 주므로, 강한 어휘 일치도 벡터 결과와 함께 상위에 올 수 있다.
+정렬은 안정 정렬이라 같은 점수끼리는 리트리버(RRF) 순서를 유지한다.
+"""
+import os
+
+CONTEXT_MAX_DOCS = int(os.environ.get("CONTEXT_MAX_DOCS", "3"))
+CONTEXT_MIN_DOCS = int(os.environ.get("CONTEXT_MIN_DOCS", "1"))
+CONTEXT_GAP_RATIO = float(os.environ.get("CONTEXT_GAP_RATIO", "2.0"))
+# remaining_docs로 넘길 최대 정책 수
+CONTEXT_MAX_REMAINING = int(os.environ.get("CONTEXT_MAX_REMAINING", "7"))
+
+def retrieve_with_scores(retriever, query):
+    """리트리버 종류에 맞게 (Document, score) 목록을 리트리버 순서(벡터 검색은 점수 내림차순)로 반환
+
+    - search_with_scores가 있는 리트리버(numpy, hybrid)는 그대로 사용 (hybrid는 RRF 순서 + 벡터 눈금 점수)
+    - langchain VectorStoreRetriever(Chroma)는 같은 search_kwargs로 relevance 점수 검색
+    - 그 외에는 점수 없이(None) 리트리버 순서를 유지
+    """
+    if hasattr(retriever, "search_with_scores"):
+        return retriever.search_with_scores(query)
+    vectorstore = getattr(retriever, "vectorstore", None)
+    if vectorstore is not None and getattr(retriever, "search_type", "") == "similarity_score_threshold":
+        return vectorstore.similarity_search_with_relevance_scores(query, **retriever.search_kwargs)
+    return [(doc, None) for doc in retriever.invoke(query)]
+
+def dedupe_by_policy(scored_docs):
+    """정책 id별로 첫 번째(최고 점수) 청크만 남김. id가 없는 청크는 그대로 둠"""
+    seen = set()
+    unique = []
+    for doc, score in scored_docs:
+        policy_id = (doc.metadata or {}).get("id")
+        if policy_id:
+            if policy_id in seen:
+                continue
+            seen.add(policy_id)
+        unique.append((doc, score))
+    return unique
+
+def find_cutoff(scores, max_docs=CONTEXT_MAX_DOCS, min_docs=CONTEXT_MIN_DOCS, gap_ratio=CONTEXT_GAP_RATIO):
+    """점수 목록(내림차순)에서 프롬프트에 넣을 개수 결정
+
+    후보 전체의 인접 점수 차이 평균보다 gap_ratio배 이상 큰 하락이 상위 max_docs 안에 있으면
+    그중 가장 큰 하락 직전까지만 사용한다. 점수가 없거나 후보가 2개 이하이면 max_docs까지 사용.
+    """
+    limit = min(max_docs, len(scores))
+    if limit <= min_docs or len(scores) < 3 or any(score is None for score in scores):
+        return limit
+    gaps = [scores[i] - scores[i + 1] for i in range(len(scores) - 1)]
+    mean_gap = sum(gaps) / len(gaps)
+    if mean_gap <= 0:
+        return limit
+    # 자르는 위치 i: 앞의 i개 사용 (min_docs <= i <= limit, 마지막 위치는 자르지 않는 것과 같음)
+    candidates = range(max(min_docs, 1), limit)
+    if not candidates:
+        return limit
+    cut = max(candidates, key=lambda i: gaps[i - 1])
+    if gaps[cut - 1] >= gap_ratio * mean_gap:
+        return cut
+    return limit
+
+def select_context(scored_docs, max_docs=CONTEXT_MAX_DOCS, max_remaining=CONTEXT_MAX_REMAINING):
+    """(프롬프트용 문서, 참고 목록용 문서) 반환. 둘 다 정책 단위로 중복 제거된 Document 목록"""
+    ranked = dedupe_by_policy(sorted(
+        scored_docs, key=lambda pair: -pair[1] if pair[1] is not None else 0.0
+    ))
+    cut = find_cutoff([score for _, score in ranked], max_docs=max_docs)
+    selected = [doc for doc, _ in ranked[:cut]]
+    remaining = [doc for doc, _ in ranked[cut:cut + max_remaining]]
+    return selected, remaining
+
+def format_scores(scored_docs, limit=10):
+    """로그용 "id:점수" 목록"""
+    return ", ".join(
+        f"{(doc.metadata or {}).get('id', '?')}:{score:.3f}" if score is not None else f"{(doc.metadata or {}).get('id', '?')}:-"
+        for doc, score in scored_docs[:limit]
+    )
@@ -1,21 +1,32 @@
 import os
 import json
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+import hashlib
 from langchain.text_splitter import CharacterTextSplitter
 from langchain.schema import Document
-from .llm_manager import (
-    get_or_create_memory, 
-    extract_user_profile, 
-    create_qa_chain, 
-    get_active_sessions_count
-)
+from .embedding_cache import get_embeddings
+from .policy_fields import parse_policy_text, register_policy
 
 # ChromaDB 텔레메트리 비활성화
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
 
+# 리트리버 백엔드: "chroma" (기본), "numpy" (인메모리 행렬, Chroma 없이 시작)
+# 또는 "snapshot" (python -m app.snapshot build 로 만든 mmap 스냅샷, 없으면 chroma_db에서 한 번 생성)
+RETRIEVER_BACKEND = os.environ.get("RETRIEVER_BACKEND", "chroma").lower()
+# 벡터 검색 결과와 문자 n-gram BM25 결과를 합쳐서 사용 (HYBRID_RETRIEVAL=0 이면 벡터 검색만)
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "1") == "1"
+# 시작 시 데이터 파일과 벡터스토어를 증분 동기화 (변경된 정책만 임베딩, app/ingest.py)
+# chroma_db는 저장소에 포함된 색인이므로 기본은 꺼 두고, 데이터가 바뀌면 python -m app.ingest로 동기화
+INGEST_ON_STARTUP = os.environ.get("INGEST_ON_STARTUP", "0") == "1"
+PERSIST_DIRECTORY = os.environ.get("CHROMA_DIR", os.path.join(os.path.dirname(__file__), '../chroma_db'))
+SCORE_THRESHOLD = 0.75  # 임계값
+TOP_K = 10              # 최대 문서 수
+
 def load_policy_data():
-    """정책 데이터를 로드하고 Document 객체로 변환 (text 필드만 사용)"""
+    """정책 데이터를 로드하고 Document 객체로 변환
+
+    text 필드의 정책명/설명/지원대상/신청방법/문의/관련링크를 여기서 한 번만 파싱해
+    메타데이터(청크에도 그대로 복사됨)와 컨텍스트 블록으로 저장한다.
+    """
     try:
         DATA_PATH = os.path.join(os.path.dirname(__file__), '../data/seoul_youth_policies_with_url_rag.jsonl')
         if not os.path.exists(DATA_PATH):
@@ -27,12 +38,15 @@ def load_policy_data():
                 try:
                     doc_data = json.loads(line.strip())
                     policy_text = doc_data.get('text', '')
+                    policy_fields = parse_policy_text(policy_text)
+                    register_policy(doc_data.get('id', ''), policy_fields)
                     document = Document(
                         page_content=policy_text,
                         metadata={
                             'id': doc_data.get('id', ''),
                             'category': doc_data.get('category', ''),
-                            'source': 'seoul_youth_policies_with_url_rag'
+                            'source': 'seoul_youth_policies_with_url_rag',
+                            **policy_fields
                         }
                     )
                     documents.append(document)
@@ -45,77 +59,167 @@ def load_policy_data():
         print(f"Error loading policy data: {e}")
         return []
 
-def initialize_vectorstore():
-    """벡터스토어 초기화 및 데이터 로드"""
+def split_policy_documents(documents):
+    """정책 문서를 검색용 청크로 분할"""
+    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200, separator="\n")
+    split_docs = text_splitter.split_documents(documents)
+    print(f"Split documents into {len(split_docs)} chunks")
+    return split_docs
+
+def initialize_numpy_index():
+    """정책 데이터 + 임베딩 캐시로 NumPy 인덱스 생성 (Chroma 클라이언트 불필요)"""
+    from .numpy_index import NumpyVectorIndex
     try:
-        embeddings = OpenAIEmbeddings()
-        persist_directory = os.path.join(os.path.dirname(__file__), '../chroma_db')
-        
-        # 기존 벡터스토어가 있는지 확인
-        if os.path.exists(persist_directory):
-            print("Loading existing vectorstore...")
-            try:
-                vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
-                collection = vectorstore._collection
-                if collection.count() > 0:
-                    print(f"Found {collection.count()} existing documents in vectorstore")
-                    return vectorstore
-            except Exception as e:
-                print(f"Error loading existing vectorstore: {e}")
-                print("Creating new vectorstore...")
-        
-        # 새로운 벡터스토어 생성
-        print("Creating new vectorstore...")
         documents = load_policy_data()
+        split_docs = split_policy_documents(documents)
+        index = NumpyVectorIndex.from_documents(split_docs, get_embeddings())
+        print(f"NumPy index created with {len(index)} document chunks")
+        return index
+    except Exception as e:
+        print(f"Error initializing NumPy index: {e}")
+        return None
+
+def initialize_vectorstore():
+    """벡터스토어를 열고 데이터 파일과 증분 동기화 (새로 추가/변경된 정책만 임베딩)"""
+    from langchain_community.vectorstores import Chroma
+    try:
+        # 임베딩은 디스크 캐시를 거침 (같은 쿼리/문서는 다시 요청하지 않음)
+        embeddings = get_embeddings()
+        vectorstore = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=embeddings)
         
-        if not documents:
-            print("No documents loaded. Creating empty vectorstore.")
-            vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
-        else:
-            text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200, separator="\n")
-            split_docs = text_splitter.split_documents(documents)
-            print(f"Split documents into {len(split_docs)} chunks")
-            
+        if INGEST_ON_STARTUP:
+            from .ingest import sync_vectorstore
             try:
-                vectorstore = Chroma.from_documents(
-                    documents=split_docs,
-                    embedding=embeddings,
-                    persist_directory=persist_directory
-                )
-                vectorstore.persist()
-                print(f"Vectorstore created with {len(split_docs)} document chunks")
+                sync_vectorstore(vectorstore)
             except Exception as e:
-                print(f"Error creating vectorstore with embeddings: {e}")
-                print("Creating empty vectorstore without embeddings...")
-                vectorstore = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+                print(f"Error syncing vectorstore: {e}")
+                print("Using existing vectorstore contents...")
         
+        print(f"Vectorstore ready with {vectorstore._collection.count()} document chunks")
         return vectorstore
         
     except Exception as e:
         print(f"Error initializing vectorstore: {e}")
         print("Creating empty vectorstore as fallback...")
         try:
-            persist_directory = os.path.join(os.path.dirname(__file__), '../chroma_db')
-            vectorstore = Chroma(persist_directory=persist_directory, embedding_function=None)
+            vectorstore = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=None)
             return vectorstore
         except Exception as fallback_error:
             print(f"Fallback vectorstore creation failed: {fallback_error}")
             return None
 
-def get_vectorstore_and_retriever():
-    """벡터스토어와 리트리버를 초기화하고 반환"""
+def get_index_fingerprint(vectorstore):
+    """벡터스토어 내용(문서 id + 본문)의 지문 - 내용이 바뀌면 값이 달라짐"""
+    if vectorstore is None:
+        return None
+    if hasattr(vectorstore, "fingerprint"):
+        return vectorstore.fingerprint()
+    try:
+        data = vectorstore.get(include=["documents"])
+    except Exception as e:
+        print(f"Error computing index fingerprint: {e}")
+        return None
+    digest = hashlib.sha256()
+    for doc_id, text in sorted(zip(data.get("ids", []), data.get("documents", []))):
+        digest.update(doc_id.encode("utf-8"))
+        digest.update((text or "").encode("utf-8"))
+    return digest.hexdigest()
+
+def get_corpus_change_marker(persist_directory=PERSIST_DIRECTORY):
+    """색인 파일(ingest 매니페스트, chroma sqlite)의 수정 시각 - 값이 바뀌었을 때만 지문을 다시 계산하기 위한 싼 신호"""
+    marker = []
+    for name in ("ingest_manifest.json", "chroma.sqlite3"):
+        try:
+            marker.append(os.path.getmtime(os.path.join(persist_directory, name)))
+        except OSError:
+            marker.append(None)
+    return tuple(marker)
+
+def initialize_snapshot_index():
+    """mmap 스냅샷 로드. 스냅샷이 없거나 임베딩 모델이 다르면 chroma_db에서 새로 생성"""
+    from .snapshot import load_snapshot, build_snapshot
+    try:
+        index = load_snapshot()
+        model_name = getattr(get_embeddings(), "model_name", None)
+        if index is not None and index.embedding_model and model_name and index.embedding_model != model_name:
+            print(f"Snapshot embedding model {index.embedding_model} != {model_name}, rebuilding snapshot...")
+            index = None
+        if index is None:
+            print("Building snapshot from vectorstore...")
+            index = load_snapshot(build_snapshot())
+        print(f"Snapshot {index.snapshot_version} loaded with {len(index)} document chunks (mmap)")
+        return index
+    except Exception as e:
+        print(f"Error loading snapshot index: {e}")
+        return None
+
+def _build_base_retriever():
+    """백엔드 설정에 따른 벡터 리트리버 생성. (vectorstore, retriever) 반환"""
+    if RETRIEVER_BACKEND in ("numpy", "snapshot"):
+        from .numpy_index import NumpyRetriever
+        if RETRIEVER_BACKEND == "snapshot":
+            print("Loading vector index snapshot...")
+            index = initialize_snapshot_index()
+        else:
+            print("Initializing NumPy vector index...")
+            index = initialize_numpy_index()
+        if index is None or len(index) == 0:
+            print("Warning: NumPy index is empty. RAG functionality will be disabled.")
+            return None, None
+        retriever = NumpyRetriever(
+            index=index,
+            embeddings=get_embeddings(),
+            k=TOP_K,
+            score_threshold=SCORE_THRESHOLD
+        )
+        return index, retriever
+
     print("Initializing vectorstore...")
     vectorstore = initialize_vectorstore()
 
     if vectorstore is None:
         print("Warning: Vectorstore initialization failed. RAG functionality will be disabled.")
+        return None, None
+    retriever = vectorstore.as_retriever(
+        search_type="similarity_score_threshold",
+        search_kwargs={
+            "score_threshold": SCORE_THRESHOLD,
+            "k": TOP_K
+        }
+    )
+    return vectorstore, retriever
+
+def build_lexical_index(split_docs=None):
+    """정책 청크에 대한 문자 n-gram BM25 색인 생성 (시작 시 한 번)
+
+    split_docs를 주면(예: 스냅샷의 청크) 데이터 파일을 다시 읽지 않고 그대로 사용
+    """
+    from .lexical_index import CharNgramBM25Index
+    try:
+        if split_docs is None:
+            split_docs = split_policy_documents(load_policy_data())
+        index = CharNgramBM25Index(split_docs)
+        print(f"Lexical index created with {len(index)} chunks, {len(index.vocab)} n-grams")
+        return index
+    except Exception as e:
+        print(f"Error building lexical index: {e}")
+        return None
+
+def get_vectorstore_and_retriever():
+    """벡터스토어와 리트리버를 초기화하고 반환"""
+    vectorstore, retriever = _build_base_retriever()
+    if retriever is None:
         return None, None, False
-    else:
-        retriever = vectorstore.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={
-                "score_threshold": 0.75,  # 임계값
-                "k": 10                   # 최대 문서 수
-            }
-        )
-        return vectorstore, retriever, True
\ No newline at end of file
+
+    if HYBRID_RETRIEVAL:
+        from .lexical_index import HybridRetriever
+        # 인메모리 인덱스(numpy/snapshot)는 같은 청크 목록을 재사용
+        lexical_index = build_lexical_index(getattr(vectorstore, "documents", None))
+        if lexical_index is not None and len(lexical_index) > 0:
+            retriever = HybridRetriever(
+                vector_retriever=retriever,
+                lexical_index=lexical_index,
+                embeddings=get_embeddings(),
+                k=TOP_K
+            )
+    return vectorstore, retriever, True
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# 임베딩 캐시 설정 (서버와 test/rag_tester_flex.py가 같은 파일을 공유)
+EMBEDDING_CACHE_ENABLED = os.environ.get("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_PATH = os.environ.get(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '../cache/embeddings.sqlite3')
+)
+# 0이면 tiktoken 토큰화 없이 문자열 그대로 전송 (오프라인 벤치마크에서 tiktoken 다운로드 방지)
+EMBEDDING_CHECK_CTX_LENGTH = os.environ.get("EMBEDDING_CHECK_CTX_LENGTH", "1") == "1"
+
+def _pack(vector):
+    return array("f", vector).tobytes()
+
+def _unpack(blob):
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+class EmbeddingStore:
+    """(모델, 텍스트) 해시 -> float32 벡터 blob 을 저장하는 SQLite 저장소"""
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk)
+                for key, blob in rows:
+                    found[key] = _unpack(blob)
+        return found
+
+    def put_many(self, items):
+        if not items:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, _pack(vector)) for key, vector in items]
+            )
+            conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+class CachedEmbeddings(Embeddings):
+    """내용 주소 기반(텍스트 + 모델 -> 벡터) 캐시를 거치는 임베딩 래퍼
+
+    캐시에 없는 텍스트만 한 번의 배치 요청으로 원본 임베딩 모델에 보낸다.
+    """
+
+    def __init__(self, underlying, store=None, model_name=None):
+        self.underlying = underlying
+        self.store = store or EmbeddingStore()
+        self.model_name = model_name or getattr(underlying, "model", underlying.__class__.__name__)
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [EmbeddingStore.make_key(self.model_name, text) for text in texts]
+        try:
+            cached = self.store.get_many(list(set(keys)))
+        except sqlite3.Error as e:
+            logger.warning(f"[EmbeddingCache] 조회 실패: {e}")
+            cached = {}
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            cached.update(new_items)
+            try:
+                self.store.put_many(new_items)
+            except sqlite3.Error as e:
+                logger.warning(f"[EmbeddingCache] 저장 실패: {e}")
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text):
+        key = EmbeddingStore.make_key(self.model_name, text)
+        try:
+            cached = self.store.get_many([key])
+        except sqlite3.Error as e:
+            logger.warning(f"[EmbeddingCache] 조회 실패: {e}")
+            cached = {}
+        if key in cached:
+            self.hits += 1
+            return cached[key]
+        self.misses += 1
+        vector = self.underlying.embed_query(text)
+        try:
+            self.store.put_many([(key, vector)])
+        except sqlite3.Error as e:
+            logger.warning(f"[EmbeddingCache] 저장 실패: {e}")
+        return vector
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+_embeddings = None
+
+def get_embeddings():
+    """프로세스 전역 임베딩 객체 반환 (캐시 사용 시 CachedEmbeddings로 감쌈)"""
+    global _embeddings
+    if _embeddings is None:
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(check_embedding_ctx_length=EMBEDDING_CHECK_CTX_LENGTH)
+        _embeddings = CachedEmbeddings(embeddings) if EMBEDDING_CACHE_ENABLED else embeddings
+    return _embeddings
+
+def get_embedding_cache_stats():
+    if isinstance(_embeddings, CachedEmbeddings):
+        return _embeddings.stats()
+    return None
@@ -0,0 +1,206 @@
+import os
+import re
+import math
+import logging
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 로컬 사전 분류기 설정 (확실한 경우만 LLM 라우팅 호출 생략)
+FAST_ROUTER_ENABLED = os.environ.get("FAST_ROUTER_ENABLED", "1") == "1"
+FAST_ROUTER_YES = float(os.environ.get("FAST_ROUTER_YES", "0.95"))
+FAST_ROUTER_NO = float(os.environ.get("FAST_ROUTER_NO", "0.05"))
+
+# 주거 정책 관련 가중 키워드 (양수: 주거 정책 쪽, 음수: 범위 밖)
+POSITIVE_LEXICON = {
+    "전세": 2.0, "월세": 2.0, "임대주택": 2.5, "보증금": 2.0, "이사비": 2.5,
+    "주거": 1.5, "자취": 1.5, "행복주택": 3.0, "안심주택": 3.0, "전세자금": 2.5,
+    "주거급여": 2.5, "임대": 1.5, "청약": 1.5, "신혼부부": 1.0, "주택": 1.0,
+    "집주인": 1.5, "원룸": 1.5, "이사": 1.0, "전세사기": 3.0,
+}
+NEGATIVE_LEXICON = {
+    "종합부동산세": -3.0, "양도세": -3.0, "양도소득세": -3.0, "재산세": -2.5, "세금": -2.0,
+    "시장 전망": -2.5, "집값 전망": -2.5, "전망": -1.5, "시세": -1.5, "투자": -2.0, "주식": -3.0,
+    "중장년": -2.5, "노인": -2.0, "날씨": -3.0, "맛집": -3.0,
+}
+
+# 키워드 바로 뒤에 와도 같은 단어로 보는 조사/어미/복합어 뒷부분
+# ("전세를", "이사해요", "월세지원"은 일치, "전세계", "이사회", "이사장"은 불일치)
+_LEXICON_SUFFIXES = (
+    "은", "는", "이", "가", "을", "를", "에", "의", "도", "로", "으로", "와", "과", "랑", "만", "까지", "부터",
+    "하", "해", "할", "한", "했", "비", "금", "료", "자금", "대출", "지원", "계약", "보증", "신청", "집", "방",
+    "살이", "통장", "문제", "피해", "난", "비용", "정책", "제도",
+)
+
+# 라우팅 프롬프트 예시 외에 학습에 함께 쓰는 라벨 데이터 (키워드가 다른 단어 안에 들어간 어려운 음성 예시 포함)
+EXTRA_EXAMPLES = [
+    ("월세 지원 받고 싶어요", True),
+    ("이사비 지원 있나요", True),
+    ("전세사기 피해 지원 제도 알려줘", True),
+    ("임대주택 신청 방법이 궁금해요", True),
+    ("보증금이 부족해요", True),
+    ("전세 대출 이자 지원 받을 수 있나요", True),
+    ("자취방 월세가 너무 비싸요", True),
+    ("청년 월세 한시 특별지원 신청하고 싶어요", True),
+    ("행복주택 입주 자격이 궁금해요", True),
+    ("독립해서 혼자 살 집을 구하고 있어요", True),
+    ("집주인이 보증금을 안 돌려줘요", True),
+    ("이사하려는데 지원받을 수 있는 게 있나요", True),
+    ("주거급여 신청 방법 알려줘", True),
+    ("청년 전세자금 대출 조건이 뭐예요", True),
+    ("신혼부부 임대주택 추천해줘", True),
+    ("원룸 구하는데 도움 받을 수 있는 정책 있어요", True),
+    ("기숙사 대신 살 곳이 필요해요", True),
+    ("청약 통장 만들어야 하나요", True),
+    ("주식 투자 어떻게 시작해요", False),
+    ("오늘 날씨 어때요", False),
+    ("양도소득세 계산 방법 알려줘", False),
+    ("아파트 매매 시세 전망 알려줘", False),
+    ("은퇴 후 노인 복지 제도 알려줘", False),
+    ("전세계 여행 추천해줘", False),
+    ("전세계 인구가 몇 명이야", False),
+    ("이사회 회의록 작성법 알려줘", False),
+    ("회사 이사님께 보낼 메일 써줘", False),
+    ("이사장 선거 일정 알려줘", False),
+    ("대학생 학자금 대출 받고 싶어요", False),
+    ("청년 취업 지원금 알려줘", False),
+    ("국민취업지원제도 신청 방법", False),
+    ("맛집 추천해줘", False),
+    ("주말에 볼 영화 추천해줘", False),
+    ("중장년 재취업 프로그램 있나요", False),
+    ("부동산 투자 수익률 계산해줘", False),
+    ("종합부동산세 얼마나 나와요", False),
+    ("자격증 시험 일정 알려줘", False),
+    ("청년 창업 지원 사업 알려줘", False),
+]
+
+_EXAMPLE_PATTERN = re.compile(r"^\s*Q:\s*(.+?)\s*→\s*(yes|no)\s*$", re.MULTILINE)
+
+def parse_prompt_examples(prompt_template):
+    """라우팅 프롬프트 안의 'Q: ... → yes/no' 예시를 (질문, 라벨) 목록으로 추출"""
+    return [(q, label == "yes") for q, label in _EXAMPLE_PATTERN.findall(prompt_template)]
+
+def lexicon_term_in(term, normalized, tokens):
+    """키워드가 단어 경계에서 등장하는지 (키워드 뒤가 어절 끝, 조사/어미 또는 다른 키워드일 때만 일치)
+
+    띄어쓰기가 들어간 키워드("시장 전망")는 정규화된 문장에서 그대로 찾는다.
+    """
+    if " " in term:
+        return term in normalized
+    for token in tokens:
+        start = token.find(term)
+        while start != -1:
+            rest = token[start + len(term):]
+            if not rest or rest.startswith(_LEXICON_SUFFIXES) or any(rest.startswith(t) for t in POSITIVE_LEXICON):
+                return True
+            start = token.find(term, start + 1)
+    return False
+
+def _features(text, sizes=(2, 3)):
+    text = unicodedata.normalize("NFKC", text).lower()
+    features = {}
+    for token in re.findall(r"[0-9a-z가-힣]+", text):
+        for n in sizes:
+            for i in range(max(len(token) - n + 1, 1)):
+                gram = token[i:i + n]
+                features[gram] = features.get(gram, 0.0) + 1.0
+    # 길이에 따라 점수가 커지지 않도록 L2 정규화
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+def _sigmoid(x):
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+class FastRouter:
+    """LLM 라우팅 전에 실행되는 마이크로초 단위 사전 분류기
+
+    가중 키워드 점수 + 문자 n-gram 로지스틱 회귀 점수를 합쳐 확률을 구하고,
+    확률이 충분히 높/낮으면서 키워드 근거가 한쪽으로만 있을 때만 yes/no를 직접 결정한다.
+    나머지(애매한 질문)는 None을 돌려 LLM에 맡긴다.
+    """
+
+    def __init__(self, examples, yes_threshold=FAST_ROUTER_YES, no_threshold=FAST_ROUTER_NO,
+                 epochs=200, learning_rate=0.5, l2=1e-3):
+        self.yes_threshold = yes_threshold
+        self.no_threshold = no_threshold
+        self.weights = {}
+        self.bias = 0.0
+        self._train(examples, epochs, learning_rate, l2)
+        self._lock = threading.Lock()
+        self.total = 0
+        self.fast_yes = 0
+        self.fast_no = 0
+        self.deferred = 0
+
+    @classmethod
+    def from_routing_prompt(cls, routing_prompt_template, questions_path=None, **kwargs):
+        examples = parse_prompt_examples(routing_prompt_template) + list(EXTRA_EXAMPLES)
+        # test/questions.txt 의 질문은 모두 서비스 범위 안의 질문
+        if questions_path and os.path.exists(questions_path):
+            with open(questions_path, "r", encoding="utf-8") as f:
+                examples.extend((q.strip(), True) for q in f if q.strip())
+        return cls(examples, **kwargs)
+
+    def _train(self, examples, epochs, learning_rate, l2):
+        data = [(_features(text), 1.0 if label else 0.0) for text, label in examples]
+        for _ in range(epochs):
+            for features, label in data:
+                error = _sigmoid(self._logit(features)) - label
+                for key, value in features.items():
+                    w = self.weights.get(key, 0.0)
+                    self.weights[key] = w - learning_rate * (error * value + l2 * w)
+                self.bias -= learning_rate * error
+        logger.info(f"[FastRouter] {len(data)}개 예시로 학습 완료 (특징 수: {len(self.weights)})")
+
+    def _logit(self, features):
+        return self.bias + sum(self.weights.get(k, 0.0) * v for k, v in features.items())
+
+    @staticmethod
+    def _lexicon_score(text):
+        normalized = unicodedata.normalize("NFKC", text).lower()
+        tokens = re.findall(r"[0-9a-z가-힣]+", normalized)
+        positive = sum(w for term, w in POSITIVE_LEXICON.items() if lexicon_term_in(term, normalized, tokens))
+        negative = sum(w for term, w in NEGATIVE_LEXICON.items() if lexicon_term_in(term, normalized, tokens))
+        return positive, negative
+
+    def score(self, text):
+        """(주거 정책일 확률, n-gram 모델만의 확률, 긍정 키워드 점수, 부정 키워드 점수)"""
+        positive, negative = self._lexicon_score(text)
+        logit = self._logit(_features(text))
+        return _sigmoid(logit + positive + negative), _sigmoid(logit), positive, negative
+
+    def classify(self, text):
+        """True/False (확실한 경우) 또는 None (LLM에 맡김)
+
+        키워드만으로 확률이 올라간 경우를 막기 위해 n-gram 모델 단독 판단도 같은 쪽이어야 한다.
+        """
+        probability, model_probability, positive, negative = self.score(text)
+        if probability >= self.yes_threshold and model_probability >= 0.5 and positive > 0 and negative == 0:
+            decision = True
+        elif probability <= self.no_threshold and model_probability < 0.5 and negative < 0 and positive == 0:
+            decision = False
+        else:
+            decision = None
+        with self._lock:
+            self.total += 1
+            if decision is True:
+                self.fast_yes += 1
+            elif decision is False:
+                self.fast_no += 1
+            else:
+                self.deferred += 1
+        return decision
+
+    def stats(self):
+        handled = self.fast_yes + self.fast_no
+        return {
+            "total": self.total,
+            "fast_yes": self.fast_yes,
+            "fast_no": self.fast_no,
+            "deferred_to_llm": self.deferred,
+            "fast_path_ratio": round(handled / self.total, 4) if self.total else 0.0,
+        }
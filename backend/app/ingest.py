@@ -0,0 +1,214 @@
+"""
+정책 데이터 증분 색인
+
+정책 레코드(id 단위)의 해시를 매니페스트와 비교해 새로 추가/변경된 정책의 청크만 임베딩하고,
+삭제된 정책의 벡터는 지운다. 청크 id는 "{정책 id}#{청크 번호}" 형식으로 고정된다.
+
+실행 예시 (backend/ 디렉토리에서):
+    python -m app.ingest
+    python -m app.ingest --dry-run
+    python -m app.ingest --rebuild
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+
+from .dataLoader import load_policy_data, split_policy_documents, PERSIST_DIRECTORY
+from .embedding_cache import get_embeddings
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+MANIFEST_VERSION = 1
+# 청크 분할 방식이 바뀌면 전체 재색인 (split_policy_documents 설정과 맞춤)
+CHUNKING = "char:1000:200:newline"
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "64"))
+
+def manifest_path(persist_directory=PERSIST_DIRECTORY):
+    return os.path.join(persist_directory, MANIFEST_FILENAME)
+
+def load_manifest(persist_directory=PERSIST_DIRECTORY):
+    path = manifest_path(persist_directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Warning: ingest manifest unreadable ({e}), treating index as unmanaged")
+        return None
+
+def save_manifest(manifest, persist_directory=PERSIST_DIRECTORY):
+    # 중간에 중단되어도 깨진 매니페스트가 남지 않도록 임시 파일 후 교체
+    path = manifest_path(persist_directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def policy_hash(document):
+    payload = json.dumps(
+        {"text": document.page_content, "category": document.metadata.get("category", "")},
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def chunk_ids(policy_id, count):
+    return [f"{policy_id}#{i}" for i in range(count)]
+
+def _embedding_model_name(embeddings):
+    return getattr(embeddings, "model_name", None) or getattr(embeddings, "model", embeddings.__class__.__name__)
+
+def _chunk_policy(document):
+    chunks = split_policy_documents([document])
+    for i, chunk in enumerate(chunks):
+        chunk.metadata["chunk_index"] = i
+    return chunks
+
+def _adopt_legacy_vectors(collection, chunks_by_policy):
+    """매니페스트 없이 만들어진 색인(임의 uuid)의 벡터를 본문이 같은 청크의 새 id로 옮김
+
+    기존 항목은 여기서 지우지 않는다. 새 id로 upsert가 모두 끝난 뒤 호출하는 쪽에서 지운다
+    (중간에 임베딩/upsert가 실패해도 색인이 비지 않도록).
+
+    Returns:
+        ({chunk id: embedding}, legacy ids) - 본문이 일치해 다시 임베딩할 필요가 없는 청크, 나중에 지울 기존 id
+    """
+    data = collection.get(include=["documents", "embeddings"])
+    legacy_ids = data.get("ids") or []
+    if not legacy_ids:
+        return {}, []
+    legacy_embeddings = data.get("embeddings")
+    if legacy_embeddings is None:
+        legacy_embeddings = []
+    by_text = {}
+    for text, embedding in zip(data.get("documents") or [], legacy_embeddings):
+        by_text.setdefault(text, list(embedding))
+    adopted = {}
+    for policy_id, chunks in chunks_by_policy.items():
+        for chunk_id, chunk in zip(chunk_ids(policy_id, len(chunks)), chunks):
+            if chunk.page_content in by_text:
+                adopted[chunk_id] = by_text[chunk.page_content]
+    print(f"Adopted {len(adopted)} vectors from legacy index ({len(legacy_ids)} legacy entries)")
+    return adopted, legacy_ids
+
+def sync_vectorstore(vectorstore, documents=None, rebuild=False, dry_run=False,
+                     persist_directory=PERSIST_DIRECTORY, batch_size=INGEST_BATCH_SIZE):
+    """데이터 파일과 벡터스토어를 증분 동기화하고 통계 dict 반환"""
+    start = time.perf_counter()
+    collection = vectorstore._collection
+    embeddings = get_embeddings()
+    documents = load_policy_data() if documents is None else documents
+    current = {doc.metadata.get("id"): doc for doc in documents if doc.metadata.get("id")}
+    if not current:
+        # 데이터 파일이 없거나 비어 있으면 기존 색인을 지우지 않음
+        raise ValueError("No policy documents loaded; refusing to sync an empty corpus")
+
+    manifest = load_manifest(persist_directory)
+    model_name = _embedding_model_name(embeddings)
+    compatible = (
+        manifest is not None
+        and manifest.get("version") == MANIFEST_VERSION
+        and manifest.get("embedding_model") == model_name
+        and manifest.get("chunking") == CHUNKING
+    )
+    if rebuild or (manifest is not None and not compatible):
+        # 임베딩 모델/청크 방식이 바뀌었거나 강제 재색인이면 기존 벡터를 모두 지우고 다시 만듦
+        previous = {}
+        reset = True
+    else:
+        previous = manifest.get("policies", {}) if manifest else {}
+        reset = False
+
+    hashes = {policy_id: policy_hash(doc) for policy_id, doc in current.items()}
+    changed = [pid for pid in current if previous.get(pid, {}).get("hash") != hashes[pid]]
+    removed = [pid for pid in previous if pid not in current]
+    stats = {
+        "policies": len(current),
+        "added": sum(1 for pid in changed if pid not in previous),
+        "updated": sum(1 for pid in changed if pid in previous),
+        "removed": len(removed),
+        "unchanged": len(current) - len(changed),
+        "chunks_embedded": 0,
+        "chunks_adopted": 0,
+        "embed_requests": 0,
+    }
+    if dry_run:
+        stats["elapsed_sec"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    chunks_by_policy = {pid: _chunk_policy(current[pid]) for pid in changed}
+
+    adopted, legacy_ids = {}, []
+    if reset:
+        existing = collection.get(include=[]).get("ids") or []
+        if existing:
+            collection.delete(ids=existing)
+    elif manifest is None:
+        adopted, legacy_ids = _adopt_legacy_vectors(collection, chunks_by_policy)
+
+    # 삭제된 정책 + 청크 수가 줄어든 정책의 남는 청크 제거
+    stale_ids = []
+    for pid in removed:
+        stale_ids.extend(chunk_ids(pid, previous[pid].get("chunks", 0)))
+    for pid in changed:
+        old_count = previous.get(pid, {}).get("chunks", 0)
+        stale_ids.extend(chunk_ids(pid, old_count)[len(chunks_by_policy[pid]):])
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+
+    pending = [
+        (chunk_id, chunk)
+        for pid in changed
+        for chunk_id, chunk in zip(chunk_ids(pid, len(chunks_by_policy[pid])), chunks_by_policy[pid])
+    ]
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        to_embed = [chunk.page_content for chunk_id, chunk in batch if chunk_id not in adopted]
+        vectors = iter(embeddings.embed_documents(to_embed)) if to_embed else iter(())
+        if to_embed:
+            stats["embed_requests"] += 1
+            stats["chunks_embedded"] += len(to_embed)
+        stats["chunks_adopted"] += len(batch) - len(to_embed)
+        collection.upsert(
+            ids=[chunk_id for chunk_id, _ in batch],
+            embeddings=[adopted[chunk_id] if chunk_id in adopted else next(vectors) for chunk_id, _ in batch],
+            documents=[chunk.page_content for _, chunk in batch],
+            metadatas=[chunk.metadata for _, chunk in batch],
+        )
+
+    # 새 id로 모두 기록된 뒤에만 기존(uuid) 항목 제거
+    new_ids = {chunk_id for chunk_id, _ in pending}
+    legacy_ids = [legacy_id for legacy_id in legacy_ids if legacy_id not in new_ids]
+    if legacy_ids:
+        collection.delete(ids=legacy_ids)
+        print(f"Removed {len(legacy_ids)} legacy entries")
+
+    policies = {pid: previous[pid] for pid in current if pid in previous and pid not in changed}
+    for pid in changed:
+        policies[pid] = {"hash": hashes[pid], "chunks": len(chunks_by_policy[pid])}
+    save_manifest({
+        "version": MANIFEST_VERSION,
+        "embedding_model": model_name,
+        "chunking": CHUNKING,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "policies": policies,
+    }, persist_directory)
+
+    stats["elapsed_sec"] = round(time.perf_counter() - start, 3)
+    print(f"Ingest finished: {stats}")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="정책 데이터 증분 색인")
+    parser.add_argument("--dry-run", action="store_true", help="변경 사항만 계산하고 색인은 수정하지 않음")
+    parser.add_argument("--rebuild", action="store_true", help="기존 벡터를 모두 지우고 전체 재색인")
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import Chroma
+    vectorstore = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=get_embeddings())
+    stats = sync_vectorstore(vectorstore, rebuild=args.rebuild, dry_run=args.dry_run)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
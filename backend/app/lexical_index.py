@@ -0,0 +1,213 @@
+import os
+import re
+import math
+import unicodedata
+from collections import Counter
+from typing import Any, List
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from .policy_fields import get_policy_fields
+from .context_selector import retrieve_with_scores
+
+# 질문에 정책명이 그대로 들어있으면 임베딩 요청 없이 어휘 검색 결과만 사용
+LEXICAL_SHORTCUT = os.environ.get("LEXICAL_SHORTCUT", "1") == "1"
+# 어휘 검색 결과로 인정할 최소 BM25 점수 (절대값). "지원 신청 방법"처럼 흔한 n-gram만 겹치는 질의는 0.1대
+LEXICAL_MIN_SCORE = float(os.environ.get("LEXICAL_MIN_SCORE", "1.0"))
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z가-힣]+")
+
+def _normalize(text):
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+def char_ngrams(text, sizes=(2, 3)):
+    """형태소 분석기 없이 한국어를 다루기 위한 문자 n-gram 추출
+
+    공백/문장부호로 나눈 어절 안에서만 n-gram을 만들고, n보다 짧은 어절(예: "집")은 통째로 사용한다.
+    "청년안심주택이" -> "청년", "년안", "안심", ... "청년안", "년안심", ...
+    """
+    grams = []
+    for token in _TOKEN_PATTERN.findall(_normalize(text)):
+        if len(token) < min(sizes):
+            grams.append(token)
+            continue
+        for n in sizes:
+            grams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return grams
+
+def _compact(text):
+    # 정책명 포함 여부 비교용 (공백 제거)
+    return "".join(_TOKEN_PATTERN.findall(_normalize(text)))
+
+class CharNgramBM25Index:
+    """문자 n-gram 역색인 + BM25 점수
+
+    포스팅은 CSR 형태의 배열(term별 offset, 문서 번호, 미리 계산한 BM25 가중치)로 저장한다.
+    문서 길이 정규화는 색인 시점에 반영되므로 검색은 질의 n-gram별 scatter-add만 하면 된다.
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75, sizes=(2, 3)):
+        self.documents = list(documents)
+        self.sizes = sizes
+        self.vocab = {}
+
+        term_freqs = [Counter(char_ngrams(doc.page_content, sizes)) for doc in self.documents]
+        doc_lens = np.array([sum(tf.values()) for tf in term_freqs], dtype=np.float32)
+        avg_len = float(doc_lens.mean()) if len(doc_lens) and doc_lens.mean() > 0 else 1.0
+        n_docs = len(self.documents)
+
+        postings = {}
+        for doc_idx, tf in enumerate(term_freqs):
+            for term, count in tf.items():
+                postings.setdefault(term, []).append((doc_idx, count))
+
+        offsets = [0]
+        doc_ids = []
+        weights = []
+        for term_id, (term, plist) in enumerate(postings.items()):
+            self.vocab[term] = term_id
+            df = len(plist)
+            idf = math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+            for doc_idx, count in plist:
+                norm = k1 * (1 - b + b * doc_lens[doc_idx] / avg_len)
+                doc_ids.append(doc_idx)
+                weights.append(idf * count * (k1 + 1) / (count + norm))
+            offsets.append(len(doc_ids))
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.posting_docs = np.array(doc_ids, dtype=np.int32)
+        self.posting_weights = np.array(weights, dtype=np.float32)
+
+        # 정책명 -> 문서 번호 (정확한 이름 일치 판단용)
+        self.policy_names = {}
+        for doc_idx, doc in enumerate(self.documents):
+            name = _compact(get_policy_fields(doc)["policy_name"])
+            if name:
+                self.policy_names.setdefault(name, []).append(doc_idx)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query, k=10, min_score_ratio=0.5, min_score=0.0):
+        """BM25 상위 k개 (Document, score). min_score 미만 또는 최고점 대비 min_score_ratio 미만은 제외"""
+        if not self.documents:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(char_ngrams(query, self.sizes)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            scores[self.posting_docs[start:end]] += self.posting_weights[start:end]
+        best = float(scores.max())
+        if best <= 0 or best < min_score:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [
+            (self.documents[idx], float(scores[idx]))
+            for idx in top.tolist()
+            if scores[idx] >= max(best * min_score_ratio, min_score)
+        ]
+
+    def exact_name_matches(self, query):
+        """질문에 정책명이 그대로 포함된 문서 목록 (긴 이름 우선)"""
+        compact_query = _compact(query)
+        matched = []
+        for name in sorted(self.policy_names, key=len, reverse=True):
+            if name in compact_query:
+                matched.extend(self.documents[idx] for idx in self.policy_names[name])
+        return matched
+
+def _doc_key(doc):
+    return (doc.metadata.get("id"), doc.page_content)
+
+def reciprocal_rank_fusion(ranked_lists, rrf_k=60):
+    """여러 순위 목록을 RRF로 합침. [(Document, fused_score)] 점수 내림차순"""
+    scores = {}
+    docs = {}
+    for ranked in ranked_lists:
+        for rank, doc in enumerate(ranked):
+            key = _doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    ordered = sorted(scores, key=lambda key: -scores[key])
+    return [(docs[key], scores[key]) for key in ordered]
+
+class HybridRetriever(BaseRetriever):
+    """벡터 검색 + 문자 n-gram BM25 검색을 RRF로 합친 리트리버
+
+    질문에 정책명이 그대로 들어있으면(예: "청년안심주택이 무엇인가요?") 임베딩 요청을 생략하고
+    정확히 일치한 정책을 맨 앞에 둔 어휘 검색 결과만 사용한다.
+    어휘 검색 결과는 LEXICAL_MIN_SCORE 이상일 때만 쓰며, 벡터 검색이 아무것도 못 찾은 질의
+    (예: "전세자금"처럼 정확한 용어)는 이 어휘 검색 결과만으로 채운다.
+    """
+
+    vector_retriever: Any
+    lexical_index: Any
+    embeddings: Any = None
+    k: int = 10
+    lexical_k: int = 5
+    rrf_k: int = 60
+    lexical_shortcut: bool = LEXICAL_SHORTCUT
+    lexical_min_score: float = LEXICAL_MIN_SCORE
+
+    def is_lexical_shortcut(self, query: str) -> bool:
+        """이 질의가 임베딩 없이 정책명 일치로 처리되는지 여부"""
+        return self.lexical_shortcut and bool(self.lexical_index.exact_name_matches(query))
+
+    def _vector_threshold(self):
+        threshold = getattr(self.vector_retriever, "score_threshold", None)
+        if threshold is None:
+            threshold = (getattr(self.vector_retriever, "search_kwargs", None) or {}).get("score_threshold")
+        return threshold
+
+    def _calibrate_lexical(self, lexical_scored, vector_scores):
+        """BM25 점수를 벡터 유사도 눈금으로 옮김 (문서 key -> 점수)
+
+        최고 BM25 점수를 최고 벡터 점수에, 0을 벡터 임계값 아래 끝에 맞추는 선형 변환이다.
+        벡터 결과가 없으면 [임계값, 1.0] 구간을 쓴다. 강한 어휘 일치는 상위 벡터 결과와 나란히,
+        약한 일치는 그 아래에 놓인다.
+        """
+        best = max((score for _, score in lexical_scored), default=0.0)
+        if best <= 0:
+            return {}
+        threshold = self._vector_threshold()
+        if threshold is None:
+            threshold = min(vector_scores.values(), default=0.0)
+        ceiling = max(vector_scores.values(), default=1.0)
+        low = min(threshold, ceiling)
+        return {_doc_key(doc): low + (ceiling - low) * score / best for doc, score in lexical_scored}
+
+    def search_with_scores(self, query: str):
+        """RRF 순위 순서의 (Document, 유사도 점수) 목록
+
+        순서는 RRF로 정하고, 점수는 컨텍스트 선택(gap cutoff)에 쓸 수 있도록 벡터 유사도 눈금으로 붙인다.
+        - 벡터/어휘 검색 점수 중 큰 값 (BM25는 _calibrate_lexical로 벡터 눈금에 맞춤)
+        - 정책명 일치 shortcut: 최고점 대비 BM25 점수 (0~1, 정책명 일치 문서는 1.0)
+        """
+        exact = self.lexical_index.exact_name_matches(query)
+        lexical_scored = self.lexical_index.search(query, k=self.lexical_k, min_score=self.lexical_min_score)
+        lexical = [doc for doc, _ in lexical_scored]
+        if exact and self.lexical_shortcut:
+            best = max((score for _, score in lexical_scored), default=0.0)
+            scores = {_doc_key(doc): score / best for doc, score in lexical_scored if best > 0}
+            scores.update({_doc_key(doc): 1.0 for doc in exact})
+            fused = reciprocal_rank_fusion([exact, lexical], self.rrf_k)[:self.k]
+            return [(doc, scores.get(_doc_key(doc), 0.0)) for doc, _ in fused]
+        vector_scored = retrieve_with_scores(self.vector_retriever, query)
+        if not vector_scored and not lexical:
+            # 두 검색 모두 결과가 없을 때만 fallback 경로로
+            return []
+        vector_scores = {_doc_key(doc): score for doc, score in vector_scored if score is not None}
+        lexical_scores = self._calibrate_lexical(lexical_scored, vector_scores)
+        fused = reciprocal_rank_fusion([[doc for doc, _ in vector_scored], lexical], self.rrf_k)[:self.k]
+        return [
+            (doc, max(vector_scores.get(_doc_key(doc), 0.0), lexical_scores.get(_doc_key(doc), 0.0)))
+            for doc, _ in fused
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
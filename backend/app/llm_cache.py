@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 라우팅/분석 LLM 결과 영구 캐시 설정
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.environ.get(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), '../cache/llm_cache.sqlite3')
+)
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "20000"))
+# 적중 시 last_used 갱신은 모아 두었다가 한 번에 기록 (개수 또는 주기 중 먼저 도달하는 쪽)
+LLM_CACHE_TOUCH_BATCH = int(os.environ.get("LLM_CACHE_TOUCH_BATCH", "64"))
+LLM_CACHE_TOUCH_INTERVAL = float(os.environ.get("LLM_CACHE_TOUCH_INTERVAL", "30"))
+
+_TRAILING_PUNCT = re.compile(r"[\s?!.~,。？！]+$")
+
+def normalize_text(text):
+    """캐시 키용 텍스트 정규화 (NFKC, 소문자, 공백 정리, 끝 문장부호 제거)
+
+    "청년안심주택이 무엇인가요?" 와 "청년안심주택이  무엇인가요" 는 같은 키가 된다.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = " ".join(text.split())
+    return _TRAILING_PUNCT.sub("", text)
+
+def prompt_version(template, model=""):
+    """프롬프트 템플릿(+모델) 해시. 템플릿이 바뀌면 이전 캐시는 자동으로 무시된다."""
+    return hashlib.sha256(f"{model}\n{template}".encode("utf-8")).hexdigest()[:16]
+
+class PersistentLLMCache:
+    """정규화된 텍스트 + 프롬프트 버전을 키로 LLM 응답을 저장하는 SQLite 캐시
+
+    최대 항목 수를 넘으면 마지막 사용 시각이 오래된 항목부터 제거한다.
+    적중은 SELECT만 하고, last_used 갱신은 touch_batch개 또는 touch_interval초마다 한 트랜잭션으로 기록한다.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 touch_batch=LLM_CACHE_TOUCH_BATCH, touch_interval=LLM_CACHE_TOUCH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._count = 0
+        self._touched = {}  # key -> 마지막 사용 시각 (아직 기록되지 않음)
+        self._last_touch_flush = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+            self._count = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def make_key(namespace, version, text):
+        raw = f"{namespace}\x1f{version}\x1f{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, namespace, version, text):
+        key = self.make_key(namespace, version, text)
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                now = time.time()
+                self._touched[key] = now
+                if len(self._touched) >= self.touch_batch or now - self._last_touch_flush >= self.touch_interval:
+                    self._flush_touches(conn)
+                    conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"[LLMCache] 조회 실패: {e}")
+            return None
+
+    def put(self, namespace, version, text, value):
+        key = self.make_key(namespace, version, text)
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO llm_cache (key, namespace, value, created_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, value, now, now)
+                )
+                self._count += cursor.rowcount
+                if self._count > self.max_entries:
+                    # 최근 적중 기록을 먼저 반영해야 방금 쓴 항목이 제거되지 않음
+                    self._flush_touches(conn)
+                    self._evict(conn)
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[LLMCache] 저장 실패: {e}")
+
+    def _flush_touches(self, conn):
+        if self._touched:
+            conn.executemany(
+                "UPDATE llm_cache SET last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()]
+            )
+            self._touched = {}
+        self._last_touch_flush = time.time()
+
+    def flush(self):
+        """보류 중인 last_used 갱신 기록 (종료 시 호출)"""
+        try:
+            with self._lock:
+                if self._conn is not None:
+                    self._flush_touches(self._conn)
+                    self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"[LLMCache] last_used 기록 실패: {e}")
+
+    def _evict(self, conn):
+        # 매번 한 건씩 지우지 않도록 최대치의 10%만큼 여유를 두고 한 번에 제거
+        target = int(self.max_entries * 0.9)
+        excess = self._count - target
+        conn.execute(
+            "DELETE FROM llm_cache WHERE key IN"
+            " (SELECT key FROM llm_cache ORDER BY last_used ASC LIMIT ?)",
+            (excess,)
+        )
+        self._count = target
+        self.evictions += excess
+
+    def contains(self, namespace, version, text):
+        key = self.make_key(namespace, version, text)
+        with self._lock:
+            conn = self._connect()
+            return conn.execute("SELECT 1 FROM llm_cache WHERE key = ?", (key,)).fetchone() is not None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "pending_touches": len(self._touched),
+        }
+
+# 프로세스 전역 캐시 (SQLite 파일은 여러 워커가 함께 사용 가능)
+llm_cache = PersistentLLMCache()
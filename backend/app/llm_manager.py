@@ -1,13 +1,20 @@
 import os
 import json
 import re
-import requests
+import asyncio
+import time
+import hashlib
 import logging
-from langchain.memory import ConversationBufferWindowMemory
 from langchain.prompts import PromptTemplate
-from langchain.chains import ConversationalRetrievalChain
-from langchain_chroma import Chroma
-from app.ask_api import run_llm
+from app.ask_api import run_llm, run_llm_async, stream_llm_async, LLM_MODEL
+from app.answer_cache import answer_cache, history_fingerprint, ANSWER_CACHE_ENABLED
+from app.llm_cache import llm_cache, prompt_version, LLM_CACHE_ENABLED
+from app.fast_router import FastRouter, FAST_ROUTER_ENABLED, POSITIVE_LEXICON
+from app.session_store import create_session_store
+from app.policy_fields import get_policy_fields
+from app.prompt_budget import build_prompt
+from app.context_selector import retrieve_with_scores, select_context, format_scores
+from app.metrics import stage_timer, STAGE_SECONDS
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -21,15 +28,54 @@ ASK_API_URL = os.environ.get("ASK_API_URL", "https://youth-chatbot-backend.onren
 #     response.raise_for_status()
 #     return response.json()["response"]
 
-def call_llm_via_ask(prompt: str) -> str:
-    return run_llm(prompt)
-
-# 세션별 대화 메모리 저장소 (개발용: 실제 서비스에서는 외부 DB 사용)
-session_memories = {}
-
-# 사용자 정보 저장소 (개발용: 실제 서비스에서는 DB 사용)
-# key: session_id, value: {"user_profile": "대학생", "some_other_info": "값"}
-user_profiles_db = {}
+def call_llm_via_ask(prompt: str, json_mode: bool = False, stage: str = "default") -> str:
+    return run_llm(prompt, json_mode=json_mode, stage=stage)
+
+async def call_llm_via_ask_async(prompt: str, json_mode: bool = False, stage: str = "default") -> str:
+    return await run_llm_async(prompt, json_mode=json_mode, stage=stage)
+
+def stream_llm_via_ask(prompt: str, stage: str = "default"):
+    return stream_llm_async(prompt, stage=stage)
+
+# 라우팅/분석처럼 입력 텍스트와 프롬프트에만 의존하는 호출은 영구 캐시를 거친다.
+# 키: (namespace, 프롬프트 템플릿 해시, 정규화된 사용자 텍스트)
+def _cached_llm_call(namespace, template, text, prompt, validate, **kwargs):
+    if not LLM_CACHE_ENABLED:
+        return call_llm_via_ask(prompt, **kwargs)
+    version = prompt_version(template, LLM_MODEL)
+    cached = llm_cache.get(namespace, version, text)
+    if cached is not None:
+        logger.info(f"[LLMCache] {namespace} 캐시 적중")
+        return cached
+    response = call_llm_via_ask(prompt, **kwargs)
+    if validate(response):
+        llm_cache.put(namespace, version, text, response)
+    return response
+
+async def _cached_llm_call_async(namespace, template, text, prompt, validate, **kwargs):
+    if not LLM_CACHE_ENABLED:
+        return await call_llm_via_ask_async(prompt, **kwargs)
+    version = prompt_version(template, LLM_MODEL)
+    # SQLite 조회/기록은 이벤트 루프를 막지 않도록 스레드에서 실행
+    cached = await asyncio.to_thread(llm_cache.get, namespace, version, text)
+    if cached is not None:
+        logger.info(f"[LLMCache] {namespace} 캐시 적중")
+        return cached
+    response = await call_llm_via_ask_async(prompt, **kwargs)
+    if validate(response):
+        await asyncio.to_thread(llm_cache.put, namespace, version, text, response)
+    return response
+
+def _is_valid_json_response(response):
+    # 파싱 가능한 JSON 객체만 캐시 (일시적인 형식 오류를 영구 저장하지 않음)
+    try:
+        return isinstance(json.loads(response), dict)
+    except (TypeError, ValueError):
+        return False
+
+# 세션별 대화 메모리 + 사용자 정보 저장소 (최대 세션 수 / 유휴 TTL / LRU 제거)
+# 프로필 예: {"user_profile": "대학생", "some_other_info": "값"}
+session_store = create_session_store()
 
 # User information extraction prompt (English for better performance)
 initial_analysis_prompt_template = """
@@ -58,6 +104,58 @@ User's Request: {user_input}
 """
 initial_analysis_prompt = PromptTemplate.from_template(initial_analysis_prompt_template)
 
+# 라우팅 + 분석을 한 번의 호출로 처리하는 triage 프롬프트 (JSON 모드로 호출)
+triage_prompt_template = """
+You are the front-desk triage step of a Seoul youth housing policy assistant. Analyze the user's message and respond with a single JSON object only.
+
+Fields:
+1. is_housing: true if the message is about housing policy or a housing need, otherwise false.
+   Housing policy covers: 전세자금/월세 지원, 임대주택 공급, 자립 지원 주거, 신혼부부·사회초년생 주택 지원, 주거급여·이사비·보증금 등 주거비용 부담 완화.
+   Examples:
+   - "전세보증금을 못 돌려받았어요" → true
+   - "자취하고 싶은데 돈이 없어요" → true
+   - "20대 청년 주거 지원정책이 있나요?" → true
+   - "신혼부부를 위한 주택 정책은 어떤 게 있어요?" → true
+   - "부동산 시장 전망은?" → false
+   - "종합부동산세 줄일 수 있나요?" → false
+   - "중장년 주거복지에 대해 알려줘" → false
+2. residence: User's residence (e.g., "Seoul", "Gyeonggi", "Other regions")
+3. age: User's age (number or age group like "20s", "30s")
+4. gender: User's gender ("Male", "Female", "Other", "Not specified")
+5. marital_status: Marital status ("Married", "Single", "Not specified")
+6. user_profile: Korean summary combining the above info (e.g., "서울 거주 20대 미혼 여성")
+7. policy_area_of_interest: Policy area of interest (e.g., "Housing", "Employment", "Welfare", "Education")
+8. specific_keywords: Important keywords from the user's question
+9. optimized_search_query: Most effective Korean query for policy search. If the message expresses a housing need without the word "정책", reframe it as a policy query (e.g., "월세 부담돼요" → "청년 월세 지원 정책").
+
+Use an empty string for any field that is not available. If is_housing is false, the other fields may be empty.
+
+---
+User's Request: {user_input}
+"""
+triage_prompt = PromptTemplate.from_template(triage_prompt_template)
+
+# 라우팅/분석 방식: "split" (라우팅·분석 두 번 호출, 동시 실행) 또는 "combined" (triage 한 번 호출)
+TRIAGE_MODE = os.environ.get("TRIAGE_MODE", "split").lower()
+
+# 증분 분석: 프로필이 이미 있는 세션은 전체 분석 대신 작은 후속 프롬프트/규칙 기반 재작성 사용
+INCREMENTAL_ANALYSIS = os.environ.get("INCREMENTAL_ANALYSIS", "1") == "1"
+# 규칙 기반 재작성을 적용할 후속 질문 최대 길이 (글자 수)
+FOLLOWUP_MAX_CHARS = int(os.environ.get("FOLLOWUP_MAX_CHARS", "25"))
+
+# 프로필이 있는 세션의 후속 질문용 프롬프트 (JSON 모드로 호출)
+followup_analysis_prompt_template = """
+You rewrite follow-up messages in a Seoul youth housing policy conversation. The user's profile is already known; do not re-extract it.
+Respond with a single JSON object only:
+1. optimized_search_query: Most effective Korean query for policy search. Resolve references in the new message using the previous search query.
+2. residence, age, gender, marital_status: Only if the new message states or changes them (same formats as "Seoul", "20s", "Female", "Single"). Otherwise empty string.
+
+Known profile: {user_profile}
+Previous search query: {last_search_query}
+New message: {user_input}
+"""
+followup_analysis_prompt = PromptTemplate.from_template(followup_analysis_prompt_template)
+
 # Enhanced QA prompt for better RAG performance
 qa_prompt_template = """You are a knowledgeable and empathetic policy assistant specializing in **Korean youth housing policies**. You MUST respond in Korean language only. Provide accurate, comprehensive, and user-centric information based ONLY on the provided policy documents and chat history.
 
@@ -121,156 +219,381 @@ QA_PROMPT = PromptTemplate.from_template(qa_prompt_template)
 
 def get_or_create_memory(session_id):
     """세션별 메모리를 가져오거나 새로 생성"""
-    if session_id not in session_memories:
-        session_memories[session_id] = ConversationBufferWindowMemory(
-            memory_key="chat_history", 
-            return_messages=True, 
-            k=5
-        )
-    return session_memories[session_id]
+    return session_store.get_memory(session_id)
+
+def _get_current_profile(session_id):
+    return session_store.get_profile(session_id).get("user_profile", "정보 없음")
+
+def _parse_analysis_response(analysis_response):
+    """분석 LLM 응답(JSON 문자열)을 dict로 파싱. 실패 시 None"""
+    try:
+        return json.loads(analysis_response)
+    except json.JSONDecodeError:
+        print("Warning: Initial analysis did not return valid JSON.")
+    except Exception as e:
+        print(f"Error during initial analysis: {e}")
+    return None
+
+# 세션에 개별 저장하는 프로필 필드 (분석 결과에서 값이 있을 때만 병합)
+PROFILE_FIELDS = ("residence", "age", "gender", "marital_status")
+_EMPTY_FIELD_VALUES = {"", "not specified", "정보 없음", "none", "null", "unknown"}
+
+def _clean_profile_field(value):
+    value = str(value or "").strip()
+    return "" if value.lower() in _EMPTY_FIELD_VALUES else value
+
+def render_profile_summary(fields):
+    """프로필 필드로 한국어 요약 생성 (예: "서울 거주 20대 미혼 여성"). 필드가 없으면 빈 문자열"""
+    parts = []
+    residence = fields.get("residence")
+    if residence:
+        residence = {"seoul": "서울", "gyeonggi": "경기", "other regions": "기타 지역"}.get(residence.lower(), residence)
+        parts.append(f"{residence} 거주")
+    age = fields.get("age")
+    if age:
+        age_match = re.fullmatch(r"(\d+)\s*s", age)
+        parts.append(f"{age_match.group(1)}대" if age_match else f"{age}세" if age.isdigit() else age)
+    marital = {"married": "기혼", "single": "미혼"}.get((fields.get("marital_status") or "").lower())
+    if marital:
+        parts.append(marital)
+    gender = {"male": "남성", "female": "여성"}.get((fields.get("gender") or "").lower())
+    if gender:
+        parts.append(gender)
+    return " ".join(parts)
+
+def _apply_analysis_info(user_message, session_id, initial_info):
+    """분석 결과(dict)를 세션 프로필에 병합하고 (프로필, 검색 쿼리) 반환"""
+    stored = session_store.get_profile(session_id)
+    current_user_profile = stored.get("user_profile", "정보 없음")
+    if not isinstance(initial_info, dict):
+        return current_user_profile, user_message
+
+    updates = {}
+    for field in PROFILE_FIELDS:
+        value = _clean_profile_field(initial_info.get(field))
+        if value and value != stored.get(field):
+            updates[field] = value
+
+    if current_user_profile == "정보 없음":
+        # 첫 추출은 LLM이 만든 요약을 그대로 사용
+        extracted_profile = initial_info.get("user_profile")
+        if extracted_profile and extracted_profile != "정보 없음":
+            updates["user_profile"] = extracted_profile
+    elif updates and INCREMENTAL_ANALYSIS:
+        # 이후에는 바뀐 필드만 병합해 요약을 다시 만듦 (재추출 없음)
+        updates["user_profile"] = render_profile_summary({**stored, **updates}) or current_user_profile
+
+    search_query_from_analysis = initial_info.get("optimized_search_query") or user_message
+    updates["last_search_query"] = search_query_from_analysis
+    session_store.update_profile(session_id, **updates)
+    return updates.get("user_profile", current_user_profile), search_query_from_analysis
+
+def _apply_analysis_response(user_message, session_id, analysis_response):
+    """분석 LLM 응답(JSON)을 파싱하여 프로필 갱신 및 검색 쿼리 반환"""
+    initial_info = _parse_analysis_response(analysis_response)
+    return _apply_analysis_info(user_message, session_id, initial_info)
 
 def extract_user_profile(user_message, session_id):
     """사용자 메시지에서 프로필 정보 추출"""
-    current_user_profile = user_profiles_db.get(session_id, {}).get("user_profile", "정보 없음")
+    try:
+        prompt = initial_analysis_prompt.format(user_input=user_message)
+        analysis_response = _cached_llm_call(
+            "analysis", initial_analysis_prompt_template, user_message, prompt,
+            _is_valid_json_response, json_mode=True, stage="analysis"
+        )
+    except Exception as e:
+        print(f"Error during initial analysis: {e}")
+        return _get_current_profile(session_id), user_message
+    return _apply_analysis_response(user_message, session_id, analysis_response)
+
+async def analyze_user_message_async(user_message):
+    """분석 프롬프트 LLM 호출만 수행 (세션 상태는 건드리지 않음). 실패 시 None"""
+    try:
+        prompt = initial_analysis_prompt.format(user_input=user_message)
+        return await _cached_llm_call_async(
+            "analysis", initial_analysis_prompt_template, user_message, prompt,
+            _is_valid_json_response, json_mode=True, stage="analysis"
+        )
+    except Exception as e:
+        print(f"Error during initial analysis: {e}")
+        return None
+
+# 짧은 후속 질문에 새 프로필 정보가 들어있는지 판단하는 패턴 (있으면 후속 프롬프트로 처리)
+_PROFILE_CUE_PATTERN = re.compile(r"\d+\s*(?:살|세)|\d0\s*대|거주|살아요|살고\s*있|기혼|미혼|결혼|신혼|남자|여자|남성|여성")
+
+# 분석 경로별 호출 수 (full: 전체 분석, followup_prompt: 후속 프롬프트, local_rewrite: 규칙 기반)
+analysis_stats = {"full": 0, "followup_prompt": 0, "local_rewrite": 0}
+
+def rewrite_followup_locally(user_message, last_search_query):
+    """짧은 후속 질문("신청 방법은?")을 이전 검색 쿼리에 이어 붙여 검색 쿼리로 변환
+
+    새 주거 주제나 프로필 정보가 들어있는 등 규칙으로 처리할 수 없으면 None
+    """
+    text = user_message.strip().rstrip("?？!. ")
+    if not last_search_query or not text or len(text) > FOLLOWUP_MAX_CHARS:
+        return None
+    if _PROFILE_CUE_PATTERN.search(text) or any(term in text for term in POSITIVE_LEXICON):
+        return None
+    return f"{last_search_query} {text}"
+
+async def _analyze_followup_async(user_message, stored_profile):
+    """후속 프롬프트 호출. 실패 시 None"""
+    user_profile = stored_profile.get("user_profile", "정보 없음")
+    last_search_query = stored_profile.get("last_search_query", "")
+    try:
+        prompt = followup_analysis_prompt.format(
+            user_profile=user_profile, last_search_query=last_search_query, user_input=user_message
+        )
+        # 결과가 프로필/이전 쿼리에 따라 달라지므로 캐시 키에 함께 포함
+        cache_text = "\x1f".join([user_profile, last_search_query, user_message])
+        response = await _cached_llm_call_async(
+            "analysis_followup", followup_analysis_prompt_template, cache_text, prompt,
+            _is_valid_json_response, json_mode=True, stage="analysis"
+        )
+    except Exception as e:
+        print(f"Error during follow-up analysis: {e}")
+        return None
+    return _parse_analysis_response(response)
+
+async def analyze_turn_async(user_message, session_id):
+    """세션 상태에 맞는 분석을 수행해 분석 결과(dict) 반환. 실패 시 None (세션 상태는 건드리지 않음)
+
+    - 프로필이 없으면: 전체 분석 프롬프트
+    - 프로필이 있으면(INCREMENTAL_ANALYSIS): 짧은 후속 질문은 규칙 기반 재작성, 그 외는 작은 후속 프롬프트
+    """
+    with stage_timer("analysis"):
+        # SQLite 세션 저장소는 DB를 읽을 수 있으므로 이벤트 루프 밖에서 조회
+        stored = await asyncio.to_thread(session_store.get_profile, session_id)
+        if INCREMENTAL_ANALYSIS and stored.get("user_profile", "정보 없음") != "정보 없음":
+            local_query = rewrite_followup_locally(user_message, stored.get("last_search_query", ""))
+            if local_query is not None:
+                analysis_stats["local_rewrite"] += 1
+                return {"optimized_search_query": local_query}
+            analysis_stats["followup_prompt"] += 1
+            return await _analyze_followup_async(user_message, stored)
+
+        analysis_stats["full"] += 1
+        analysis_response = await analyze_user_message_async(user_message)
+        if analysis_response is None:
+            return None
+        return _parse_analysis_response(analysis_response)
+
+async def extract_user_profile_async(user_message, session_id):
+    """extract_user_profile의 비동기 버전 (INCREMENTAL_ANALYSIS이면 증분 분석)"""
+    analysis_info = await analyze_turn_async(user_message, session_id)
+    return await asyncio.to_thread(_apply_analysis_info, user_message, session_id, analysis_info)
+
+def _parse_is_housing(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "yes", "y", "1")
+
+async def triage_user_message_async(user_message):
+    """라우팅과 분석을 하나의 JSON 모드 호출로 수행. 실패 시 None"""
+    try:
+        prompt = triage_prompt.format(user_input=user_message)
+        with stage_timer("triage"):
+            triage_response = await _cached_llm_call_async(
+                "triage", triage_prompt_template, user_message, prompt,
+                _is_valid_json_response, json_mode=True, stage="triage"
+            )
+        triage_info = json.loads(triage_response)
+    except Exception as e:
+        print(f"Error during triage: {e}")
+        return None
+    if not isinstance(triage_info, dict) or "is_housing" not in triage_info:
+        print("Warning: Triage response is missing 'is_housing'.")
+        return None
+    return triage_info
+
+async def _route_and_analyze_split_async(user_message, session_id):
+    routing_task = asyncio.create_task(is_housing_policy_question_async(user_message))
+    analysis_task = asyncio.create_task(analyze_turn_async(user_message, session_id))
+    try:
+        is_housing = await routing_task
+    except BaseException:
+        analysis_task.cancel()
+        raise
+
+    if not is_housing:
+        analysis_task.cancel()
+        return False, None, None
+
+    analysis_info = await analysis_task
+    user_profile, search_query = await asyncio.to_thread(_apply_analysis_info, user_message, session_id, analysis_info)
+    return True, user_profile, search_query
+
+async def _route_and_analyze_combined_async(user_message, session_id):
+    # 확실히 범위 밖인 질문은 triage 호출 없이 종료 (yes인 경우에도 분석 결과가 필요하므로 triage 호출)
+    if _fast_route(user_message) is False:
+        return False, None, None
+    if INCREMENTAL_ANALYSIS and await asyncio.to_thread(_get_current_profile, session_id) != "정보 없음":
+        # 프로필이 있으면 전체 triage 대신 라우팅 + 증분 분석 (split 경로)
+        return await _route_and_analyze_split_async(user_message, session_id)
+    triage_info = await triage_user_message_async(user_message)
+    if triage_info is None:
+        # triage 실패 시 기존 두 번 호출 경로로 처리
+        logger.warning("[Triage] triage 호출 실패 -> split 경로로 전환")
+        return await _route_and_analyze_split_async(user_message, session_id)
+
+    if not _parse_is_housing(triage_info.get("is_housing")):
+        return False, None, None
+    user_profile, search_query = await asyncio.to_thread(_apply_analysis_info, user_message, session_id, triage_info)
+    return True, user_profile, search_query
+
+async def route_and_analyze_async(user_message, session_id, mode=None):
+    """라우팅과 프로필/쿼리 분석 수행
     
-    if current_user_profile == "정보 없음":
-        try:
-            prompt = initial_analysis_prompt.format(user_input=user_message)
-            analysis_response = call_llm_via_ask(prompt)
-            initial_info = json.loads(analysis_response)
-            extracted_profile = initial_info.get("user_profile")
-            if extracted_profile and extracted_profile != "정보 없음":
-                user_profiles_db[session_id] = user_profiles_db.get(session_id, {})
-                user_profiles_db[session_id]["user_profile"] = extracted_profile
-                current_user_profile = extracted_profile
-            search_query_from_analysis = initial_info.get("optimized_search_query", user_message)
-        except json.JSONDecodeError:
-            print("Warning: Initial analysis did not return valid JSON.")
-            search_query_from_analysis = user_message
-        except Exception as e:
-            print(f"Error during initial analysis: {e}")
-            search_query_from_analysis = user_message
-    else:
-        try:
-            prompt = initial_analysis_prompt.format(user_input=user_message)
-            analysis_response = call_llm_via_ask(prompt)
-            initial_info = json.loads(analysis_response)
-            search_query_from_analysis = initial_info.get("optimized_search_query", user_message)
-        except (json.JSONDecodeError, Exception):
-            search_query_from_analysis = user_message
+    - split: 라우팅/분석 두 호출을 동시에 시작하고, 라우팅 결과가 'no'이면
+      진행 중인 분석 호출을 취소한다. 분석 결과는 'yes'일 때만 프로필에 반영된다.
+    - combined: triage 프롬프트 한 번(JSON 모드)으로 두 결과를 함께 받는다.
     
-    return current_user_profile, search_query_from_analysis
-
-def create_fallback_answer(user_profile, chat_history, question, search_query):
-    logger.warning(f"[Fallback] Fallback 답변 생성 시작 - 질문: '{question}', 검색쿼리: '{search_query}'")
+    mode를 생략하면 TRIAGE_MODE 환경변수를 따른다.
     
-    # return "죄송합니다. 해당 질문에 관련된 정책 문서를 찾을 수 없습니다.", []
-    # fallback 프롬프트 구성
-    # fallback_prompt_template = """
-    #         너는 '서울시 청년 주거 정책 전문 AI'야. 사용자의 질문에 대해 정확하게 대응되는 정책 문서를 찾지 못했지만, 사용자의 상황이 청년 주거와 관련 있다고 판단된다면 아래 지침에 따라 유사 정책을 제안해줘.
-
-    #         ---
-    #         # USER PROFILE #
-    #         {user_profile_data}
-
-    #         # USER'S QUESTION #
-    #         {question}
-
-    #         # CHAT HISTORY #
-    #         {chat_history}
-            
-    #         # SEARCH QUERY #
-    #         {search_query}
-
-    #         **답변 구조:**
-    #         1. **공감적 인사말**: 사용자의 상황에 공감하는 따뜻한 인사말
-    #         2. **정책 제안**: 유사한 정책 1-2개를 상세히 소개
-    #         3. **대화 마무리**: 추가 질문을 유도하는 마무리
-    #         4. 사용자의 상황에 공감하는 말투를 사용하되, 전문적이고 신뢰감 있게 말해줘.
-    #         5. 반드시 한국어로만 응답하고, 영어는 포함하지 마.
-    #         6. 하나의 정책만 추천해도 되지만, 최대 2~3개까지 포함할 수 있어.
-            
-    #         **상세 지침:**
-    #         1. **공감적 인사말**: "안녕하세요! [사용자 상황]을 고민하고 계시는군요." 형식으로 시작
-    #         2. **정책 소개**: 각 정책을 다음 형식으로 구조화:
-    #            - ✅ 정책명
-    #            - 📝 설명: 정책의 핵심 내용
-    #            - 🎯 지원대상: 구체적인 자격 요건
-    #            - 💡 신청방법: 단계별 신청 절차
-    #            - 📞 문의: 연락처 정보
-    #            - 🔗 관련링크: `<a href="URL" target="_blank">자세히 보기</a>` 형식
-    #         3. **이모지 활용**: ✅📝🎯💡📞🔗 등 적절한 이모지 사용
-    #         4. **대화 마무리**: "혹시 [관련 주제]에 궁금한 점이나 다른 고민이 있으신가요? 편하게 말씀해주세요!" 형식으로 마무리
-    #         5. **친근함**: 전문적이면서도 따뜻하고 공감하는 톤 유지
-    #         6. **간결성**: 핵심 정보 위주로 명확하게 전달
-
-
-    #         출력은 응답 본문만 자연스럽게 생성해줘. 메타 정보나 JSON 없이 대화체로 작성해.
-    #     """
-    fallback_prompt_template = """
-            너는 '서울시 청년 주거 정책 전문 AI'야. 사용자의 질문에 대해 정확하게 대응되는 정책 문서를 찾지 못했지만, 사용자의 상황이 청년 주거와 관련 있다고 판단된다면 아래 지침에 따라 유사 정책을 제안해줘.
+    Returns:
+        (is_housing, user_profile, search_query) - is_housing이 False이면 나머지는 None
+    """
+    mode = (mode or TRIAGE_MODE).lower()
+    start = time.perf_counter()
+    with stage_timer("route_and_analyze"):
+        if mode == "combined":
+            result = await _route_and_analyze_combined_async(user_message, session_id)
+        else:
+            result = await _route_and_analyze_split_async(user_message, session_id)
+    # split/combined 지연시간 비교용 로그
+    logger.info(f"[Triage] mode={mode}, is_housing={result[0]}, 소요시간={time.perf_counter() - start:.3f}s")
+    return result
+
+
+# return "죄송합니다. 해당 질문에 관련된 정책 문서를 찾을 수 없습니다.", []
+# fallback 프롬프트 구성
+# fallback_prompt_template = """
+#         너는 '서울시 청년 주거 정책 전문 AI'야. 사용자의 질문에 대해 정확하게 대응되는 정책 문서를 찾지 못했지만, 사용자의 상황이 청년 주거와 관련 있다고 판단된다면 아래 지침에 따라 유사 정책을 제안해줘.
+
+#         ---
+#         # USER PROFILE #
+#         {user_profile_data}
+
+#         # USER'S QUESTION #
+#         {question}
+
+#         # CHAT HISTORY #
+#         {chat_history}
+        
+#         # SEARCH QUERY #
+#         {search_query}
+
+#         **답변 구조:**
+#         1. **공감적 인사말**: 사용자의 상황에 공감하는 따뜻한 인사말
+#         2. **정책 제안**: 유사한 정책 1-2개를 상세히 소개
+#         3. **대화 마무리**: 추가 질문을 유도하는 마무리
+#         4. 사용자의 상황에 공감하는 말투를 사용하되, 전문적이고 신뢰감 있게 말해줘.
+#         5. 반드시 한국어로만 응답하고, 영어는 포함하지 마.
+#         6. 하나의 정책만 추천해도 되지만, 최대 2~3개까지 포함할 수 있어.
+        
+#         **상세 지침:**
+#         1. **공감적 인사말**: "안녕하세요! [사용자 상황]을 고민하고 계시는군요." 형식으로 시작
+#         2. **정책 소개**: 각 정책을 다음 형식으로 구조화:
+#            - ✅ 정책명
+#            - 📝 설명: 정책의 핵심 내용
+#            - 🎯 지원대상: 구체적인 자격 요건
+#            - 💡 신청방법: 단계별 신청 절차
+#            - 📞 문의: 연락처 정보
+#            - 🔗 관련링크: `<a href="URL" target="_blank">자세히 보기</a>` 형식
+#         3. **이모지 활용**: ✅📝🎯💡📞🔗 등 적절한 이모지 사용
+#         4. **대화 마무리**: "혹시 [관련 주제]에 궁금한 점이나 다른 고민이 있으신가요? 편하게 말씀해주세요!" 형식으로 마무리
+#         5. **친근함**: 전문적이면서도 따뜻하고 공감하는 톤 유지
+#         6. **간결성**: 핵심 정보 위주로 명확하게 전달
+
+
+#         출력은 응답 본문만 자연스럽게 생성해줘. 메타 정보나 JSON 없이 대화체로 작성해.
+#     """
+fallback_prompt_template = """
+        너는 '서울시 청년 주거 정책 전문 AI'야. 사용자의 질문에 대해 정확하게 대응되는 정책 문서를 찾지 못했지만, 사용자의 상황이 청년 주거와 관련 있다고 판단된다면 아래 지침에 따라 유사 정책을 제안해줘.
  
-            ---
-            # USER PROFILE #
-            {user_profile_data}
+        ---
+        # USER PROFILE #
+        {user_profile_data}
  
-            # USER'S QUESTION #
-            {question}
+        # USER'S QUESTION #
+        {question}
  
-            # CHAT HISTORY #
-            {chat_history}
-           
-            # SEARCH QUERY #
-            {search_query}
+        # CHAT HISTORY #
+        {chat_history}
+       
+        # SEARCH QUERY #
+        {search_query}
  
-            **Response Structure:**
+        **Response Structure:**
  
-            1. **Empathetic Greeting**: Begin with a warm greeting that acknowledges the user's situation.
-            2. **Policy Recommendation**: Introduce 1–2 relevant policies with clear and helpful details.
-            3. **Closing Statement**: End with an encouraging prompt to continue the conversation.
-            4. Maintain a compassionate and professional tone that reflects the user's situation.
-            5. The response must be written entirely in Korean—do not include English.
-            6. You may recommend just one policy, but up to 2–3 policies are allowed.
+        1. **Empathetic Greeting**: Begin with a warm greeting that acknowledges the user's situation.
+        2. **Policy Recommendation**: Introduce 1–2 relevant policies with clear and helpful details.
+        3. **Closing Statement**: End with an encouraging prompt to continue the conversation.
+        4. Maintain a compassionate and professional tone that reflects the user's situation.
+        5. The response must be written entirely in Korean—do not include English.
+        6. You may recommend just one policy, but up to 2–3 policies are allowed.
  
-            **Detailed Guidelines:**
+        **Detailed Guidelines:**
  
-            1. **Empathetic Greeting**: Start with a phrase like:  
-            _"안녕하세요! [User's situation]을 고민하고 계시는군요."_
+        1. **Empathetic Greeting**: Start with a phrase like:  
+        _"안녕하세요! [User's situation]을 고민하고 계시는군요."_
  
-            2. **Policy Details**: Structure each recommended policy as follows:
-            - ✅ **Policy Name**
-            - 📝 **Description**: Brief summary of the policy's core purpose
-            - 🎯 **Target Beneficiaries**: Who qualifies for the support
-            - 💡 **Application Method**: How to apply (steps or channels)
-            - 📞 **Contact Info**: Where to get more help
-            - 🔗 **Link**: Use this format:  
-                `<a href="URL" target="_blank">자세히 보기</a>`  
-                ✅ **Use only if a URL is explicitly provided in the retrieved documents. Do not fabricate or guess.**
+        2. **Policy Details**: Structure each recommended policy as follows:
+        - ✅ **Policy Name**
+        - 📝 **Description**: Brief summary of the policy's core purpose
+        - 🎯 **Target Beneficiaries**: Who qualifies for the support
+        - 💡 **Application Method**: How to apply (steps or channels)
+        - 📞 **Contact Info**: Where to get more help
+        - 🔗 **Link**: Use this format:  
+            `<a href="URL" target="_blank">자세히 보기</a>`  
+            ✅ **Use only if a URL is explicitly provided in the retrieved documents. Do not fabricate or guess.**
  
-            3. **Emoji Usage**: Use emojis like ✅📝🎯💡📞🔗 to improve readability.
+        3. **Emoji Usage**: Use emojis like ✅📝🎯💡📞🔗 to improve readability.
  
-            4. **Closing Prompt**: Finish with a sentence like:  
-            _"혹시 [related topic]에 궁금한 점이나 다른 고민이 있으신가요? 편하게 말씀해주세요!"_
+        4. **Closing Prompt**: Finish with a sentence like:  
+        _"혹시 [related topic]에 궁금한 점이나 다른 고민이 있으신가요? 편하게 말씀해주세요!"_
  
-            5. **Tone**: Maintain a warm, empathetic, and professional tone throughout.
+        5. **Tone**: Maintain a warm, empathetic, and professional tone throughout.
  
-            6. **Clarity**: Keep the response clear and concise, focusing on the most relevant information.
+        6. **Clarity**: Keep the response clear and concise, focusing on the most relevant information.
  
-            7. **Source Fidelity (NO Hallucination)**:
-            ⚠️ You **must only use content from the retrieved policy documents**.  
-            Do not fabricate or invent policy details, eligibility criteria, contact information, or URLs.  
-            If no relevant policy information is available, fall back to a supportive and empathetic message using the fallback prompt logic.
+        7. **Source Fidelity (NO Hallucination)**:
+        ⚠️ You **must only use content from the retrieved policy documents**.  
+        Do not fabricate or invent policy details, eligibility criteria, contact information, or URLs.  
+        If no relevant policy information is available, fall back to a supportive and empathetic message using the fallback prompt logic.
  
-            8. Only return the final Korean response text. Do not include metadata, JSON, or formatting instructions.
+        8. Only return the final Korean response text. Do not include metadata, JSON, or formatting instructions.
  
-        """
-    fallback_prompt = fallback_prompt_template.format(
+    """
+
+def _build_fallback_prompt(user_profile, chat_history, question, search_query):
+    # 대화 기록은 토큰 예산(PROMPT_BUDGET_FALLBACK)에 맞춰 압축
+    prompt, _ = build_prompt(
+        fallback_prompt_template, "fallback", chat_history,
         user_profile_data=user_profile,
-        chat_history=chat_history,
         question=question,
         search_query=search_query
     )
-    fallback_answer = call_llm_via_ask(fallback_prompt)
+    return prompt
+
+def create_fallback_answer(user_profile, chat_history, question, search_query):
+    logger.warning(f"[Fallback] Fallback 답변 생성 시작 - 질문: '{question}', 검색쿼리: '{search_query}'")
+    
+    fallback_prompt = _build_fallback_prompt(user_profile, chat_history, question, search_query)
+    fallback_answer = call_llm_via_ask(fallback_prompt, stage="fallback")
+    
+    logger.info(f"[Fallback] Fallback 답변 생성 완료 (응답 길이: {len(fallback_answer)}자)")
+    logger.info(f"[Fallback] Fallback 답변 내용: {fallback_answer[:200]}...")
+    
+    return fallback_answer, []
+
+async def create_fallback_answer_async(user_profile, chat_history, question, search_query):
+    """create_fallback_answer의 비동기 버전"""
+    logger.warning(f"[Fallback] Fallback 답변 생성 시작 - 질문: '{question}', 검색쿼리: '{search_query}'")
+    
+    fallback_prompt = _build_fallback_prompt(user_profile, chat_history, question, search_query)
+    with stage_timer("fallback"):
+        fallback_answer = await call_llm_via_ask_async(fallback_prompt, stage="fallback")
     
     logger.info(f"[Fallback] Fallback 답변 생성 완료 (응답 길이: {len(fallback_answer)}자)")
     logger.info(f"[Fallback] Fallback 답변 내용: {fallback_answer[:200]}...")
@@ -278,97 +601,325 @@ def create_fallback_answer(user_profile, chat_history, question, search_query):
     return fallback_answer, []
 
 
+def _get_search_terms(question, search_query):
+    # search_query를 우선 사용하고, 없으면 question 사용
+    return search_query if search_query and search_query.strip() else question
+
+def _build_qa_prompt(user_profile, chat_history, top_docs, question, search_query):
+    # 대화 기록 압축 + 정책 필드 단위 컨텍스트로 토큰 예산(PROMPT_BUDGET_QA)에 맞춤
+    prompt, _ = build_prompt(
+        QA_PROMPT, "qa", chat_history, docs=top_docs,
+        user_profile_data=user_profile,
+        question=question,
+        search_query=search_query
+    )
+    return prompt
+
+def _build_remaining_list(remaining_docs):
+    remaining_list = []
+    for doc in remaining_docs:
+        # 색인 시 파싱해 둔 메타데이터 사용 (없으면 본문 파싱)
+        fields = get_policy_fields(doc)
+        remaining_list.append({
+            "title": fields["policy_name"] or "정책 정보",
+            "url": fields["url"]
+        })
+        
+    logger.info(f"[QA Chain] remaining_list: {remaining_list}")
+    return remaining_list
+
+def _doc_cache_id(doc):
+    doc_id = doc.metadata.get("id") or ""
+    return f"{doc_id}:{hashlib.sha1(doc.page_content.encode('utf-8')).hexdigest()[:12]}"
+
+def _get_query_embedder(retriever):
+    """리트리버가 사용하는 임베딩 객체 반환 (없으면 None)"""
+    embeddings = getattr(retriever, "embeddings", None)
+    if embeddings is None:
+        embeddings = getattr(getattr(retriever, "vectorstore", None), "embeddings", None)
+    return embeddings
+
+def _answer_cache_lookup(retriever, search_terms, docs, user_profile, chat_history=None):
+    """시맨틱 캐시 조회. (cached, cache_args) 반환 - cache_args는 저장 시 재사용"""
+    if not ANSWER_CACHE_ENABLED:
+        return None, None
+    doc_ids = [_doc_cache_id(doc) for doc in docs]
+    history = history_fingerprint(chat_history)
+    # 정책명 일치(어휘 검색 shortcut)는 임베딩 없이 검색했으므로 캐시도 문서 id만으로 조회
+    is_shortcut = getattr(retriever, "is_lexical_shortcut", None)
+    if is_shortcut is not None and is_shortcut(search_terms):
+        cache_args = (None, doc_ids, user_profile, history)
+        return answer_cache.get(*cache_args), cache_args
+    embeddings = _get_query_embedder(retriever)
+    if embeddings is None:
+        return None, None
+    try:
+        query_embedding = embeddings.embed_query(search_terms)
+    except Exception as e:
+        logger.warning(f"[AnswerCache] 쿼리 임베딩 실패: {e}")
+        return None, None
+    cache_args = (query_embedding, doc_ids, user_profile, history)
+    return answer_cache.get(*cache_args), cache_args
+
+def _answer_cache_store(cache_args, answer, remaining_list):
+    if cache_args is not None:
+        answer_cache.put(*cache_args, answer, remaining_list)
+
 def create_qa_chain(retriever, memory, user_profile, question, search_query):
     """최종 응답을 생성하고 레퍼런스 문서도 분리해서 리턴"""
     # QA 프롬프트를 /ask API로 호출하여 답변 생성
     # 메모리에서 대화 이력 불러오기
     chat_history = memory.load_memory_variables({})["chat_history"]
     
-    # 리트리버로 문서 검색 - search_query를 우선 사용하고, 없으면 question 사용
-    search_terms = search_query if search_query and search_query.strip() else question
+    # 리트리버로 문서 검색
+    search_terms = _get_search_terms(question, search_query)
     logger.info(f"[QA Chain] 검색 쿼리: '{search_terms}' (원본 질문: '{question}')")
     
-    docs = retriever.get_relevant_documents(search_terms)
-    logger.info(f"[QA Chain] 검색된 문서 수: {len(docs)}")
+    scored_docs = retrieve_with_scores(retriever, search_terms)
+    docs = [doc for doc, _ in scored_docs]
+    logger.info(f"[QA Chain] 검색된 문서 수: {len(docs)} ({format_scores(scored_docs)})")
     
     if not docs:
         logger.warning(f"[QA Chain] 문서를 찾지 못함 -> Fallback으로 전환")
         return create_fallback_answer(user_profile, chat_history, question, search_query)
     
-    # 벡터DB 검색 결과 중 상위 3개 문서 선택히여 필터링 
-    top3_docs, remaining_docs = filter_documents_by_score(docs, top_n=3)
-    context = "\n\n".join([doc.page_content for doc in top3_docs])
+    # 같은 문서 집합/프로필에 대한 유사 질문이면 캐시된 답변 사용
+    cached, cache_args = _answer_cache_lookup(retriever, search_terms, docs, user_profile, chat_history)
+    if cached is not None:
+        answer, remaining_list = cached
+        memory.save_context({"input": question}, {"output": answer})
+        return answer, remaining_list
     
-    logger.info(f"[QA Chain] 상위 문서 수: {len(top3_docs)}, 나머지 문서 수: {len(remaining_docs)}")
+    # 검색 점수 분포로 프롬프트에 넣을 정책 수 결정 (나머지는 참고 목록)
+    top_docs, remaining_docs = select_context(scored_docs)
+    logger.info(f"[QA Chain] 상위 문서 수: {len(top_docs)}, 나머지 문서 수: {len(remaining_docs)}")
 
     # QA 프롬프트 구성
-    prompt = QA_PROMPT.format(
-        user_profile_data=user_profile,
-        chat_history=chat_history,
-        context=context,
-        question=question,
-        search_query=search_query
-    )
-    answer = call_llm_via_ask(prompt)
+    prompt = _build_qa_prompt(user_profile, chat_history, top_docs, question, search_query)
+    answer = call_llm_via_ask(prompt, stage="qa")
     
     logger.info(f"[QA Chain] 정상 응답 생성 완료 (응답 길이: {len(answer)}자)")
 
     # 메모리에 현재 질문/응답 저장
     memory.save_context({"input": question}, {"output": answer})
     
-    remaining_list = []
-    for doc in remaining_docs:
-        # 정책명 추출
-        match = re.search(r'정책명:([^\n]+)', doc.page_content)
-        title = match.group(1).strip() if match else "정책 정보"
-        # 관련링크 추출
-        url_match = re.search(r'관련링크: *([^\n\s]+)', doc.page_content)
-        url = url_match.group(1).strip() if url_match else ""
-        remaining_list.append({
-            "title": title,
-            "url": url
-        })
-        
-    logger.info(f"[QA Chain] remaining_list: {remaining_list}")
-
+    remaining_list = _build_remaining_list(remaining_docs)
+    _answer_cache_store(cache_args, answer, remaining_list)
     return answer, remaining_list  # 레퍼런스 문서도 분리해서 리턴
 
+async def _retrieve_documents_async(retriever, question, search_query, speculation=None):
+    """검색 결과를 (Document, score) 목록으로 반환
+
+    speculation(원문 메시지로 미리 시작한 검색)이 있으면 최종 쿼리에 재사용할 수 있는지 먼저 확인
+    """
+    search_terms = _get_search_terms(question, search_query)
+    logger.info(f"[QA Chain] 검색 쿼리: '{search_terms}' (원본 질문: '{question}')")
+    
+    # 임베딩 요청 + 벡터 검색은 동기 코드이므로 이벤트 루프 밖에서 실행
+    with stage_timer("retrieval"):
+        scored_docs = await speculation.resolve(search_terms) if speculation is not None else None
+        if scored_docs is None:
+            scored_docs = await asyncio.to_thread(retrieve_with_scores, retriever, search_terms)
+    logger.info(f"[QA Chain] 검색된 문서 수: {len(scored_docs)} ({format_scores(scored_docs)})")
+    return scored_docs
+
+async def create_qa_chain_async(retriever, memory, user_profile, question, search_query, speculation=None):
+    """create_qa_chain의 비동기 버전 (리트리버 검색은 스레드에서 실행)"""
+    chat_history = memory.load_memory_variables({})["chat_history"]
+    
+    scored_docs = await _retrieve_documents_async(retriever, question, search_query, speculation)
+    docs = [doc for doc, _ in scored_docs]
+    
+    if not docs:
+        logger.warning(f"[QA Chain] 문서를 찾지 못함 -> Fallback으로 전환")
+        return await create_fallback_answer_async(user_profile, chat_history, question, search_query)
+    
+    search_terms = _get_search_terms(question, search_query)
+    with stage_timer("answer_cache"):
+        cached, cache_args = await asyncio.to_thread(
+            _answer_cache_lookup, retriever, search_terms, docs, user_profile, chat_history
+        )
+    if cached is not None:
+        answer, remaining_list = cached
+        memory.save_context({"input": question}, {"output": answer})
+        return answer, remaining_list
+    
+    top_docs, remaining_docs = select_context(scored_docs)
+    logger.info(f"[QA Chain] 상위 문서 수: {len(top_docs)}, 나머지 문서 수: {len(remaining_docs)}")
+
+    prompt = _build_qa_prompt(user_profile, chat_history, top_docs, question, search_query)
+    with stage_timer("qa_generation"):
+        answer = await call_llm_via_ask_async(prompt, stage="qa")
+    
+    logger.info(f"[QA Chain] 정상 응답 생성 완료 (응답 길이: {len(answer)}자)")
+
+    memory.save_context({"input": question}, {"output": answer})
+    
+    remaining_list = _build_remaining_list(remaining_docs)
+    _answer_cache_store(cache_args, answer, remaining_list)
+    return answer, remaining_list
+
+async def stream_qa_chain_async(retriever, memory, user_profile, question, search_query, speculation=None):
+    """create_qa_chain_async의 스트리밍 버전 (async generator)
+    
+    생성되는 대로 {"type": "token", "text": ...} 이벤트를 내보내고,
+    마지막에 {"type": "done", "remaining_docs": [...]} 이벤트를 내보낸다.
+    대화 메모리는 스트림이 끝까지 완료된 경우에만 저장한다.
+    """
+    chat_history = memory.load_memory_variables({})["chat_history"]
+    
+    scored_docs = await _retrieve_documents_async(retriever, question, search_query, speculation)
+    docs = [doc for doc, _ in scored_docs]
+    
+    cache_args = None
+    if not docs:
+        logger.warning(f"[QA Chain] 문서를 찾지 못함 -> Fallback으로 전환")
+        stage = "fallback"
+        prompt = _build_fallback_prompt(user_profile, chat_history, question, search_query)
+        remaining_docs = []
+    else:
+        search_terms = _get_search_terms(question, search_query)
+        with stage_timer("answer_cache"):
+            cached, cache_args = await asyncio.to_thread(
+                _answer_cache_lookup, retriever, search_terms, docs, user_profile, chat_history
+            )
+        if cached is not None:
+            # 캐시 적중: 답변 전체를 한 번에 내보냄
+            answer, remaining_list = cached
+            yield {"type": "token", "text": answer}
+            memory.save_context({"input": question}, {"output": answer})
+            yield {"type": "done", "remaining_docs": remaining_list}
+            return
+        stage = "qa"
+        top_docs, remaining_docs = select_context(scored_docs)
+        logger.info(f"[QA Chain] 상위 문서 수: {len(top_docs)}, 나머지 문서 수: {len(remaining_docs)}")
+        prompt = _build_qa_prompt(user_profile, chat_history, top_docs, question, search_query)
+    
+    chunks = []
+    # 스트리밍 구간에는 클라이언트 전송 대기도 섞이므로 첫 토큰까지 시간도 따로 기록
+    generation_start = time.perf_counter()
+    with stage_timer("qa_generation" if stage == "qa" else "fallback"):
+        async for delta in stream_llm_via_ask(prompt, stage=stage):
+            if not chunks:
+                STAGE_SECONDS.observe(time.perf_counter() - generation_start, stage=f"{stage}_first_token")
+            chunks.append(delta)
+            yield {"type": "token", "text": delta}
+    answer = "".join(chunks)
+    
+    logger.info(f"[QA Chain] 스트리밍 응답 생성 완료 ({stage}, 응답 길이: {len(answer)}자)")
+
+    memory.save_context({"input": question}, {"output": answer})
+    
+    remaining_list = _build_remaining_list(remaining_docs) if remaining_docs else []
+    _answer_cache_store(cache_args, answer, remaining_list)
+    yield {"type": "done", "remaining_docs": remaining_list}
+
 def get_active_sessions_count():
     """활성 세션 수 반환"""
-    return len(session_memories)
+    return len(session_store)
+
+# 주거 정책 질문 판단 (yes/no) 
+# 벡터DB 언어와 맞춰서 한국어로 작성 ("주거 정책", "전세자금 대출", "신혼부부" 등 키워드 접근성)
+routing_prompt_template = """
+아래 질문이 주거 정책과 관련된 질문인지 판단해주세요. 반드시 yes 또는 no로만 대답해주세요.
+
+[주거 정책 정의]
+주거 정책은 일반적으로 다음과 같은 주거 관련 지원을 포함합니다:
+- 전세자금, 월세 지원
+- 임대주택 공급
+- 자립 지원 주거
+- 신혼부부, 사회초년생 대상 주택 지원
+- 주거급여, 이사비, 보증금 등 주거비용 부담 완화
+
+[예시]
+Q: 전세보증금을 못 돌려받았어요 → yes  
+Q: 자취하고 싶은데 돈이 없어요 → yes  
+Q: 20대 청년 주거 지원정책이 있나요? → yes  
+Q: 신혼부부를 위한 주택 정책은 어떤 게 있어요? → yes  
+Q: 부동산 시장 전망은? → no  
+Q: 종합부동산세 줄일 수 있나요? → no  
+Q: 중장년 주거복지에 대해 알려줘 → no  
 
-def is_housing_policy_question(question: str) -> bool:
-    # 주거 정책 질문 판단 (yes/no) 
-    # 벡터DB 언어와 맞춰서 한국어로 작성 ("주거 정책", "전세자금 대출", "신혼부부" 등 키워드 접근성)
-    routing_prompt = """
-    아래 질문이 주거 정책과 관련된 질문인지 판단해주세요. 반드시 yes 또는 no로만 대답해주세요.
-
-    [주거 정책 정의]
-    주거 정책은 일반적으로 다음과 같은 주거 관련 지원을 포함합니다:
-    - 전세자금, 월세 지원
-    - 임대주택 공급
-    - 자립 지원 주거
-    - 신혼부부, 사회초년생 대상 주택 지원
-    - 주거급여, 이사비, 보증금 등 주거비용 부담 완화
-
-    [예시]
-    Q: 전세보증금을 못 돌려받았어요 → yes  
-    Q: 자취하고 싶은데 돈이 없어요 → yes  
-    Q: 20대 청년 주거 지원정책이 있나요? → yes  
-    Q: 신혼부부를 위한 주택 정책은 어떤 게 있어요? → yes  
-    Q: 부동산 시장 전망은? → no  
-    Q: 종합부동산세 줄일 수 있나요? → no  
-    Q: 중장년 주거복지에 대해 알려줘 → no  
-
-    ---
-    Q: {question}
-    A:
-    """.strip()
-
-    response = call_llm_via_ask(routing_prompt.format(question=question))
+---
+Q: {question}
+A:
+""".strip()
+
+# 확실한 질문은 LLM 없이 판단하는 로컬 사전 분류기 (라우팅 프롬프트 예시 + test/questions.txt로 학습)
+fast_router = FastRouter.from_routing_prompt(
+    routing_prompt_template,
+    os.path.join(os.path.dirname(__file__), '../test/questions.txt')
+) if FAST_ROUTER_ENABLED else None
+
+def _fast_route(question):
+    """로컬 분류 결과 (True/False) 또는 None (LLM 라우팅 필요)"""
+    if fast_router is None:
+        return None
+    decision = fast_router.classify(question)
+    if decision is not None:
+        logger.info(f"[FastRouter] LLM 호출 없이 판단: {'yes' if decision else 'no'}")
+    return decision
+
+def _parse_routing_response(response: str) -> bool:
     return response.strip().lower().startswith("yes")
 
-def filter_documents_by_score(docs, top_n=3):
-    # 문서 필터링 함수 (벡터DB 검색 결과 중 상위 3개 문서 선택)
-    sorted_docs = sorted(docs, key=lambda d: -d.metadata.get("score", 0))
-    return sorted_docs[:top_n], sorted_docs[top_n:]
\ No newline at end of file
+def _is_valid_routing_response(response):
+    return response.strip().lower().startswith(("yes", "no"))
+
+def is_housing_policy_question(question: str) -> bool:
+    decision = _fast_route(question)
+    if decision is not None:
+        return decision
+    response = _cached_llm_call(
+        "routing", routing_prompt_template, question, routing_prompt_template.format(question=question),
+        _is_valid_routing_response, stage="routing"
+    )
+    return _parse_routing_response(response)
+
+async def is_housing_policy_question_async(question: str) -> bool:
+    """is_housing_policy_question의 비동기 버전"""
+    with stage_timer("routing"):
+        decision = _fast_route(question)
+        if decision is not None:
+            return decision
+        return await _route_with_llm_async(question)
+
+async def _route_with_llm_async(question: str) -> bool:
+    response = await _cached_llm_call_async(
+        "routing", routing_prompt_template, question, routing_prompt_template.format(question=question),
+        _is_valid_routing_response, stage="routing"
+    )
+    return _parse_routing_response(response)
+
+def load_warmup_questions(path):
+    """캐시 워밍용 질문 목록 로드 (한 줄에 질문 하나)"""
+    if not os.path.exists(path):
+        print(f"Warning: Warmup question file not found at {path}")
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [q.strip() for q in f if q.strip()]
+
+async def warm_llm_cache_async(questions, concurrency=4):
+    """자주 묻는 질문의 라우팅/분석 결과를 미리 캐시에 채움 (이미 있으면 LLM 호출 없음)"""
+    if not LLM_CACHE_ENABLED or not questions:
+        return 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(question):
+        async with semaphore:
+            try:
+                if TRIAGE_MODE == "combined":
+                    await triage_user_message_async(question)
+                else:
+                    # 사전 분류기 통계에 섞이지 않도록 LLM 라우팅 캐시를 직접 채움
+                    await asyncio.gather(
+                        _route_with_llm_async(question),
+                        analyze_user_message_async(question)
+                    )
+            except Exception as e:
+                logger.warning(f"[LLMCache] 워밍 실패 ('{question}'): {e}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(warm(q) for q in questions))
+    logger.info(f"[LLMCache] {len(questions)}개 질문 워밍 완료 ({time.perf_counter() - start:.2f}s)")
+    return len(questions)
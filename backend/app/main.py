@@ -2,34 +2,63 @@
 # cd backend
 # python -m app.main
 
-from fastapi import FastAPI
+import time
+
+# 시작 시간 측정 (모듈 import 포함)
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 
 import os
+import sys
 import json
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from .ask_api import router as ask_router
 
 # .env 파일 로드 (개발환경용)
 load_dotenv()
 
 # ChromaDB 텔레메트리 비활성화
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
-# 모듈 import
-from .dataLoader import get_vectorstore_and_retriever
-from .llm_manager import (
-    get_or_create_memory, 
-    extract_user_profile, 
-    create_qa_chain, 
-    get_active_sessions_count,
-    is_housing_policy_question,
-    filter_documents_by_score,
-    create_fallback_answer
+# 가벼운 모듈만 바로 import
+# langchain/chromadb를 끌어오는 dataLoader, llm_manager와 openai/httpx(ask_api), numpy(answer_cache)는
+# 서버가 연결을 받기 시작한 뒤 백그라운드 초기화 작업(initialize_rag)에서 import한다.
+from .llm_cache import llm_cache
+from .metrics import (
+    registry, stage_timer, CHAT_REQUESTS, SERVER_TIMING_ENABLED,
+    start_request_timings, format_server_timing,
 )
+from .profiler import PROFILER_ENABLED, PROFILER_REQUESTED, profile_middleware
 
-app = FastAPI(title="Youth Policy RAG Server", version="1.0.0")
-app.include_router(ask_router)
+@asynccontextmanager
+async def lifespan(app):
+    """무거운 초기화는 백그라운드로 넘기고 바로 연결을 받기 시작. 종료 시 커넥션 풀/저장소 정리"""
+    _record_timing("app_import_sec", _IMPORT_START)
+    app.state.rag_init = asyncio.create_task(initialize_rag())
+    yield
+    # 백그라운드 작업(초기화/워밍, 세션 flush/sweep, 코퍼스 감시)을 먼저 멈춰야 닫힌 클라이언트/DB를 쓰지 않음
+    tasks = [
+        getattr(app.state, name, None)
+        for name in ("rag_init", "corpus_watcher", "session_flusher", "session_sweeper")
+    ]
+    tasks = [task for task in tasks if task is not None and not task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # 초기화 전에 종료되면 import되지 않은 모듈은 정리할 것이 없음
+    ask_api = _loaded_module("ask_api")
+    if ask_api is not None:
+        await ask_api.client_manager.aclose()
+    llm_manager = _loaded_module("llm_manager")
+    if llm_manager is not None:
+        await asyncio.to_thread(llm_manager.session_store.close)
+    await asyncio.to_thread(llm_cache.flush)
+
+app = FastAPI(title="Youth Policy RAG Server", version="1.0.0", lifespan=lifespan)
 
 # CORS 허용 (프론트엔드와 연동 위해)
 app.add_middleware(
@@ -40,13 +69,189 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 벡터스토어 및 리트리버 초기화
-vectorstore, retriever, vectorstore_enabled = get_vectorstore_and_retriever()
+if SERVER_TIMING_ENABLED:
+    @app.middleware("http")
+    async def add_server_timing(request: Request, call_next):
+        """단계별 소요시간을 Server-Timing 헤더로 노출 (SERVER_TIMING=1일 때만 등록)
+
+        헤더는 응답 시작 시점에 보내므로 /chat/stream 에는 첫 바이트 전에 끝난 단계만 포함된다.
+        """
+        timings = start_request_timings()
+        start = time.perf_counter()
+        response = await call_next(request)
+        timings.append(("app", time.perf_counter() - start))
+        response.headers["Server-Timing"] = format_server_timing(timings)
+        response.headers["Timing-Allow-Origin"] = "*"
+        return response
+
+if PROFILER_ENABLED:
+    # 꺼져 있으면 미들웨어 자체를 등록하지 않음 (일반 요청에 추가 비용 없음)
+    app.middleware("http")(profile_middleware)
+elif PROFILER_REQUESTED:
+    print("[Profiler] PROFILER_TOKEN이 설정되지 않아 프로파일러를 켜지 않습니다.")
+
+# 벡터스토어 및 리트리버 (initialize_rag에서 채움)
+vectorstore = None
+retriever = None
+vectorstore_enabled = False
+
+# 초기화 진행 상태 + 단계별 소요시간(초)
+startup_state = {
+    "ready": False,
+    "stage": "starting",
+    "error": None,
+    "timings": {},
+}
+
+# 라우팅/분석 캐시 워밍용 질문 파일
+LLM_CACHE_WARMUP = os.environ.get("LLM_CACHE_WARMUP", "1") == "1"
+LLM_CACHE_WARMUP_FILE = os.environ.get(
+    "LLM_CACHE_WARMUP_FILE",
+    os.path.join(os.path.dirname(__file__), '../test/questions.txt')
+)
+
+NOT_READY_MESSAGE = "[안내] 서버를 준비하고 있습니다. 잠시 후 다시 시도해주세요."
+
+def _loaded_module(name):
+    """이미 import된 app 하위 모듈 (아직 초기화 전이면 None)"""
+    return sys.modules.get(f"{__package__}.{name}")
+
+def _record_timing(name, started):
+    startup_state["timings"][name] = round(time.perf_counter() - started, 3)
+
+def _import_pipeline():
+    """무거운 모듈 import (langchain, chromadb, openai 임베딩, 라우터 학습 등)"""
+    from . import ask_api, answer_cache, dataLoader, llm_manager  # noqa: F401
+    from .prompt_budget import preload_tokenizer
+    # tiktoken 인코딩 로드(첫 실행 시 다운로드)를 첫 요청이 아닌 초기화 단계에서 처리
+    preload_tokenizer()
+
+def _load_index():
+    from .answer_cache import answer_cache
+    from .dataLoader import get_vectorstore_and_retriever, get_index_fingerprint
+    loaded_vectorstore, loaded_retriever, enabled = get_vectorstore_and_retriever()
+    # 벡터스토어 내용이 바뀌었으면 답변 캐시 무효화
+    answer_cache.set_corpus_version(get_index_fingerprint(loaded_vectorstore))
+    return loaded_vectorstore, loaded_retriever, enabled
+
+async def run_corpus_version_watcher(interval):
+    """서버 실행 중 CLI ingest 등으로 색인이 바뀌면 답변 캐시 무효화
+
+    색인 파일 수정 시각이 바뀐 경우에만 벡터스토어 지문을 다시 계산한다.
+    """
+    from .answer_cache import answer_cache
+    from .dataLoader import get_corpus_change_marker, get_index_fingerprint
+    marker = await asyncio.to_thread(get_corpus_change_marker)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            current = await asyncio.to_thread(get_corpus_change_marker)
+            if current == marker:
+                continue
+            marker = current
+            version = await asyncio.to_thread(get_index_fingerprint, vectorstore)
+            answer_cache.set_corpus_version(version)
+        except Exception as e:
+            print(f"[AnswerCache] 코퍼스 버전 확인 실패: {e}")
+
+async def initialize_rag():
+    """서버 시작 후 백그라운드에서 RAG 파이프라인 초기화
+
+    import -> 인덱스 로드 순서로 진행하고 끝나면 /ready가 200을 돌려준다.
+    캐시 워밍은 준비 완료 후 이어서 실행한다 (준비 상태에는 영향 없음).
+    """
+    global vectorstore, retriever, vectorstore_enabled
+    try:
+        startup_state["stage"] = "import"
+        started = time.perf_counter()
+        await asyncio.to_thread(_import_pipeline)
+        _record_timing("import_sec", started)
+
+        from .llm_manager import session_store
+        from .session_store import run_session_sweeper, run_session_flusher
+        app.state.session_sweeper = asyncio.create_task(run_session_sweeper(session_store))
+        # 영속 백엔드(SESSION_BACKEND=sqlite)의 쓰기를 모아서 기록
+        app.state.session_flusher = asyncio.create_task(run_session_flusher(session_store))
+
+        startup_state["stage"] = "index_load"
+        started = time.perf_counter()
+        vectorstore, retriever, vectorstore_enabled = await asyncio.to_thread(_load_index)
+        _record_timing("index_load_sec", started)
+        from .answer_cache import ANSWER_CACHE_CORPUS_CHECK_INTERVAL
+        if ANSWER_CACHE_CORPUS_CHECK_INTERVAL > 0:
+            app.state.corpus_watcher = asyncio.create_task(
+                run_corpus_version_watcher(ANSWER_CACHE_CORPUS_CHECK_INTERVAL)
+            )
+    except Exception as e:
+        startup_state["stage"] = "failed"
+        startup_state["error"] = str(e)
+        print(f"[Startup] 초기화 실패: {e}")
+        return
+
+    startup_state["ready"] = True
+    startup_state["stage"] = "ready"
+    _record_timing("ready_sec", _IMPORT_START)
+    print(f"[Startup] 준비 완료: {startup_state['timings']}")
+
+    # 자주 묻는 질문으로 라우팅/분석 캐시를 채움
+    if LLM_CACHE_WARMUP and os.environ.get("OPENAI_API_KEY"):
+        from .llm_manager import load_warmup_questions, warm_llm_cache_async
+        started = time.perf_counter()
+        await warm_llm_cache_async(load_warmup_questions(LLM_CACHE_WARMUP_FILE))
+        _record_timing("warmup_sec", started)
+        print(f"[Startup] 캐시 워밍 완료: {startup_state['timings']['warmup_sec']}s")
+
+def _collect_runtime_metrics():
+    """/metrics 스크레이프 시점에 캐시/세션/라우터 카운터를 읽어 옴 (초기화 전 모듈은 건너뜀)"""
+    cache_samples = []
+    cache_stats = [("llm", llm_cache.stats())]
+    answer_cache = _loaded_module("answer_cache")
+    if answer_cache is not None:
+        cache_stats.append(("answer", answer_cache.answer_cache.stats()))
+    embedding_cache = _loaded_module("embedding_cache")
+    if embedding_cache is not None and embedding_cache.get_embedding_cache_stats():
+        cache_stats.append(("embedding", embedding_cache.get_embedding_cache_stats()))
+    for name, stats in cache_stats:
+        cache_samples.append(({"cache": name, "result": "hit"}, stats["hits"]))
+        cache_samples.append(({"cache": name, "result": "miss"}, stats["misses"]))
+    families = [
+        ("cache_requests_total", "counter", "Cache lookups by cache and result", cache_samples),
+        ("rag_ready", "gauge", "1 when the RAG pipeline is initialized", [({}, int(startup_state["ready"]))]),
+    ]
+
+    llm_manager = _loaded_module("llm_manager")
+    if llm_manager is not None:
+        families.append(("sessions_active", "gauge", "Sessions held by the session store",
+                         [({}, llm_manager.get_active_sessions_count())]))
+        if llm_manager.fast_router:
+            router_stats = llm_manager.fast_router.stats()
+            families.append(("fast_router_decisions_total", "counter", "Routing decisions by the local classifier", [
+                ({"decision": "yes"}, router_stats["fast_yes"]),
+                ({"decision": "no"}, router_stats["fast_no"]),
+                ({"decision": "deferred"}, router_stats["deferred_to_llm"]),
+            ]))
+        families.append(("analysis_requests_total", "counter", "User message analyses by path",
+                         [({"path": path}, count) for path, count in llm_manager.analysis_stats.items()]))
+    return families
+
+registry.register_collector(_collect_runtime_metrics)
+
+def _not_ready_response():
+    return JSONResponse(
+        status_code=503,
+        content={"response": NOT_READY_MESSAGE, "stage": startup_state["stage"]},
+        headers={"Retry-After": "5"}
+    )
 
 class ChatRequest(BaseModel):
     session_id: str
     user_message: str
 
+class AskRequest(BaseModel):
+    prompt: str
+
+OUT_OF_DOMAIN_MESSAGE = "저는 서울시 청년 주거 정책 전문 AI입니다. 관련된 질문만 답변드릴 수 있어요 🙇‍♀️"
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -54,62 +259,210 @@ async def root():
         "message": "Youth Policy RAG Server",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics"
     }
 
 @app.get("/health")
 async def health_check():
-    """서버 상태 확인"""
+    """서버 상태 확인 (프로세스가 살아 있으면 항상 200, 초기화 중에는 일부 항목만)"""
+    status = {
+        "status": "healthy",
+        "ready": startup_state["ready"],
+        "stage": startup_state["stage"],
+        "rag_enabled": vectorstore_enabled,
+        "llm_cache": llm_cache.stats(),
+    }
+    answer_cache = _loaded_module("answer_cache")
+    if answer_cache is not None:
+        status["answer_cache"] = answer_cache.answer_cache.stats()
+    if not startup_state["ready"]:
+        return status
+
+    from .embedding_cache import get_embedding_cache_stats
+    from .llm_manager import get_active_sessions_count, session_store, fast_router, analysis_stats
     vectorstore_docs = 0
-    if vectorstore and hasattr(vectorstore, '_collection'):
+    if vectorstore is not None and hasattr(vectorstore, '__len__'):
+        vectorstore_docs = len(vectorstore)
+    elif vectorstore and hasattr(vectorstore, '_collection'):
         try:
             vectorstore_docs = vectorstore._collection.count()
         except:
             vectorstore_docs = 0
     
-    return {
-        "status": "healthy", 
+    status.update({
         "vectorstore_docs": vectorstore_docs,
         "active_sessions": get_active_sessions_count(),
-        "rag_enabled": vectorstore_enabled
+        "sessions": session_store.stats(),
+        "embedding_cache": get_embedding_cache_stats(),
+        "fast_router": fast_router.stats() if fast_router else None,
+        "analysis": analysis_stats
+    })
+    return status
+
+@app.get("/ready")
+async def readiness_check():
+    """요청을 처리할 준비가 되었는지 확인 (준비 전/실패 시 503) + 시작 단계별 소요시간"""
+    body = {
+        "ready": startup_state["ready"],
+        "stage": startup_state["stage"],
+        "error": startup_state["error"],
+        "timings": startup_state["timings"],
     }
+    return JSONResponse(status_code=200 if startup_state["ready"] else 503, content=body)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 스크레이프용 메트릭 (단계별 지연 히스토그램, LLM 토큰/재시도, 캐시 적중)"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/ask")
+async def ask_gpt(request: AskRequest):
+    """프롬프트를 LLM에 그대로 전달 (openai 클라이언트는 초기화 작업에서 import되므로 준비 전에는 503)"""
+    if not startup_state["ready"]:
+        return _not_ready_response()
+    from .ask_api import run_llm_async
+    return {"response": await run_llm_async(request.prompt)}
 
 @app.post("/chat")
 async def chat_with_bot(request: ChatRequest):
+    if not startup_state["ready"]:
+        CHAT_REQUESTS.inc(endpoint="chat", outcome="not_ready")
+        return _not_ready_response()
+    with stage_timer("total"):
+        response, outcome = await _answer_chat(request)
+    CHAT_REQUESTS.inc(endpoint="chat", outcome=outcome)
+    return response
+
+async def _answer_chat(request):
+    """/chat 처리 본체. (응답, 결과 구분) 반환"""
+    from .speculative_retrieval import start_speculative_retrieval
     if retriever is None:
-        return {"response": "[오류] 벡터스토어가 초기화되지 않아 RAG 기능을 사용할 수 없습니다."}
+        return {"response": "[오류] 벡터스토어가 초기화되지 않아 RAG 기능을 사용할 수 없습니다."}, "error"
     
     session_id = request.session_id
     user_message = request.user_message
 
-    # Step 1: 주거 정책 관련 질문 여부 판단
-    if not is_housing_policy_question(user_message):
-        return {
-            "response": "저는 서울시 청년 주거 정책 전문 AI입니다. 관련된 질문만 답변드릴 수 있어요 🙇‍♀️"
-        }
+    # 분석을 기다리는 동안 원문 메시지로 미리 검색 (SPECULATIVE_RETRIEVAL=1)
+    speculation = start_speculative_retrieval(retriever, user_message)
+    try:
+        return await _answer_housing_question(session_id, user_message, speculation)
+    finally:
+        if speculation is not None:
+            speculation.discard()
 
-    # Step 2: 사용자 프로필 및 메모리 처리
-    # 세션별 메모리 가져오기
-    memory = get_or_create_memory(session_id)
+async def _answer_housing_question(session_id, user_message, speculation):
+    from .llm_manager import get_or_create_memory, route_and_analyze_async, create_qa_chain_async
 
-    # 사용자 프로필 추출
-    current_user_profile, search_query_from_analysis = extract_user_profile(user_message, session_id)
+    # Step 1: 주거 정책 관련 질문 여부 판단 + 사용자 프로필 추출 (동시 실행)
+    is_housing, current_user_profile, search_query_from_analysis = await route_and_analyze_async(user_message, session_id)
+    if not is_housing:
+        return {
+            "response": OUT_OF_DOMAIN_MESSAGE
+        }, "out_of_domain"
+
+    # Step 2: 세션별 메모리 가져오기
+    memory = await asyncio.to_thread(get_or_create_memory, session_id)
 
     # Step 3: QA 체인 생성 및 답변 생성
     try:
-        answer, remaining_docs = create_qa_chain(
+        answer, remaining_docs = await create_qa_chain_async(
             retriever=retriever, 
             memory=memory, 
             user_profile=current_user_profile, 
             question=user_message, 
-            search_query=search_query_from_analysis
+            search_query=search_query_from_analysis,
+            speculation=speculation
         )
         return {"response": answer,
                 "remaining_docs": remaining_docs
-        }
+        }, "ok"
     except Exception as e:
         print(f"[OpenAI API Error] {e}")
-        return {"response": "[오류] 일시적으로 AI 답변이 불가합니다. 네트워크 또는 OpenAI 서버 연결 문제일 수 있습니다."}
+        return {"response": "[오류] 일시적으로 AI 답변이 불가합니다. 네트워크 또는 OpenAI 서버 연결 문제일 수 있습니다."}, "error"
+
+def _sse_event(event, data):
+    """Server-Sent Events 형식의 메시지 한 건 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/stream")
+async def chat_with_bot_stream(request: ChatRequest):
+    """/chat의 스트리밍 버전 (SSE)
+    
+    - event: token  -> {"text": "..."} (생성되는 대로 전송)
+    - event: done   -> {"remaining_docs": [...], "ttft_sec": 첫 토큰까지 걸린 시간}
+    - event: error  -> {"message": "..."}
+    """
+    if not startup_state["ready"]:
+        CHAT_REQUESTS.inc(endpoint="chat_stream", outcome="not_ready")
+        return _not_ready_response()
+    from .llm_manager import get_or_create_memory, route_and_analyze_async, stream_qa_chain_async
+    from .speculative_retrieval import start_speculative_retrieval
+    start = time.perf_counter()
+    session_id = request.session_id
+    user_message = request.user_message
+
+    async def event_stream():
+        outcome = "error"
+        with stage_timer("total"):
+            async for message in _event_stream():
+                if isinstance(message, tuple):
+                    outcome = message[1]
+                else:
+                    yield message
+        CHAT_REQUESTS.inc(endpoint="chat_stream", outcome=outcome)
+
+    async def _event_stream():
+        """SSE 메시지를 내보내고, 끝에 ("outcome", 결과 구분)을 내보냄"""
+        if retriever is None:
+            yield _sse_event("token", {"text": "[오류] 벡터스토어가 초기화되지 않아 RAG 기능을 사용할 수 없습니다."})
+            yield _sse_event("done", {"remaining_docs": [], "ttft_sec": round(time.perf_counter() - start, 3)})
+            yield ("outcome", "error")
+            return
+
+        ttft = None
+        speculation = start_speculative_retrieval(retriever, user_message)
+        try:
+            is_housing, current_user_profile, search_query_from_analysis = await route_and_analyze_async(user_message, session_id)
+            if not is_housing:
+                yield _sse_event("token", {"text": OUT_OF_DOMAIN_MESSAGE})
+                yield _sse_event("done", {"remaining_docs": [], "ttft_sec": round(time.perf_counter() - start, 3)})
+                yield ("outcome", "out_of_domain")
+                return
+
+            memory = await asyncio.to_thread(get_or_create_memory, session_id)
+            async for event in stream_qa_chain_async(
+                retriever=retriever, 
+                memory=memory, 
+                user_profile=current_user_profile, 
+                question=user_message, 
+                search_query=search_query_from_analysis,
+                speculation=speculation
+            ):
+                if event["type"] == "token":
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                        print(f"[Stream] 첫 토큰까지 {ttft:.3f}s (session={session_id})")
+                    yield _sse_event("token", {"text": event["text"]})
+                else:
+                    yield _sse_event("done", {
+                        "remaining_docs": event["remaining_docs"],
+                        "ttft_sec": round(ttft, 3) if ttft is not None else None
+                    })
+                    yield ("outcome", "ok")
+        except Exception as e:
+            print(f"[OpenAI API Error] {e}")
+            yield _sse_event("error", {"message": "[오류] 일시적으로 AI 답변이 불가합니다. 네트워크 또는 OpenAI 서버 연결 문제일 수 있습니다."})
+        finally:
+            if speculation is not None:
+                speculation.discard()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
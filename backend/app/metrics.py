@@ -0,0 +1,174 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 응답에 Server-Timing 헤더를 붙일지 여부 (브라우저 개발자 도구 Network 탭에서 단계별 시간 확인)
+SERVER_TIMING_ENABLED = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# 초 단위 지연시간 버킷 (LLM 호출은 수 초, 검색/캐시는 수 ms)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 현재 요청의 (단계, 소요시간) 목록 - Server-Timing 헤더용. 요청 밖에서는 None
+_request_timings = ContextVar("request_timings", default=None)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(zip(self.labelnames, key))} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    """고정 버킷 히스토그램. 관측은 bisect 한 번 + 카운터 증가만 수행"""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [버킷별 개수(+Inf 포함), 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(list(zip(self.labelnames, key)) + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(list(zip(self.labelnames, key)))
+            lines.append(f"{self.name}_sum{labels} {total!r}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Prometheus 텍스트 형식으로 내보내는 메트릭 모음
+
+    collector는 스크레이프 시점에 호출되어 [(이름, 타입, 설명, [(라벨 dict, 값)])]을 돌려준다.
+    (캐시 적중 수처럼 이미 다른 객체가 세고 있는 값을 요청 경로에 코드 추가 없이 노출)
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help_text, labelnames=()):
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                lines.append(f"# collector error: {type(e).__name__}: {e}")
+                continue
+            for name, metric_type, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels.items()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# /chat 단계별 소요시간 (routing, analysis, triage, route_and_analyze, retrieval, answer_cache, qa_generation, fallback, total)
+STAGE_SECONDS = registry.histogram("chat_stage_seconds", "Time spent in each /chat pipeline stage", ("stage",))
+CHAT_REQUESTS = registry.counter("chat_requests_total", "Chat requests by endpoint and outcome", ("endpoint", "outcome"))
+LLM_REQUEST_SECONDS = registry.histogram("llm_request_seconds", "OpenAI chat completion latency per call", ("stage",))
+LLM_TOKENS = registry.counter("llm_tokens_total", "Tokens reported by the OpenAI API", ("stage", "kind"))
+LLM_RETRIES = registry.counter("llm_retries_total", "Retried OpenAI calls", ("stage",))
+LLM_ERRORS = registry.counter("llm_errors_total", "OpenAI calls that failed after retries", ("stage",))
+
+@contextmanager
+def stage_timer(stage):
+    """단계 소요시간을 히스토그램에 기록하고, 요청 안이면 Server-Timing용으로도 남김"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def record_llm_usage(stage, usage):
+    """OpenAI 응답의 usage(prompt/completion 토큰 수) 기록"""
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, stage=stage, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, stage=stage, kind="completion")
+
+def start_request_timings():
+    """요청 시작 시 호출. 이후 stage_timer 결과가 반환된 목록에 쌓임"""
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+def format_server_timing(timings):
+    # 같은 단계가 여러 번이면 합산 (예: 재시도)
+    totals = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items())
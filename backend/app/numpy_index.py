@@ -0,0 +1,115 @@
+import math
+import hashlib
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+def cosine_to_relevance(cosine, distance="l2"):
+    """코사인 유사도를 langchain Chroma와 같은 relevance 점수로 변환
+
+    Chroma 기본 공간(l2)은 제곱 L2 거리를 돌려주고, langchain은 1 - d/sqrt(2)로 점수를 만든다.
+    정규화된 벡터에서는 d = 2 - 2cos 이므로 같은 식을 적용하면 score_threshold(0.75)의 의미가
+    Chroma 경로와 동일하게 유지된다.
+    """
+    if distance == "cosine":
+        return cosine
+    return 1.0 - (2.0 - 2.0 * cosine) / math.sqrt(2)
+
+class NumpyVectorIndex:
+    """모든 청크 임베딩을 하나의 float32 행렬로 들고 있는 인메모리 벡터 인덱스
+
+    행렬은 생성 시 한 번만 정규화하고, 검색은 행렬-벡터 곱 한 번 + argpartition으로 처리한다.
+    """
+
+    def __init__(self, matrix, documents, normalized=False, distance="l2"):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(documents):
+            raise ValueError(f"matrix shape {matrix.shape} does not match {len(documents)} documents")
+        if not normalized:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        self.matrix = matrix
+        self.documents = list(documents)
+        self.distance = distance
+        # 스냅샷에서 로드한 경우 버전/임베딩 모델 (app/snapshot.py)
+        self.snapshot_version = None
+        self.embedding_model = None
+
+    def __len__(self):
+        return len(self.documents)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @classmethod
+    def from_documents(cls, documents, embeddings):
+        """문서 청크를 임베딩하여 인덱스 생성 (임베딩 캐시를 거치면 재시작 시 네트워크 호출 없음)"""
+        documents = list(documents)
+        if not documents:
+            return cls(np.zeros((0, 0), dtype=np.float32), [])
+        vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+        return cls(np.asarray(vectors, dtype=np.float32), documents)
+
+    @classmethod
+    def from_chroma(cls, vectorstore):
+        """기존 Chroma 컬렉션에 저장된 임베딩/문서/메타데이터로 인덱스 생성"""
+        data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=text or "", metadata=dict(metadata or {}))
+            for text, metadata in zip(data["documents"], data["metadatas"])
+        ]
+        if not documents:
+            return cls(np.zeros((0, 0), dtype=np.float32), [])
+        return cls(np.asarray(data["embeddings"], dtype=np.float32), documents)
+
+    def search(self, query_vector, k=10, score_threshold=None):
+        """상위 k개 (Document, relevance score) 목록을 점수 내림차순으로 반환"""
+        n = len(self.documents)
+        if n == 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        cosines = self.matrix @ query
+        k = min(k, n)
+        if k < n:
+            top = np.argpartition(-cosines, k - 1)[:k]
+        else:
+            top = np.arange(n)
+        top = top[np.argsort(-cosines[top])]
+        scores = cosine_to_relevance(cosines[top], self.distance)
+        results = []
+        for idx, score in zip(top.tolist(), scores.tolist()):
+            if score_threshold is not None and score < score_threshold:
+                break
+            results.append((self.documents[idx], score))
+        return results
+
+    def fingerprint(self):
+        """인덱스 내용 지문 (답변 캐시 무효화용)"""
+        digest = hashlib.sha256()
+        for doc in self.documents:
+            digest.update(str(doc.metadata.get("id", "")).encode("utf-8"))
+            digest.update(doc.page_content.encode("utf-8"))
+        return digest.hexdigest()
+
+class NumpyRetriever(BaseRetriever):
+    """NumpyVectorIndex 기반 리트리버 (similarity_score_threshold 리트리버와 같은 동작)"""
+
+    index: Any
+    embeddings: Any
+    k: int = 10
+    score_threshold: Optional[float] = 0.75
+
+    def search_with_scores(self, query: str):
+        """(Document, relevance score) 목록 (점수 내림차순)"""
+        query_vector = self.embeddings.embed_query(query)
+        return self.index.search(query_vector, k=self.k, score_threshold=self.score_threshold)
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
@@ -0,0 +1,68 @@
+import re
+
+# 정책 문서 텍스트의 "라벨: 값" 형식 필드 (메타데이터 키, 원문 라벨)
+POLICY_FIELDS = (
+    ("policy_name", "정책명"),
+    ("description", "설명"),
+    ("target", "지원대상"),
+    ("apply_method", "신청방법"),
+    ("contact", "문의"),
+    ("url", "관련링크"),
+)
+_LABEL_TO_KEY = {label: key for key, label in POLICY_FIELDS}
+_FIELD_LINE_PATTERN = re.compile(r"^\s*(" + "|".join(_LABEL_TO_KEY) + r")\s*:\s*(.*?)\s*$", re.MULTILINE)
+
+# 정책 id -> 미리 렌더링한 컨텍스트 블록 (load_policy_data에서 채움)
+policy_blocks = {}
+# 정책 id -> 정책명 (이전 답변에서 안내한 정책을 찾을 때 사용)
+policy_names = {}
+
+def parse_policy_text(text):
+    """정책 텍스트를 한 번 파싱하여 {메타데이터 키: 값} 반환 (없는 필드는 빈 문자열)"""
+    fields = {key: "" for key, _ in POLICY_FIELDS}
+    for label, value in _FIELD_LINE_PATTERN.findall(text or ""):
+        key = _LABEL_TO_KEY[label]
+        if not fields[key]:
+            fields[key] = value
+    # 관련링크는 URL 부분만 사용
+    fields["url"] = fields["url"].split()[0] if fields["url"] else ""
+    return fields
+
+def render_policy_block(fields):
+    """필드 dict를 LLM 컨텍스트용 블록으로 렌더링 (빈 필드는 생략)"""
+    return "\n".join(f"{label}: {fields[key]}" for key, label in POLICY_FIELDS if fields.get(key))
+
+def register_policy(policy_id, fields):
+    if policy_id:
+        policy_blocks[policy_id] = render_policy_block(fields)
+        if fields.get("policy_name"):
+            policy_names[policy_id] = fields["policy_name"]
+
+def find_mentioned_policies(text):
+    """텍스트에 등장하는 등록된 정책명 목록 (등록 순서)"""
+    if not text:
+        return []
+    return [name for name in dict.fromkeys(policy_names.values()) if name in text]
+
+def get_policy_fields(doc):
+    """문서의 정책 필드. 메타데이터에 파싱 결과가 없으면(이전 방식으로 만든 색인) 본문을 파싱"""
+    metadata = doc.metadata or {}
+    if "policy_name" in metadata:
+        return {key: metadata.get(key, "") for key, _ in POLICY_FIELDS}
+    return parse_policy_text(doc.page_content)
+
+def render_context(docs):
+    """검색된 문서들로 QA 컨텍스트 구성. 같은 정책의 청크는 미리 렌더링한 블록 하나로 합침"""
+    blocks = []
+    seen = set()
+    for doc in docs:
+        policy_id = (doc.metadata or {}).get("id")
+        block = policy_blocks.get(policy_id) if policy_id else None
+        if block is None:
+            blocks.append(doc.page_content)
+            continue
+        if policy_id in seen:
+            continue
+        seen.add(policy_id)
+        blocks.append(block)
+    return "\n\n".join(blocks)
@@ -0,0 +1,175 @@
+"""
+요청 단위 샘플링 프로파일러 (운영 중 느린 요청 분석용, 기본 꺼짐)
+
+PROFILER_ENABLED=1 이고 PROFILER_TOKEN이 설정된 경우에만 미들웨어가 등록되고 (토큰이 없으면 아무나 켤 수 있으므로 꺼짐),
+그중에서도 아래 요청만 프로파일링한다.
+- 헤더  X-Profile: <토큰>
+- 쿼리  ?profile=<토큰>
+- PROFILER_SAMPLE_RATE 비율의 무작위 요청 (예: 0.01 = 1%)
+
+별도 스레드가 PROFILER_INTERVAL 간격으로 sys._current_frames()를 읽어 스택을 센다.
+결과는 folded stack 형식(한 줄에 "프레임;프레임;... 횟수")으로 PROFILER_DIR에 요청당 파일 하나로 저장되며
+flamegraph.pl, speedscope, inferno 등에 그대로 넣을 수 있다.
+이벤트 루프와 to_thread 작업 스레드를 함께 샘플링하므로, 동시에 처리 중인 다른 요청의 스택도 섞일 수 있다.
+"""
+import os
+import re
+import sys
+import hmac
+import time
+import uuid
+import random
+import asyncio
+import threading
+
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+PROFILER_REQUESTED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+PROFILER_ENABLED = PROFILER_REQUESTED and bool(PROFILER_TOKEN)
+PROFILER_DIR = os.environ.get("PROFILER_DIR", os.path.join(os.path.dirname(__file__), '../profiles'))
+PROFILER_SAMPLE_RATE = float(os.environ.get("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", "0.005"))
+# 디렉토리에 남길 최대 파일 수 (오래된 것부터 삭제), 파일 하나의 최대 크기
+PROFILER_MAX_FILES = int(os.environ.get("PROFILER_MAX_FILES", "50"))
+PROFILER_MAX_BYTES = int(os.environ.get("PROFILER_MAX_BYTES", "1000000"))
+# 동시에 프로파일링할 최대 요청 수 (초과 시 프로파일링 없이 처리)
+PROFILER_MAX_CONCURRENT = int(os.environ.get("PROFILER_MAX_CONCURRENT", "1"))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY = "profile"
+
+_active_lock = threading.Lock()
+_active_count = 0
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """백그라운드 스레드에서 모든 스레드의 스택을 주기적으로 세는 프로파일러"""
+
+    def __init__(self, interval=PROFILER_INTERVAL):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def folded(self, max_bytes=PROFILER_MAX_BYTES):
+        """folded stack 텍스트. max_bytes를 넘으면 샘플 수가 적은 스택부터 생략"""
+        lines = []
+        size = 0
+        dropped = 0
+        for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+            line = f"{stack} {count}\n"
+            line_bytes = len(line.encode("utf-8"))
+            if size + line_bytes > max_bytes:
+                dropped += count
+                continue
+            lines.append(line)
+            size += line_bytes
+        if dropped:
+            lines.append(f"[truncated] {dropped}\n")
+        return "".join(lines)
+
+def should_profile(request):
+    """헤더/쿼리 플래그 또는 무작위 샘플로 이 요청을 프로파일링할지 결정"""
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get(PROFILE_QUERY)
+    if flag:
+        return bool(PROFILER_TOKEN) and hmac.compare_digest(flag, PROFILER_TOKEN)
+    return PROFILER_SAMPLE_RATE > 0 and random.random() < PROFILER_SAMPLE_RATE
+
+def _acquire_slot():
+    global _active_count
+    with _active_lock:
+        if _active_count >= PROFILER_MAX_CONCURRENT:
+            return False
+        _active_count += 1
+        return True
+
+def _release_slot():
+    global _active_count
+    with _active_lock:
+        _active_count -= 1
+
+def _prune_profiles(profile_dir, max_files):
+    files = sorted(
+        (os.path.join(profile_dir, name) for name in os.listdir(profile_dir) if name.endswith(".folded")),
+        key=os.path.getmtime
+    )
+    for path in files[:-max_files] if max_files > 0 else files:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def write_profile(profiler, method, path, elapsed, profile_dir=PROFILER_DIR):
+    """프로파일 결과를 파일로 저장하고 파일 이름 반환"""
+    os.makedirs(profile_dir, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{method.lower()}-{slug}-{int(elapsed * 1000)}ms-{uuid.uuid4().hex[:6]}.folded"
+    with open(os.path.join(profile_dir, name), "w", encoding="utf-8") as f:
+        f.write(profiler.folded())
+    _prune_profiles(profile_dir, PROFILER_MAX_FILES)
+    return name
+
+async def profile_middleware(request, call_next):
+    """FastAPI http 미들웨어. 대상 요청은 응답 본문 전송이 끝날 때까지 프로파일링 (스트리밍 포함)"""
+    if not should_profile(request) or not _acquire_slot():
+        return await call_next(request)
+
+    profiler = SamplingProfiler()
+    start = time.perf_counter()
+    profiler.start()
+    try:
+        response = await call_next(request)
+    except Exception:
+        profiler.stop()
+        _release_slot()
+        raise
+
+    body_iterator = response.body_iterator
+
+    async def profiled_body():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            elapsed = time.perf_counter() - start
+            profiler.stop()
+            _release_slot()
+            try:
+                name = await asyncio.to_thread(write_profile, profiler, request.method, request.url.path, elapsed)
+                print(f"[Profiler] {request.method} {request.url.path} {elapsed:.3f}s, "
+                      f"{profiler.samples} samples -> {name}")
+            except OSError as e:
+                print(f"[Profiler] 프로파일 저장 실패: {e}")
+
+    response.body_iterator = profiled_body()
+    # 본문 전송 후에 저장되므로 파일 이름 대신 프로파일링 여부만 알림
+    response.headers["X-Profiled"] = "1"
+    return response
@@ -0,0 +1,239 @@
+"""
+토큰 예산 기반 프롬프트 조립
+
+QA/fallback 프롬프트는 고정 지시문 + 대화 기록 + 검색 문서로 구성되는데,
+대화 기록(이전 답변의 HTML 링크 포함)과 문서가 그대로 들어가면 턴이 지날수록 입력 토큰이 늘어난다.
+기존 방식대로 조립한 프롬프트가 단계별 토큰 예산(PROMPT_BUDGET_QA 등)을 넘을 때만
+- 대화 기록: 최근 턴만 요약된 답변과 함께 남기고, 이전 턴은 "질문 목록 + 이미 안내한 정책명"으로 압축
+- 검색 문서: 정책 필드 단위로 렌더링하고 긴 필드(설명/지원대상 등)를 자름
+을 단계적으로 적용하고, 기존 방식 대비 절약한 토큰 수를 로그와 /metrics(prompt_tokens_total)에 남긴다.
+
+토큰 수는 tiktoken이 있으면 모델 인코딩으로, 없거나 PROMPT_TOKENIZER=heuristic이면 문자 수 기반 근사로 센다.
+인코딩 파일은 처음 로드할 때 내려받을 수 있으므로 서버 초기화 작업에서 preload_tokenizer()로 미리 읽어 둔다.
+"""
+import os
+import re
+import math
+import logging
+
+from .metrics import registry
+from .policy_fields import POLICY_FIELDS, get_policy_fields, render_context, find_mentioned_policies
+
+logger = logging.getLogger(__name__)
+
+PROMPT_BUDGET_ENABLED = os.environ.get("PROMPT_BUDGET_ENABLED", "1") == "1"
+# tiktoken | heuristic (오프라인 환경에서 인코딩 파일 다운로드를 피하려면 heuristic)
+PROMPT_TOKENIZER = os.environ.get("PROMPT_TOKENIZER", "tiktoken").lower()
+PROMPT_TOKENIZER_MODEL = os.environ.get("PROMPT_TOKENIZER_MODEL", "gpt-4o")
+# 단계별 프롬프트 전체(고정 지시문 포함) 토큰 예산
+PROMPT_BUDGETS = {
+    "qa": int(os.environ.get("PROMPT_BUDGET_QA", "4000")),
+    "fallback": int(os.environ.get("PROMPT_BUDGET_FALLBACK", "2500")),
+}
+# 답변까지 그대로(요약해서) 남길 최근 턴 수, 그 답변의 최대 글자 수
+PROMPT_HISTORY_RECENT_TURNS = int(os.environ.get("PROMPT_HISTORY_RECENT_TURNS", "1"))
+PROMPT_HISTORY_ANSWER_CHARS = int(os.environ.get("PROMPT_HISTORY_ANSWER_CHARS", "300"))
+# 문서 필드별 최대 글자 수 (정책명/문의/링크는 자르지 않음)
+PROMPT_FIELD_CHARS = int(os.environ.get("PROMPT_FIELD_CHARS", "400"))
+
+PROMPT_TOKENS = registry.counter(
+    "prompt_tokens_total", "Prompt tokens sent and saved by budgeted assembly", ("stage", "kind")
+)
+
+_TRIMMABLE_FIELDS = ("description", "target", "apply_method")
+_HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+_MARKDOWN_PATTERN = re.compile(r"[*_`#>]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+    _encoding_loaded = True
+    if PROMPT_TOKENIZER != "tiktoken":
+        return None
+    try:
+        import tiktoken
+        try:
+            _encoding = tiktoken.encoding_for_model(PROMPT_TOKENIZER_MODEL)
+        except KeyError:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Warning: tiktoken unavailable ({e}), using heuristic token counts.")
+        _encoding = None
+    return _encoding
+
+def preload_tokenizer():
+    """인코딩을 미리 로드 (요청 처리 중 이벤트 루프에서 다운로드/파일 로드가 일어나지 않도록)"""
+    return _get_encoding() is not None
+
+def estimate_tokens(text):
+    """tiktoken 없이 쓰는 근사치: 영문/기호 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰 (보수적)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars))
+
+def count_tokens(text):
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+def _truncate(text, max_chars):
+    text = text or ""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 1, 0)].rstrip() + "…"
+
+def _compact_answer(answer, max_chars):
+    """이전 답변에서 HTML 링크/마크다운을 걷어내고 앞부분만 남김"""
+    text = _HTML_TAG_PATTERN.sub(" ", answer)
+    text = _MARKDOWN_PATTERN.sub("", text)
+    text = _WHITESPACE_PATTERN.sub(" ", text).strip()
+    return _truncate(text, max_chars)
+
+def _pair_turns(messages):
+    """메시지 목록을 [(질문, 답변)]으로 묶음 (답변이 없는 마지막 질문은 답변 "")"""
+    turns = []
+    for message in messages or []:
+        if getattr(message, "type", "") == "human":
+            turns.append([message.content, ""])
+        elif turns:
+            turns[-1][1] = message.content
+        else:
+            turns.append(["", message.content])
+    return turns
+
+def render_history(messages, recent_turns=PROMPT_HISTORY_RECENT_TURNS,
+                   answer_chars=PROMPT_HISTORY_ANSWER_CHARS, include_questions=True):
+    """대화 기록을 압축된 텍스트로 렌더링
+
+    - 최근 recent_turns 턴: 질문 + 요약된 답변
+    - 그 이전 턴: 질문만 (include_questions=False면 생략)
+    - 모든 답변에서 이미 안내한 정책명
+    """
+    turns = _pair_turns(messages)
+    if not turns:
+        return "없음"
+    split = max(len(turns) - recent_turns, 0)
+    older, recent = turns[:split], turns[split:]
+    lines = []
+    if older and include_questions:
+        lines.append("이전 질문: " + " / ".join(question for question, _ in older if question))
+    mentioned = find_mentioned_policies("\n".join(answer for _, answer in turns))
+    if mentioned:
+        lines.append("이미 안내한 정책: " + ", ".join(mentioned))
+    for question, answer in recent:
+        if question:
+            lines.append(f"사용자: {question}")
+        if answer and answer_chars > 0:
+            lines.append(f"AI: {_compact_answer(answer, answer_chars)}")
+    return "\n".join(lines) or "없음"
+
+def render_trimmed_context(docs, field_chars=PROMPT_FIELD_CHARS, max_docs=None):
+    """검색 문서를 정책 필드 단위로 렌더링 (정책 id 기준 중복 제거, 긴 필드는 자름)"""
+    blocks = []
+    seen = set()
+    for doc in docs:
+        policy_id = (doc.metadata or {}).get("id")
+        if policy_id and policy_id in seen:
+            continue
+        if max_docs is not None and len(blocks) >= max_docs:
+            break
+        if policy_id:
+            seen.add(policy_id)
+        fields = get_policy_fields(doc)
+        if not fields.get("policy_name"):
+            blocks.append(_truncate(doc.page_content, field_chars))
+            continue
+        lines = []
+        for key, label in POLICY_FIELDS:
+            value = fields.get(key)
+            if not value:
+                continue
+            if key in _TRIMMABLE_FIELDS:
+                value = _truncate(value, field_chars)
+            lines.append(f"{label}: {value}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def _history_levels(chat_history):
+    """덜 압축된 것부터 순서대로 대화 기록 후보"""
+    yield render_history(chat_history)
+    yield render_history(chat_history, answer_chars=PROMPT_HISTORY_ANSWER_CHARS // 3)
+    yield render_history(chat_history, answer_chars=0)
+    yield render_history(chat_history, recent_turns=0, answer_chars=0, include_questions=False)
+    yield "없음"
+
+def _context_levels(docs):
+    """덜 자른 것부터 순서대로 문서 컨텍스트 후보 (마지막까지 최소 1개 문서는 유지)"""
+    yield render_trimmed_context(docs)
+    yield render_trimmed_context(docs, field_chars=PROMPT_FIELD_CHARS // 2)
+    yield render_trimmed_context(docs, field_chars=PROMPT_FIELD_CHARS // 4)
+    for max_docs in range(len(docs) - 1, 0, -1):
+        yield render_trimmed_context(docs, field_chars=PROMPT_FIELD_CHARS // 4, max_docs=max_docs)
+
+def build_prompt(template, stage, chat_history, docs=None, **fields):
+    """예산 안에서 프롬프트를 조립. (프롬프트, 리포트 dict) 반환
+
+    template은 PromptTemplate 또는 str.format 템플릿. docs가 None이면 {context}가 없는 템플릿으로 본다.
+    기존 방식으로 조립한 프롬프트가 예산 안이면 그대로 쓰고(압축 없음, 절약 0),
+    넘을 때만 줄인다. 예산을 다 줄여도 넘는 경우에는 가장 많이 압축한 결과를 그대로 사용한다.
+    """
+    def render(history_text, context_text):
+        values = dict(fields, chat_history=history_text)
+        if docs is not None:
+            values["context"] = context_text
+        return template.format(**values)
+
+    # 기존 방식: 메시지 객체 목록을 그대로 문자열화 + 미리 렌더링한 전체 정책 블록
+    baseline_context = render_context(docs) if docs is not None else None
+    if not PROMPT_BUDGET_ENABLED:
+        return render(chat_history, baseline_context), None
+
+    budget = PROMPT_BUDGETS.get(stage)
+    baseline_prompt = render(chat_history, baseline_context)
+    baseline_tokens = count_tokens(baseline_prompt)
+    if budget is None or baseline_tokens <= budget:
+        report = {
+            "stage": stage,
+            "budget": budget,
+            "tokens": baseline_tokens,
+            "baseline_tokens": baseline_tokens,
+            "saved_tokens": 0,
+            "over_budget": False,
+        }
+        PROMPT_TOKENS.inc(baseline_tokens, stage=stage, kind="sent")
+        return baseline_prompt, report
+
+    # 고정 지시문과 각 부분의 토큰 수를 따로 세어 더함 (경계에서 몇 토큰 오차는 무시)
+    fixed_tokens = count_tokens(render("", ""))
+    history_options = [(text, count_tokens(text)) for text in _history_levels(chat_history)]
+    history_text, context_text = history_options[-1][0], ""
+    # 대화 기록부터 줄이고, 그래도 넘으면 문서를 줄임
+    for context_text in (_context_levels(docs) if docs else [""]):
+        remaining = budget - fixed_tokens - count_tokens(context_text)
+        fitting = [text for text, tokens in history_options if tokens <= remaining]
+        if fitting:
+            history_text = fitting[0]
+            break
+        history_text = history_options[-1][0]
+
+    prompt = render(history_text, context_text)
+    tokens = count_tokens(prompt)
+    report = {
+        "stage": stage,
+        "budget": budget,
+        "tokens": tokens,
+        "baseline_tokens": baseline_tokens,
+        "saved_tokens": max(baseline_tokens - tokens, 0),
+        "over_budget": tokens > budget,
+    }
+    PROMPT_TOKENS.inc(tokens, stage=stage, kind="sent")
+    PROMPT_TOKENS.inc(report["saved_tokens"], stage=stage, kind="saved")
+    logger.info(f"[Prompt] {stage}: {tokens} tokens (기존 방식 {baseline_tokens}, 절약 {report['saved_tokens']}, 예산 {budget})")
+    return prompt, report
@@ -0,0 +1,487 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+
+from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
+
+logger = logging.getLogger(__name__)
+
+# 세션 저장소 설정
+SESSION_MAX_COUNT = int(os.environ.get("SESSION_MAX_COUNT", "2000"))
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "3600"))
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_HISTORY_TURNS = 5
+# 세션 백엔드: "memory" (기본, 워커 프로세스 내부) 또는 "sqlite" (여러 워커/인스턴스가 공유)
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.environ.get(
+    "SESSION_DB_PATH",
+    os.path.join(os.path.dirname(__file__), '../cache/sessions.sqlite3')
+)
+SESSION_FLUSH_INTERVAL = float(os.environ.get("SESSION_FLUSH_INTERVAL", "0.2"))
+# 캐시된 세션의 DB version을 다시 확인하는 최소 간격(초). 다른 워커와 겹친 쓰기는 flush에서 병합되므로 매 접근마다 확인하지 않음
+SESSION_VERSION_CHECK_INTERVAL = float(os.environ.get("SESSION_VERSION_CHECK_INTERVAL", "1.0"))
+
+# 메시지/레코드당 파이썬 객체 오버헤드 근사치 (바이트)
+_MESSAGE_OVERHEAD = 400
+_RECORD_OVERHEAD = 2000
+
+class SessionChatMessageHistory(BaseChatMessageHistory):
+    """메시지가 추가될 때 저장소에 알리는 대화 이력 (영속 백엔드의 쓰기 트리거)"""
+
+    def __init__(self, messages=None, on_change=None):
+        self._messages = list(messages or [])
+        self._on_change = on_change
+
+    @property
+    def messages(self):
+        return self._messages
+
+    def add_message(self, message):
+        self._messages.append(message)
+        if self._on_change is not None:
+            self._on_change()
+
+    def clear(self):
+        self._messages.clear()
+        if self._on_change is not None:
+            self._on_change()
+
+def new_memory(messages=None, on_change=None):
+    return ConversationBufferWindowMemory(
+        chat_memory=SessionChatMessageHistory(messages, on_change),
+        memory_key="chat_history",
+        return_messages=True,
+        k=SESSION_HISTORY_TURNS
+    )
+
+# 메시지 직렬화: [["h", "질문"], ["a", "답변"], ...] 형태의 짧은 JSON
+_ROLE_CODES = {HumanMessage: "h", AIMessage: "a"}
+_CODE_ROLES = {"h": HumanMessage, "a": AIMessage}
+
+def serialize_messages(messages):
+    records = [[_ROLE_CODES.get(type(m), "a"), m.content] for m in messages]
+    return json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+
+def deserialize_messages(payload):
+    return [_CODE_ROLES.get(code, AIMessage)(content=content) for code, content in json.loads(payload or "[]")]
+
+class SessionRecord:
+    __slots__ = ("memory", "profile", "created_at", "last_access", "version",
+                 "checked_at", "unsynced", "changed_fields")
+
+    def __init__(self, memory, profile=None, version=0):
+        self.memory = memory
+        self.profile = dict(profile or {})
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.version = version
+        # 영속 백엔드용: 마지막 version 확인 시각, 마지막 기록 이후 추가된 메시지(None이면 이력 전체를 비움), 바뀐 프로필 필드
+        self.checked_at = self.created_at
+        self.unsynced = []
+        self.changed_fields = set()
+
+class InMemorySessionStore:
+    """세션별 대화 메모리 + 사용자 프로필 저장소
+
+    - 최대 세션 수를 넘으면 가장 오래 사용하지 않은 세션부터 제거 (LRU)
+    - 마지막 접근 후 idle_ttl이 지난 세션은 sweep()에서 제거
+    - 윈도우 메모리는 최근 k턴만 사용하지만 내부 메시지 목록은 계속 쌓이므로 접근 시 잘라냄
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX_COUNT, idle_ttl=SESSION_IDLE_TTL,
+                 history_turns=SESSION_HISTORY_TURNS):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.history_turns = history_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def _get_record(self, session_id, create=True):
+        with self._lock:
+            record = self._sessions.get(session_id)
+            if record is None:
+                if not create:
+                    return None
+                record = self._new_record(session_id)
+                self._sessions[session_id] = record
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            record.last_access = time.time()
+            return record
+
+    def _new_record(self, session_id):
+        return SessionRecord(new_memory())
+
+    def _trim(self, memory):
+        messages = memory.chat_memory.messages
+        max_messages = self.history_turns * 2
+        if len(messages) > max_messages:
+            del messages[:-max_messages]
+
+    def get_memory(self, session_id):
+        record = self._get_record(session_id)
+        self._trim(record.memory)
+        return record.memory
+
+    def get_profile(self, session_id):
+        """세션 프로필(dict) 반환. 세션이 없으면 빈 dict (세션을 새로 만들지 않음)"""
+        record = self._get_record(session_id, create=False)
+        return dict(record.profile) if record is not None else {}
+
+    def update_profile(self, session_id, **fields):
+        record = self._get_record(session_id)
+        with self._lock:
+            record.profile.update(fields)
+        self._mark_dirty(session_id, record)
+
+    def _mark_dirty(self, session_id, record):
+        """변경 사항 기록 (메모리 백엔드는 할 일 없음)"""
+
+    def flush(self):
+        """보류 중인 쓰기 반영 (메모리 백엔드는 할 일 없음)"""
+        return 0
+
+    def close(self):
+        self.flush()
+
+    def sweep(self):
+        """idle_ttl이 지난 세션 제거. 제거된 세션 수 반환"""
+        cutoff = time.time() - self.idle_ttl
+        removed = 0
+        with self._lock:
+            # LRU 순서이므로 앞쪽부터 만료된 세션만 확인하면 됨
+            while self._sessions:
+                session_id, record = next(iter(self._sessions.items()))
+                if record.last_access >= cutoff:
+                    break
+                del self._sessions[session_id]
+                removed += 1
+            self.expirations += removed
+        if removed:
+            logger.info(f"[SessionStore] 만료 세션 {removed}개 제거 (남은 세션: {len(self._sessions)})")
+        return removed
+
+    @staticmethod
+    def approx_record_bytes(record):
+        size = _RECORD_OVERHEAD + len(json.dumps(record.profile, ensure_ascii=False).encode("utf-8"))
+        for message in record.memory.chat_memory.messages:
+            size += _MESSAGE_OVERHEAD + len(str(message.content).encode("utf-8"))
+        return size
+
+    def stats(self):
+        with self._lock:
+            records = list(self._sessions.values())
+        total_bytes = sum(self.approx_record_bytes(record) for record in records)
+        return {
+            "backend": "memory",
+            "active_sessions": len(records),
+            "max_sessions": self.max_sessions,
+            "idle_ttl_sec": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "approx_bytes_total": total_bytes,
+            "approx_bytes_per_session": total_bytes // len(records) if records else 0,
+        }
+
+class SQLiteSessionStore(InMemorySessionStore):
+    """SQLite(WAL) 영속 세션 저장소 - 여러 워커/프로세스가 같은 파일을 공유
+
+    - 로컬 LRU(InMemorySessionStore)를 읽기 캐시로 사용 (read-through)
+      version_check_interval마다 DB의 version만 확인해 다른 워커가 갱신한 세션이면 다시 읽는다.
+    - 메시지/프로필 변경은 세션 단위로 모아 두었다가 flush()에서 한 트랜잭션으로 기록 (batched write)
+    - 기록은 낙관적 동시성 제어: 읽어 온 version일 때만 UPDATE 하고, 다른 워커가 먼저 기록했으면
+      DB 내용에 이 워커가 추가한 메시지/바꾼 프로필 필드를 병합해 다시 기록한다 (lost update 방지)
+    - 메시지는 최근 k턴만 짧은 JSON 배열로 저장
+    - 읽기는 별도 연결/잠금을 사용해 flush 트랜잭션(BEGIN~COMMIT) 동안에도 기다리지 않음 (WAL 동시 읽기)
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, version_check_interval=SESSION_VERSION_CHECK_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.version_check_interval = version_check_interval
+        self._pending = {}  # session_id -> SessionRecord (아직 기록되지 않은 변경)
+        self._flushing = set()  # 기록 중인 세션 (version 확인 대상에서 제외)
+        self._db_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, profile TEXT NOT NULL, messages TEXT NOT NULL,"
+            " version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        self._read_lock = threading.Lock()
+        self._read_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._read_conn.execute("PRAGMA busy_timeout=5000")
+        self.db_reads = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.conflicts = 0
+
+    def _db_version(self, session_id):
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _load(self, session_id):
+        with self._read_lock:
+            row = self._read_conn.execute(
+                "SELECT profile, messages, version FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        self.db_reads += 1
+        if row is None:
+            return None
+        profile, messages, version = row
+        return self._make_record(session_id, deserialize_messages(messages), json.loads(profile), version)
+
+    def _make_record(self, session_id, messages=None, profile=None, version=0):
+        record = SessionRecord(None, profile, version)
+        record.memory = new_memory(messages, on_change=lambda: self._on_messages_changed(session_id, record))
+        return record
+
+    def _new_record(self, session_id):
+        return self._make_record(session_id)
+
+    def _is_stale(self, session_id, record):
+        """캐시된 세션이 다른 워커의 기록보다 오래됐는지 확인 (간격마다 한 번, DB 조회는 _lock 밖에서)"""
+        with self._lock:
+            if session_id in self._pending or session_id in self._flushing:
+                return False
+            if time.time() - record.checked_at < self.version_check_interval:
+                return False
+        db_version = self._db_version(session_id)
+        with self._lock:
+            record.checked_at = time.time()
+            # 조회하는 사이 로컬 변경/기록이 생겼으면 캐시를 유지 (flush에서 병합됨)
+            if session_id in self._pending or session_id in self._flushing:
+                return False
+            return db_version is not None and db_version > record.version
+
+    def _get_record(self, session_id, create=True):
+        with self._lock:
+            record = self._sessions.get(session_id)
+        if record is not None and self._is_stale(session_id, record):
+            with self._lock:
+                if self._sessions.get(session_id) is record:
+                    del self._sessions[session_id]
+            record = None
+        if record is None:
+            # DB 읽기는 _lock 밖에서 하고, 그사이 다른 요청이 먼저 넣었으면 그 레코드를 사용
+            loaded = self._load(session_id)
+            with self._lock:
+                if session_id not in self._sessions:
+                    if loaded is None and not create:
+                        return None
+                    if loaded is not None:
+                        self._sessions[session_id] = loaded
+        return super()._get_record(session_id, create)
+
+    def _on_messages_changed(self, session_id, record):
+        with self._lock:
+            messages = record.memory.chat_memory.messages
+            if not messages:
+                record.unsynced = None
+            elif record.unsynced is not None:
+                record.unsynced.append(messages[-1])
+            self._pending[session_id] = record
+
+    def update_profile(self, session_id, **fields):
+        record = self._get_record(session_id)
+        with self._lock:
+            record.profile.update(fields)
+            record.changed_fields.update(fields)
+            self._pending[session_id] = record
+
+    def _mark_dirty(self, session_id, record):
+        with self._lock:
+            self._pending[session_id] = record
+
+    def _merge(self, row, entry):
+        """DB에 있는 최신 내용에 이 워커의 변경분을 얹은 (profile, messages)"""
+        db_profile, db_messages = json.loads(row[0]), deserialize_messages(row[1])
+        profile = dict(db_profile)
+        profile.update({field: entry["profile"][field] for field in entry["changed_fields"] if field in entry["profile"]})
+        if entry["unsynced"] is None:
+            messages = list(entry["messages"])
+        else:
+            messages = db_messages + entry["unsynced"]
+        return profile, messages[-self.history_turns * 2:]
+
+    def _write_entry(self, entry, now):
+        """세션 하나를 조건부로 기록하고 (새 version, 병합 결과 또는 None) 반환. _db_lock + 트랜잭션 안에서 호출"""
+        session_id, base_version = entry["session_id"], entry["version"]
+        profile_json = json.dumps(entry["profile"], ensure_ascii=False, separators=(",", ":"))
+        messages_json = serialize_messages(entry["messages"])
+        if base_version == 0:
+            cursor = self._conn.execute(
+                "INSERT INTO sessions (session_id, profile, messages, version, updated_at) VALUES (?, ?, ?, 1, ?)"
+                " ON CONFLICT(session_id) DO NOTHING",
+                (session_id, profile_json, messages_json, now)
+            )
+        else:
+            cursor = self._conn.execute(
+                "UPDATE sessions SET profile = ?, messages = ?, version = version + 1, updated_at = ?"
+                " WHERE session_id = ? AND version = ?",
+                (profile_json, messages_json, now, session_id, base_version)
+            )
+        if cursor.rowcount == 1:
+            return base_version + 1, None
+
+        row = self._conn.execute(
+            "SELECT profile, messages, version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            # 다른 워커의 sweep으로 지워진 세션: 로컬 내용으로 다시 만듦
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, profile, messages, version, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, profile_json, messages_json, base_version + 1, now)
+            )
+            return base_version + 1, None
+        # 다른 워커가 먼저 기록함: DB 내용에 로컬 변경분을 병합 (BEGIN IMMEDIATE로 잠겨 있어 이 UPDATE는 성공)
+        self.conflicts += 1
+        profile, messages = self._merge(row, entry)
+        self._conn.execute(
+            "UPDATE sessions SET profile = ?, messages = ?, version = ?, updated_at = ?"
+            " WHERE session_id = ? AND version = ?",
+            (json.dumps(profile, ensure_ascii=False, separators=(",", ":")), serialize_messages(messages),
+             row[2] + 1, now, session_id, row[2])
+        )
+        return row[2] + 1, (profile, messages)
+
+    def flush(self):
+        """보류 중인 세션 변경을 한 트랜잭션으로 기록. 기록한 세션 수 반환"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, {}
+            entries = []
+            for session_id, record in pending.items():
+                self._trim(record.memory)
+                entries.append({
+                    "session_id": session_id,
+                    "record": record,
+                    "version": record.version,
+                    "profile": dict(record.profile),
+                    "changed_fields": set(record.changed_fields),
+                    "unsynced": None if record.unsynced is None else list(record.unsynced),
+                    "messages": list(record.memory.chat_memory.messages),
+                })
+                record.unsynced = []
+                record.changed_fields = set()
+                self._flushing.add(session_id)
+        now = time.time()
+        results = []
+        try:
+            with self._db_lock:
+                # 쓰기 잠금을 먼저 잡아 충돌 시 다시 읽은 내용이 COMMIT까지 바뀌지 않도록 함
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    results = [self._write_entry(entry, now) for entry in entries]
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            logger.warning(f"[SessionStore] flush 실패, 다음 주기에 재시도: {e}")
+            with self._lock:
+                for entry in entries:
+                    record = entry["record"]
+                    # 기록 중에 새로 생긴 변경분 앞에 이번 변경분을 되돌려 놓음
+                    if entry["unsynced"] is None or record.unsynced is None:
+                        record.unsynced = None
+                    else:
+                        record.unsynced = entry["unsynced"] + record.unsynced
+                    record.changed_fields |= entry["changed_fields"]
+                    self._pending.setdefault(entry["session_id"], record)
+                    self._flushing.discard(entry["session_id"])
+            return 0
+
+        with self._lock:
+            for entry, (version, merged) in zip(entries, results):
+                record = entry["record"]
+                record.version = version
+                record.checked_at = now
+                if merged is not None:
+                    # 병합 결과를 로컬 레코드에 반영 (기록 중에 새로 생긴 변경분은 그 위에 유지)
+                    profile, messages = merged
+                    profile.update({field: record.profile[field] for field in record.changed_fields if field in record.profile})
+                    record.profile.clear()
+                    record.profile.update(profile)
+                    if record.unsynced is not None:
+                        record.memory.chat_memory.messages[:] = messages + record.unsynced
+                self._flushing.discard(entry["session_id"])
+        self.flushes += 1
+        self.rows_written += len(entries)
+        return len(entries)
+
+    def sweep(self):
+        removed = super().sweep()
+        # 다른 워커가 만든 세션을 포함해 DB에서도 유휴 세션 정리
+        with self._db_lock:
+            self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,))
+        return removed
+
+    def close(self):
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            "backend": "sqlite",
+            "pending_writes": len(self._pending),
+            "db_reads": self.db_reads,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "write_conflicts": self.conflicts,
+        })
+        return stats
+
+def create_session_store(backend=SESSION_BACKEND):
+    """SESSION_BACKEND 설정에 맞는 세션 저장소 생성"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    return InMemorySessionStore()
+
+async def run_session_flusher(store, interval=SESSION_FLUSH_INTERVAL):
+    """보류 중인 세션 쓰기를 짧은 주기로 모아서 기록하는 백그라운드 루프"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(store.flush)
+        except Exception as e:
+            logger.warning(f"[SessionStore] flush 실패: {e}")
+
+async def run_session_sweeper(store, interval=SESSION_SWEEP_INTERVAL):
+    """주기적으로 만료 세션을 정리하는 백그라운드 루프"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(store.sweep)
+        except Exception as e:
+            logger.warning(f"[SessionStore] sweep 실패: {e}")
@@ -0,0 +1,157 @@
+"""
+검색 인덱스 스냅샷 (Chroma 없이 시작하기 위한 읽기 전용 파일)
+
+청크 임베딩은 정규화된 float32 행렬 하나(embeddings.npy)로, 청크 본문과 파싱된 메타데이터는
+짧은 JSON(metadata.json)으로 저장한다. 서버는 행렬을 mmap_mode="r"로 열기 때문에
+로드 시간이 Chroma와 무관하고, 여러 워커 프로세스가 같은 페이지를 읽기 전용으로 공유한다.
+
+디렉토리 구조:
+    snapshot/
+        CURRENT                    <- 현재 버전 이름
+        v20250101-120000-ab12cd34/
+            embeddings.npy
+            metadata.json
+
+실행 예시 (backend/ 디렉토리에서):
+    python -m app.snapshot build          # chroma_db 동기화 후 스냅샷 생성
+    python -m app.snapshot build --no-sync
+    python -m app.snapshot info
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .numpy_index import NumpyVectorIndex
+from .policy_fields import POLICY_FIELDS, register_policy
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", os.path.join(os.path.dirname(__file__), '../snapshot'))
+SNAPSHOT_FORMAT = 1
+# 이전 버전은 최근 몇 개만 남김 (실행 중인 워커가 이전 버전을 mmap 중일 수 있으므로 바로 지우지 않음)
+SNAPSHOT_KEEP = int(os.environ.get("SNAPSHOT_KEEP", "2"))
+
+_MATRIX_FILE = "embeddings.npy"
+_METADATA_FILE = "metadata.json"
+_CURRENT_FILE = "CURRENT"
+
+def current_snapshot_path(snapshot_dir=SNAPSHOT_DIR):
+    """CURRENT가 가리키는 스냅샷 디렉토리 (없으면 None)"""
+    try:
+        with open(os.path.join(snapshot_dir, _CURRENT_FILE), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    path = os.path.join(snapshot_dir, name)
+    return path if name and os.path.isdir(path) else None
+
+def write_snapshot(index, embedding_model=None, snapshot_dir=SNAPSHOT_DIR):
+    """NumpyVectorIndex를 새 버전 스냅샷으로 저장하고 CURRENT를 교체. 스냅샷 경로 반환"""
+    fingerprint = index.fingerprint()
+    version = f"v{time.strftime('%Y%m%d-%H%M%S')}-{fingerprint[:8]}"
+    path = os.path.join(snapshot_dir, version)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path, exist_ok=True)
+
+    np.save(os.path.join(tmp_path, _MATRIX_FILE), np.ascontiguousarray(index.matrix, dtype=np.float32))
+    metadata = {
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embedding_model": embedding_model,
+        "distance": index.distance,
+        "count": len(index),
+        "dim": index.dim,
+        "fingerprint": fingerprint,
+        "documents": [[doc.page_content, doc.metadata] for doc in index.documents],
+    }
+    with open(os.path.join(tmp_path, _METADATA_FILE), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+    current_tmp = os.path.join(snapshot_dir, f"{_CURRENT_FILE}.tmp")
+    with open(current_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(current_tmp, os.path.join(snapshot_dir, _CURRENT_FILE))
+    _prune_snapshots(snapshot_dir, version)
+    print(f"Snapshot {version} written ({len(index)} chunks, dim={index.dim})")
+    return path
+
+def _prune_snapshots(snapshot_dir, current_version):
+    versions = sorted(
+        name for name in os.listdir(snapshot_dir)
+        if name.startswith("v") and os.path.isdir(os.path.join(snapshot_dir, name)) and not name.endswith(".tmp")
+    )
+    for name in versions[:-SNAPSHOT_KEEP] if SNAPSHOT_KEEP > 0 else []:
+        if name != current_version:
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
+def load_snapshot(path=None, snapshot_dir=SNAPSHOT_DIR):
+    """스냅샷을 mmap으로 열어 NumpyVectorIndex 반환 (스냅샷이 없으면 None)"""
+    path = path or current_snapshot_path(snapshot_dir)
+    if path is None:
+        return None
+    with open(os.path.join(path, _METADATA_FILE), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    if metadata.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format: {metadata.get('format')}")
+
+    matrix = np.load(os.path.join(path, _MATRIX_FILE), mmap_mode="r")
+    documents = [Document(page_content=text, metadata=meta) for text, meta in metadata["documents"]]
+    # 파싱된 정책 필드로 컨텍스트 블록 등록 (정책 데이터 파일을 다시 읽지 않음)
+    for doc in documents:
+        if "policy_name" in doc.metadata:
+            register_policy(doc.metadata.get("id"), {key: doc.metadata.get(key, "") for key, _ in POLICY_FIELDS})
+    index = NumpyVectorIndex(matrix, documents, normalized=True, distance=metadata.get("distance", "l2"))
+    index.snapshot_version = metadata["version"]
+    index.embedding_model = metadata.get("embedding_model")
+    return index
+
+def build_snapshot(sync=True, snapshot_dir=SNAPSHOT_DIR):
+    """chroma_db(필요 시 증분 동기화 후)에 저장된 임베딩으로 스냅샷 생성"""
+    from langchain_community.vectorstores import Chroma
+    from .dataLoader import PERSIST_DIRECTORY
+    from .embedding_cache import get_embeddings
+
+    embeddings = get_embeddings()
+    vectorstore = Chroma(persist_directory=PERSIST_DIRECTORY, embedding_function=embeddings)
+    if sync:
+        from .ingest import sync_vectorstore
+        sync_vectorstore(vectorstore)
+    index = NumpyVectorIndex.from_chroma(vectorstore)
+    if len(index) == 0:
+        raise ValueError("Vectorstore is empty; nothing to snapshot")
+    # 청크 순서를 고정해 같은 내용이면 같은 행렬이 나오도록 함
+    order = sorted(range(len(index)), key=lambda i: (str(index.documents[i].metadata.get("id", "")),
+                                                     index.documents[i].metadata.get("chunk_index", 0)))
+    index = NumpyVectorIndex(index.matrix[order], [index.documents[i] for i in order], normalized=True)
+    model_name = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None)
+    return write_snapshot(index, embedding_model=model_name, snapshot_dir=snapshot_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 인덱스 스냅샷 관리")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--no-sync", action="store_true", help="스냅샷 생성 전에 chroma_db 증분 동기화를 하지 않음")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_snapshot(sync=not args.no_sync)
+        return
+    start = time.perf_counter()
+    index = load_snapshot()
+    if index is None:
+        print(f"No snapshot found in {SNAPSHOT_DIR}")
+        return
+    print(json.dumps({
+        "version": index.snapshot_version,
+        "embedding_model": index.embedding_model,
+        "count": len(index),
+        "dim": index.dim,
+        "load_sec": round(time.perf_counter() - start, 4),
+    }, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
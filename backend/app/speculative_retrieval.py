@@ -0,0 +1,116 @@
+"""
+원문 메시지로 미리 검색하는 추측 검색 (speculative retrieval)
+
+검색 쿼리는 분석 LLM 호출(optimized_search_query)이 끝나야 정해지므로, 요청이 들어오자마자
+원문 메시지로 임베딩 + 검색을 시작해 두고 분석이 끝나면 결과를 재사용할지 판단한다.
+- 최종 쿼리가 원문과 같음                                   -> 재사용 (exact)
+- 문자 n-gram 유사도가 SPECULATIVE_QUERY_SIMILARITY 이상     -> 재사용 (similar_query)
+- 최종 쿼리의 어휘(BM25) 검색 상위 정책이 추측 검색 상위 정책과
+  SPECULATIVE_DOC_OVERLAP 이상 겹침 (임베딩 없이 확인)          -> 재사용 (same_docs)
+- 그 외                                                    -> 최종 쿼리로 다시 검색 (rerun)
+결과는 /metrics의 speculative_retrieval_total{result}로 확인한다.
+"""
+import os
+import asyncio
+import logging
+
+from .metrics import registry
+from .context_selector import retrieve_with_scores, dedupe_by_policy
+from .lexical_index import char_ngrams
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_RETRIEVAL = os.environ.get("SPECULATIVE_RETRIEVAL", "1") == "1"
+SPECULATIVE_QUERY_SIMILARITY = float(os.environ.get("SPECULATIVE_QUERY_SIMILARITY", "0.6"))
+SPECULATIVE_DOC_OVERLAP = float(os.environ.get("SPECULATIVE_DOC_OVERLAP", "0.5"))
+# 정책 집합 비교에 쓰는 상위 정책 수
+SPECULATIVE_TOP_N = int(os.environ.get("SPECULATIVE_TOP_N", "3"))
+
+SPECULATIVE_RESULTS = registry.counter(
+    "speculative_retrieval_total",
+    "Speculative retrievals by outcome (exact/similar_query/same_docs reused, rerun, failed, discarded)",
+    ("result",)
+)
+
+def query_similarity(a, b):
+    """문자 n-gram 집합의 Jaccard 유사도 (0~1)"""
+    grams_a, grams_b = set(char_ngrams(a)), set(char_ngrams(b))
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+def _top_policy_ids(scored_docs, n=SPECULATIVE_TOP_N):
+    return {
+        (doc.metadata or {}).get("id") or doc.page_content
+        for doc, _ in dedupe_by_policy(scored_docs)[:n]
+    }
+
+def _swallow_result(task):
+    # 버려진 추측 검색의 예외가 "never retrieved" 경고로 남지 않도록 소비
+    if not task.cancelled():
+        task.exception()
+
+class SpeculativeRetrieval:
+    """원문 메시지로 시작한 검색 작업 하나 (요청당 한 번 resolve 또는 discard)"""
+
+    def __init__(self, retriever, query):
+        self.retriever = retriever
+        self.query = query
+        self.task = asyncio.create_task(asyncio.to_thread(retrieve_with_scores, retriever, query))
+        self._settled = False
+
+    def _settle(self, result):
+        self._settled = True
+        SPECULATIVE_RESULTS.inc(result=result)
+
+    async def resolve(self, final_query):
+        """최종 쿼리에 재사용할 수 있으면 (Document, score) 목록, 아니면 None (다시 검색해야 함)"""
+        if self._settled:
+            return None
+        if final_query == self.query:
+            reason = "exact"
+        elif query_similarity(final_query, self.query) >= SPECULATIVE_QUERY_SIMILARITY:
+            reason = "similar_query"
+        else:
+            reason = None
+
+        lexical_index = getattr(self.retriever, "lexical_index", None)
+        if reason is None and lexical_index is None:
+            # 임베딩 없이 문서 집합을 비교할 방법이 없으면 바로 다시 검색
+            self.discard("rerun")
+            return None
+
+        try:
+            scored_docs = await self.task
+        except Exception as e:
+            logger.warning(f"[Speculative] 추측 검색 실패: {e}")
+            self._settle("failed")
+            return None
+
+        if reason is None:
+            lexical_ids = _top_policy_ids(lexical_index.search(final_query, k=SPECULATIVE_TOP_N * 2))
+            speculative_ids = _top_policy_ids(scored_docs)
+            union = lexical_ids | speculative_ids
+            overlap = len(lexical_ids & speculative_ids) / len(union) if union else 0.0
+            if overlap < SPECULATIVE_DOC_OVERLAP:
+                self._settle("rerun")
+                return None
+            reason = "same_docs"
+
+        self._settle(reason)
+        logger.info(f"[Speculative] 원문 검색 결과 재사용 ({reason}): '{self.query}' -> '{final_query}'")
+        return scored_docs
+
+    def discard(self, result="discarded"):
+        """결과를 쓰지 않음 (도메인 밖 질문, 오류 등). 이미 resolve 됐으면 아무것도 안 함"""
+        if self._settled:
+            return
+        self._settle(result)
+        # to_thread 작업은 취소되지 않으므로 끝날 때 결과만 버림
+        self.task.add_done_callback(_swallow_result)
+
+def start_speculative_retrieval(retriever, user_message):
+    """SPECULATIVE_RETRIEVAL=1이고 리트리버가 있으면 원문 검색을 시작. 아니면 None"""
+    if not SPECULATIVE_RETRIEVAL or retriever is None or not (user_message or "").strip():
+        return None
+    return SpeculativeRetrieval(retriever, user_message)
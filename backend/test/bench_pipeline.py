@@ -0,0 +1,183 @@
+"""
+오프라인 파이프라인 벤치마크: 실제 FastAPI 앱 + OpenAI 스텁 서버
+
+test/stub_openai.py 를 띄우고, 앱(uvicorn app.main:app)을 OPENAI_BASE_URL이 스텁을 가리키도록 실행한 뒤
+rag_tester_flex의 부하 테스트(run_load_async)로 동시 요청 수별 지연시간/처리량을 측정한다.
+캐시/세션/인덱스 파일은 임시 디렉토리를 쓰므로 실제 캐시를 오염시키지 않고 매번 같은 조건에서 실행된다.
+
+실행 예시 (backend/ 디렉토리에서):
+    python test/bench_pipeline.py
+    python test/bench_pipeline.py --concurrency 1,8,32 --requests 64 --stream
+    python test/bench_pipeline.py --chat-latency const:0.5 --triage-mode combined --save_json bench.json
+    python test/bench_pipeline.py --app-env RETRIEVER_BACKEND=chroma --app-env FAST_ROUTER_ENABLED=0
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+TEST_DIR = os.path.abspath(os.path.dirname(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(TEST_DIR, ".."))
+sys.path.insert(0, TEST_DIR)
+
+from rag_tester_flex import run_load_async
+
+def _get_json(url, timeout=2.0):
+    with urllib.request.urlopen(url, timeout=timeout) as res:
+        return json.loads(res.read().decode("utf-8"))
+
+def _post(url, timeout=2.0):
+    request = urllib.request.Request(url, data=b"", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as res:
+        return res.read()
+
+def wait_until(url, timeout, process):
+    """url이 200을 돌려줄 때까지 대기. 응답 JSON 반환"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited with code {process.returncode} before {url} was ready")
+        try:
+            return _get_json(url)
+        except Exception:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+def start_stub(args):
+    command = [
+        sys.executable, os.path.join(TEST_DIR, "stub_openai.py"),
+        "--port", str(args.stub_port),
+        "--chat-latency", args.chat_latency,
+        "--embed-latency", args.embed_latency,
+        "--token-interval", str(args.token_interval),
+        "--answer-chars", str(args.answer_chars),
+        "--seed", str(args.seed),
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR)
+    wait_until(f"http://127.0.0.1:{args.stub_port}/stats", 30, process)
+    return process
+
+def start_app(args, work_dir):
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.stub_port}/v1",
+        "EMBEDDING_CHECK_CTX_LENGTH": "0",
+        "PROMPT_TOKENIZER": "heuristic",
+        "EMBEDDING_CACHE_PATH": os.path.join(work_dir, "embeddings.sqlite3"),
+        "LLM_CACHE_PATH": os.path.join(work_dir, "llm_cache.sqlite3"),
+        "SESSION_DB_PATH": os.path.join(work_dir, "sessions.sqlite3"),
+        "CHROMA_DIR": os.path.join(work_dir, "chroma_db"),
+        "SNAPSHOT_DIR": os.path.join(work_dir, "snapshot"),
+        "RETRIEVER_BACKEND": "numpy",
+        "TRIAGE_MODE": args.triage_mode,
+        "LLM_CACHE_WARMUP": "0",
+        # 기본은 캐시 없이 파이프라인 자체를 측정 (--with-caches로 켬)
+        "LLM_CACHE_ENABLED": "1" if args.with_caches else "0",
+        "ANSWER_CACHE_ENABLED": "1" if args.with_caches else "0",
+        "ANONYMIZED_TELEMETRY": "False",
+    })
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(args.app_port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    ready = wait_until(f"http://127.0.0.1:{args.app_port}/ready", args.ready_timeout, process)
+    return process, ready
+
+def _stop(process):
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="questions.txt", help="질문 목록 (test/ 기준)")
+    parser.add_argument("--requests", type=int, default=None, help="동시성 단계별 요청 수 (기본: 질문 수)")
+    parser.add_argument("--concurrency", default="1,4,16", help="측정할 동시 요청 수 목록 (쉼표 구분)")
+    parser.add_argument("--rps", type=float, default=None, help="목표 RPS (생략 시 동시 사용자 방식)")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--stream", action="store_true", help="/chat/stream 으로 측정 (TTFT 포함)")
+    parser.add_argument("--sessions", type=int, default=None, help="재사용할 세션 수 (후속 질문 경로 측정)")
+    parser.add_argument("--triage-mode", default="split", choices=["split", "combined"])
+    parser.add_argument("--with-caches", action="store_true", help="LLM/답변 캐시를 켠 상태로 측정")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--app-env", action="append", default=[], help="앱에 추가로 넘길 환경변수 KEY=VALUE (반복 가능)")
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument("--app-port", type=int, default=8200)
+    parser.add_argument("--ready-timeout", type=float, default=180)
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.3")
+    parser.add_argument("--embed-latency", default="normal:0.05:0.01")
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--answer-chars", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save_json", default=None, help="결과 JSON 저장 경로 (선택)")
+    args = parser.parse_args()
+
+    with open(os.path.join(TEST_DIR, args.file), "r", encoding="utf-8") as f:
+        questions = [q.strip() for q in f if q.strip()]
+    total = args.requests or len(questions)
+    api_url = f"http://127.0.0.1:{args.app_port}/chat"
+
+    stub = app = None
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        try:
+            stub = start_stub(args)
+            started = time.perf_counter()
+            app, ready = start_app(args, work_dir)
+            print(f"앱 준비 완료 ({time.perf_counter() - started:.2f}s): {ready.get('timings')}")
+
+            for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                _post(f"http://127.0.0.1:{args.stub_port}/stats/reset")
+                _, summary = asyncio.run(run_load_async(
+                    questions, api_url, total, concurrency, rps=args.rps, warmup=args.warmup,
+                    stream=args.stream, sessions=args.sessions
+                ))
+                stub_stats = _get_json(f"http://127.0.0.1:{args.stub_port}/stats")
+                # 워밍업 요청도 스텁 호출에 포함되므로 요청 수에 더해서 나눔
+                sent = total + args.warmup
+                summary["stub_calls"] = stub_stats["calls"]
+                summary["llm_calls_per_request"] = round(
+                    sum(v for k, v in stub_stats["calls"].items() if k != "embeddings") / sent, 3)
+                summary["embedding_calls_per_request"] = round(stub_stats["calls"].get("embeddings", 0) / sent, 3)
+                summary["prompt_chars_per_request"] = round(stub_stats["prompt_chars"] / sent, 1)
+                results.append(summary)
+        finally:
+            _stop(app)
+            _stop(stub)
+
+    print()
+    print(f"{'conc':>5} {'p50(s)':>8} {'p90(s)':>8} {'p99(s)':>8} {'max(s)':>8} {'rps':>7} {'err%':>6} {'llm/req':>8} {'emb/req':>8}")
+    for summary in results:
+        latency = summary["latency_sec"] or {}
+        print(f"{summary['concurrency']:>5} {latency.get('p50', 0):>8.3f} {latency.get('p90', 0):>8.3f} "
+              f"{latency.get('p99', 0):>8.3f} {latency.get('max', 0):>8.3f} {summary['throughput_rps'] or 0:>7.2f} "
+              f"{summary['error_rate'] * 100:>6.1f} {summary['llm_calls_per_request']:>8.2f} "
+              f"{summary['embedding_calls_per_request']:>8.2f}")
+
+    if args.save_json:
+        report = {
+            "config": {k: v for k, v in vars(args).items() if k != "save_json"},
+            "startup": ready.get("timings") if app else None,
+            "results": results,
+        }
+        with open(args.save_json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📁 결과 저장 완료: {args.save_json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+리트리버 백엔드 벤치마크: Chroma(similarity_score_threshold) vs NumPy 인메모리 인덱스
+
+합성 코퍼스(기본 1k / 10k / 100k 청크)에 대해 인덱스 생성 시간과 쿼리 지연시간(p50/p99)을 비교한다.
+네트워크 영향을 없애기 위해 쿼리 임베딩은 미리 계산한 벡터를 돌려주는 가짜 임베딩으로 대체한다.
+
+실행 예시 (backend/ 디렉토리에서):
+    python test/bench_retriever.py
+    python test/bench_retriever.py --sizes 1000,10000 --dim 1536 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["ANONYMIZED_TELEMETRY"] = "False"
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from app.numpy_index import NumpyVectorIndex, NumpyRetriever
+
+class FixedQueryEmbeddings(Embeddings):
+    """쿼리 문자열 -> 미리 계산된 벡터 (네트워크 호출 없음)"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+def make_corpus(size, dim, n_queries, rng):
+    matrix = rng.standard_normal((size, dim), dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    # 쿼리는 코퍼스 벡터에 잡음을 더해 만들어 임계값(0.75)을 넘는 결과가 나오도록 함
+    picks = rng.integers(0, size, n_queries)
+    noise = rng.standard_normal((n_queries, dim), dtype=np.float32) * (0.5 / np.sqrt(dim))
+    queries = matrix[picks] + noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    documents = [
+        Document(page_content=f"정책명: 합성 정책 {i}\n설명: 벤치마크용 청크 {i}", metadata={"id": f"policy_{i:06d}"})
+        for i in range(size)
+    ]
+    return matrix, documents, queries
+
+def percentile_ms(samples, pct):
+    return float(np.percentile(np.asarray(samples) * 1000, pct))
+
+def time_queries(retriever, query_texts):
+    # 워밍업 1회
+    retriever.invoke(query_texts[0])
+    latencies = []
+    hits = 0
+    for text in query_texts:
+        start = time.perf_counter()
+        docs = retriever.invoke(text)
+        latencies.append(time.perf_counter() - start)
+        hits += len(docs)
+    return latencies, hits / len(query_texts)
+
+def bench_chroma(matrix, documents, query_texts, embeddings, k, threshold):
+    import chromadb
+    from langchain_chroma import Chroma
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=tmp)
+        start = time.perf_counter()
+        collection = client.create_collection("bench")
+        batch = 5000
+        for i in range(0, len(documents), batch):
+            collection.add(
+                ids=[f"c{j}" for j in range(i, min(i + batch, len(documents)))],
+                embeddings=matrix[i:i + batch].tolist(),
+                documents=[d.page_content for d in documents[i:i + batch]],
+                metadatas=[d.metadata for d in documents[i:i + batch]],
+            )
+        vectorstore = Chroma(client=client, collection_name="bench", embedding_function=embeddings)
+        build_sec = time.perf_counter() - start
+        retriever = vectorstore.as_retriever(
+            search_type="similarity_score_threshold",
+            search_kwargs={"score_threshold": threshold, "k": k}
+        )
+        latencies, avg_hits = time_queries(retriever, query_texts)
+    return build_sec, latencies, avg_hits
+
+def bench_numpy(matrix, documents, query_texts, embeddings, k, threshold):
+    start = time.perf_counter()
+    index = NumpyVectorIndex(matrix, documents)
+    build_sec = time.perf_counter() - start
+    retriever = NumpyRetriever(index=index, embeddings=embeddings, k=k, score_threshold=threshold)
+    latencies, avg_hits = time_queries(retriever, query_texts)
+    return build_sec, latencies, avg_hits
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000", help="코퍼스 크기 목록 (쉼표 구분)")
+    parser.add_argument("--dim", type=int, default=1536, help="임베딩 차원 (text-embedding-ada-002 = 1536)")
+    parser.add_argument("--queries", type=int, default=200, help="크기별 쿼리 수")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--skip-chroma", action="store_true", help="NumPy 인덱스만 측정")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{'backend':<8} {'chunks':>8} {'build(s)':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'avg docs':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        matrix, documents, queries = make_corpus(size, args.dim, args.queries, rng)
+        query_texts = [f"q{i}" for i in range(len(queries))]
+        embeddings = FixedQueryEmbeddings({t: q.tolist() for t, q in zip(query_texts, queries)})
+
+        backends = [("numpy", bench_numpy)]
+        if not args.skip_chroma:
+            backends.insert(0, ("chroma", bench_chroma))
+        for name, bench in backends:
+            build_sec, latencies, avg_hits = bench(matrix, documents, query_texts, embeddings, args.k, args.threshold)
+            print(f"{name:<8} {size:>8} {build_sec:>9.2f} {percentile_ms(latencies, 50):>9.3f} "
+                  f"{percentile_ms(latencies, 99):>9.3f} {avg_hits:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 단위 테스트가 app 패키지를 import할 수 있도록 backend/ 를 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# 실제 벡터스토어/OpenAI 키가 필요한 수동 점검 스크립트는 수집하지 않음
+collect_ignore = ["test_debug.py"]
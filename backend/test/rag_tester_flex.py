@@ -1,34 +1,74 @@
-import requests
 import time
 import argparse
+import asyncio
 import os
+import sys
 import csv
+import json
+import math
 
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
+# 서버와 같은 임베딩 캐시를 쓰기 위해 backend/ 를 import 경로에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from dotenv import load_dotenv
-load_dotenv()
+# 순차 모드 전용 의존성(requests, dotenv, langchain 임베딩 캐시)은 쓰는 함수 안에서 import
+# -> 부하 테스트(--load)는 httpx만 있으면 실행 가능
 
 def load_retriever(chroma_path):
-    embeddings = OpenAIEmbeddings()
+    from dotenv import load_dotenv
+    from langchain_community.vectorstores import Chroma
+    from app.embedding_cache import get_embeddings
+    load_dotenv()
+    # 질문 임베딩은 디스크 캐시를 거치므로 재실행 시 다시 요청하지 않음
+    embeddings = get_embeddings()
     vs = Chroma(persist_directory=chroma_path, embedding_function=embeddings)
     return vs.as_retriever(search_type="mmr", search_kwargs={"k": 2, "fetch_k": 5})
 
-def ask_question(question, api_url, retriever, session_id="test-session"):
-    # 1. 요청 및 응답 시간 측정
+def ask_question_stream(question, api_url, session_id="test-session"):
+    # /chat/stream (SSE) 호출: 첫 토큰까지 시간(TTFT)과 전체 시간 측정
+    import requests
     payload = {"session_id": session_id, "user_message": question}
     start = time.perf_counter()
-    res = requests.post(api_url, json=payload)
-    end = time.perf_counter()
-
+    ttft = None
+    chunks = []
     try:
-        data = res.json()
-        answer = data.get("response", "")
+        with requests.post(api_url.rstrip("/") + "/stream", json=payload, stream=True) as res:
+            event = None
+            for line in res.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[5:].strip())
+                    if event == "token":
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                        chunks.append(data.get("text", ""))
+                    elif event == "error":
+                        chunks.append(data.get("message", ""))
+        answer = "".join(chunks)
     except Exception as e:
         answer = f"[ERROR] {str(e)}"
+    end = time.perf_counter()
+    return answer, round(end - start, 3), round(ttft, 3) if ttft is not None else None
+
+def ask_question(question, api_url, retriever, session_id="test-session", stream=False):
+    # 1. 요청 및 응답 시간 측정
+    ttft = None
+    if stream:
+        answer, elapsed, ttft = ask_question_stream(question, api_url, session_id)
+    else:
+        import requests
+        payload = {"session_id": session_id, "user_message": question}
+        start = time.perf_counter()
+        res = requests.post(api_url, json=payload)
+        end = time.perf_counter()
 
-    elapsed = round(end - start, 3)
+        try:
+            data = res.json()
+            answer = data.get("response", "")
+        except Exception as e:
+            answer = f"[ERROR] {str(e)}"
+
+        elapsed = round(end - start, 3)
 
     # 2. 유사도 문서 추출
     try:
@@ -37,9 +77,9 @@ def ask_question(question, api_url, retriever, session_id="test-session"):
     except Exception as e:
         scores = [("유사도 추출 실패", 1.0)]
 
-    return question, answer.strip(), elapsed, scores
+    return question, answer.strip(), elapsed, scores, ttft
 
-def run(filepath, api_url, chroma_path, save_csv=None, limit=None):
+def run(filepath, api_url, chroma_path, save_csv=None, limit=None, stream=False):
     retriever = load_retriever(chroma_path)
 
     with open(filepath, "r", encoding="utf-8") as f:
@@ -52,15 +92,26 @@ def run(filepath, api_url, chroma_path, save_csv=None, limit=None):
     print(f"🧪 총 {len(questions)}개 질문 테스트 시작")
     
     for i, q in enumerate(questions, 1):
-        q, a, t, scores = ask_question(q, api_url, retriever)
-        print(f"[{i}] ⏱ {t:.3f}s | ❓ {q}")
+        q, a, t, scores, ttft = ask_question(q, api_url, retriever, stream=stream)
+        if stream:
+            print(f"[{i}] ⚡ 첫 토큰 {ttft}s | ⏱ {t:.3f}s | ❓ {q}")
+        else:
+            print(f"[{i}] ⏱ {t:.3f}s | ❓ {q}")
         print(f"    💬 {a[:100]}...")
         print(f"    🔎 유사도:")
         for idx, (cat, score) in enumerate(scores, 1):
             print(f"     {idx}. {cat} | score={score}")
         print()
 
-        rows.append({"index": i, "question": q, "time_sec": t, "answer": a})
+        row = {"index": i, "question": q, "time_sec": t, "answer": a}
+        if stream:
+            row["ttft_sec"] = ttft
+        rows.append(row)
+
+    from app.embedding_cache import get_embedding_cache_stats
+    cache_stats = get_embedding_cache_stats()
+    if cache_stats:
+        print(f"🧠 임베딩 캐시: hit {cache_stats['hits']} / miss {cache_stats['misses']} (hit rate {cache_stats['hit_rate']:.1%})")
 
     if save_csv:
         with open(save_csv, "w", newline="", encoding="utf-8") as f:
@@ -69,6 +120,189 @@ def run(filepath, api_url, chroma_path, save_csv=None, limit=None):
             writer.writerows(rows)
         print(f"📁 CSV 저장 완료: {save_csv}")
 
+# ---------------------------------------------------------------------------
+# 부하 테스트 모드 (--load): 동시 사용자 수 / 목표 RPS로 /chat 호출
+# ---------------------------------------------------------------------------
+
+def percentile(samples, pct):
+    """선형 보간 백분위수 (numpy 없이)"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+async def load_request(client, api_url, question, session_id, stream=False, start=None):
+    """요청 하나 실행. start(perf_counter 기준 시각)를 주면 지연시간/TTFT를 그 시각부터 잰다"""
+    payload = {"session_id": session_id, "user_message": question}
+    sent = time.perf_counter()
+    start = sent if start is None else start
+    status, ttft, error = None, None, None
+    answer = ""
+    try:
+        if stream:
+            chunks = []
+            async with client.stream("POST", api_url.rstrip("/") + "/stream", json=payload) as res:
+                status = res.status_code
+                event = None
+                async for line in res.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data = json.loads(line[5:].strip())
+                        if event == "token":
+                            if ttft is None:
+                                ttft = time.perf_counter() - start
+                            chunks.append(data.get("text", ""))
+                        elif event == "error":
+                            error = data.get("message", "stream error")
+            answer = "".join(chunks)
+        else:
+            res = await client.post(api_url, json=payload)
+            status = res.status_code
+            answer = res.json().get("response", "")
+        if status != 200:
+            error = error or f"HTTP {status}"
+        elif answer.startswith("[오류]"):
+            error = error or "server error response"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    return {
+        "time_sec": round(elapsed, 3),
+        "queue_sec": round(sent - start, 3),
+        "ttft_sec": round(ttft, 3) if ttft is not None else None,
+        "status": status,
+        "error": error,
+        "answer": answer.strip(),
+    }
+
+async def run_load_async(questions, api_url, total, concurrency, rps=None, warmup=0, stream=False,
+                         timeout=120.0, sessions=None):
+    """부하 테스트 실행. (요청별 결과 rows, 요약 dict) 반환
+
+    - rps를 주면 열린 루프: 1/rps 간격으로 요청을 시작 (동시 실행은 concurrency로 제한)
+      지연시간은 예정 시작 시각(run_start + i/rps)부터 재므로 동시 실행 한도 대기열에서 기다린 시간도 포함
+      (coordinated omission 방지, 대기 시간은 queue_sec로 따로 기록)
+    - rps가 없으면 닫힌 루프: concurrency개의 가상 사용자가 응답을 받는 즉시 다음 요청
+    - sessions를 주면 세션 id를 그 수만큼 돌려 씀 (없으면 요청마다 새 세션)
+    """
+    import httpx
+
+    run_id = time.strftime("%H%M%S")
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        # 워밍업 요청은 통계에서 제외
+        for i in range(warmup):
+            result = await load_request(client, api_url, questions[i % len(questions)], f"warmup-{run_id}-{i}", stream)
+            print(f"[warmup {i + 1}/{warmup}] {result['time_sec']}s {result['error'] or 'ok'}")
+
+        rows = [None] * total
+        semaphore = asyncio.Semaphore(concurrency)
+        run_start = time.perf_counter()
+
+        async def one(i, scheduled=None):
+            question = questions[i % len(questions)]
+            session_id = f"load-{run_id}-{i % sessions if sessions else i}"
+            started = (scheduled if scheduled is not None else time.perf_counter()) - run_start
+            result = await load_request(client, api_url, question, session_id, stream, start=scheduled)
+            rows[i] = {"index": i + 1, "question": question, **result, "started_sec": round(started, 3)}
+            done = sum(1 for row in rows if row is not None)
+            if done % max(1, total // 10) == 0 or done == total:
+                print(f"  진행 {done}/{total}")
+
+        async def bounded(i):
+            scheduled = run_start + i / rps
+            async with semaphore:
+                await one(i, scheduled)
+
+        if rps:
+            tasks = []
+            for i in range(total):
+                # 목표 시작 시각까지 대기 후 시작 (동시 실행 한도에 걸리면 대기열에서 기다림)
+                delay = run_start + i / rps - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(bounded(i)))
+            await asyncio.gather(*tasks)
+        else:
+            queue = iter(range(total))
+
+            async def virtual_user():
+                for i in queue:
+                    await one(i)
+
+            await asyncio.gather(*(virtual_user() for _ in range(min(concurrency, total))))
+        wall = time.perf_counter() - run_start
+
+    latencies = [row["time_sec"] for row in rows]
+    ok_latencies = [row["time_sec"] for row in rows if not row["error"]]
+    ttfts = [row["ttft_sec"] for row in rows if row["ttft_sec"] is not None]
+    errors = sum(1 for row in rows if row["error"])
+
+    def latency_stats(samples):
+        if not samples:
+            return None
+        return {
+            "p50": round(percentile(samples, 50), 3),
+            "p90": round(percentile(samples, 90), 3),
+            "p99": round(percentile(samples, 99), 3),
+            "max": round(max(samples), 3),
+            "mean": round(sum(samples) / len(samples), 3),
+        }
+
+    summary = {
+        "api_url": api_url,
+        "stream": stream,
+        "requests": total,
+        "concurrency": concurrency,
+        "target_rps": rps,
+        "warmup": warmup,
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(total / wall, 3) if wall > 0 else None,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "latency_sec": latency_stats(latencies),
+        "latency_ok_sec": latency_stats(ok_latencies),
+        "ttft_sec": latency_stats(ttfts),
+        "queue_sec": latency_stats([row["queue_sec"] for row in rows]) if rps else None,
+    }
+    return rows, summary
+
+def run_load(filepath, api_url, total=None, concurrency=8, rps=None, warmup=2, stream=False,
+             save_csv=None, save_json=None, limit=None, sessions=None):
+    with open(filepath, "r", encoding="utf-8") as f:
+        questions = [q.strip() for q in f if q.strip()]
+    if limit:
+        questions = questions[:limit]
+    total = total or len(questions)
+
+    print(f"🏋️ 부하 테스트: 요청 {total}개, 동시 {concurrency}, 목표 RPS {rps or '제한 없음'}, 워밍업 {warmup}")
+    rows, summary = asyncio.run(run_load_async(
+        questions, api_url, total, concurrency, rps=rps, warmup=warmup, stream=stream, sessions=sessions
+    ))
+
+    latency = summary["latency_sec"] or {}
+    print(f"⏱ p50 {latency.get('p50')}s | p90 {latency.get('p90')}s | p99 {latency.get('p99')}s | max {latency.get('max')}s")
+    if summary["ttft_sec"]:
+        print(f"⚡ 첫 토큰 p50 {summary['ttft_sec']['p50']}s | p90 {summary['ttft_sec']['p90']}s")
+    print(f"🚀 처리량 {summary['throughput_rps']} req/s | ❌ 오류율 {summary['error_rate']:.1%} ({summary['errors']}/{total})")
+
+    if save_csv:
+        # test_results.csv와 같은 앞쪽 컬럼(index, question, time_sec, answer)을 유지해 diff 가능
+        fieldnames = ["index", "question", "time_sec", "answer", "ttft_sec", "status", "error", "started_sec", "queue_sec"]
+        with open(save_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"📁 CSV 저장 완료: {save_csv}")
+    if save_json:
+        with open(save_json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"📁 요약 JSON 저장 완료: {save_json}")
+    return summary
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--env", choices=["local", "prod"], default="local", help="테스트 환경 선택")
@@ -76,6 +310,14 @@ if __name__ == "__main__":
     parser.add_argument("--file", default="questions.txt", help="질문 목록 경로")
     parser.add_argument("--save_csv", default=None, help="CSV 저장 경로 (선택)")
     parser.add_argument("--limit", type=int, default=None, help="테스트 질문 수 제한")
+    parser.add_argument("--stream", action="store_true", help="/chat/stream(SSE)으로 요청하고 첫 토큰 시간 측정")
+    parser.add_argument("--load", action="store_true", help="부하 테스트 모드 (비동기 동시 요청, 지연시간 분포/처리량/오류율)")
+    parser.add_argument("--requests", type=int, default=None, help="[load] 총 요청 수 (기본: 질문 수, 질문은 순환 사용)")
+    parser.add_argument("--concurrency", type=int, default=8, help="[load] 동시 요청 수")
+    parser.add_argument("--rps", type=float, default=None, help="[load] 목표 초당 요청 수 (생략 시 동시 사용자 방식)")
+    parser.add_argument("--warmup", type=int, default=2, help="[load] 통계에서 제외할 워밍업 요청 수")
+    parser.add_argument("--sessions", type=int, default=None, help="[load] 재사용할 세션 수 (생략 시 요청마다 새 세션)")
+    parser.add_argument("--save_json", default=None, help="[load] 요약 JSON 저장 경로 (선택)")
 
     args = parser.parse_args()
 
@@ -88,4 +330,9 @@ if __name__ == "__main__":
     chroma_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../chroma_db"))
     question_path = os.path.abspath(os.path.join(os.path.dirname(__file__), args.file))
 
-    run(filepath=question_path, api_url=api_url, chroma_path=chroma_path, save_csv=args.save_csv, limit=args.limit)
+    if args.load:
+        run_load(filepath=question_path, api_url=api_url, total=args.requests, concurrency=args.concurrency,
+                 rps=args.rps, warmup=args.warmup, stream=args.stream, save_csv=args.save_csv,
+                 save_json=args.save_json, limit=args.limit, sessions=args.sessions)
+    else:
+        run(filepath=question_path, api_url=api_url, chroma_path=chroma_path, save_csv=args.save_csv, limit=args.limit, stream=args.stream)
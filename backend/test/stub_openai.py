@@ -0,0 +1,259 @@
+"""
+오프라인 벤치마크용 OpenAI API 스텁 서버
+
+/v1/chat/completions (스트리밍 포함)과 /v1/embeddings 를 흉내 낸다.
+- 프롬프트 종류(라우팅/분석/후속 분석/triage/QA)를 알아보고 항상 같은 답을 돌려준다.
+- 임베딩은 문자 n-gram 해시 벡터 (같은 텍스트 -> 같은 벡터, 비슷한 텍스트 -> 높은 유사도)
+- 응답 지연은 분포로 설정 (const / uniform / normal / lognormal), 시드 고정
+
+실행 예시 (backend/ 디렉토리에서):
+    python test/stub_openai.py --port 8100 --chat-latency lognormal:0.8:0.3 --embed-latency normal:0.05:0.01
+
+앱은 OPENAI_BASE_URL=http://127.0.0.1:8100/v1, OPENAI_API_KEY=stub 으로 실행한다.
+(test/bench_pipeline.py 가 이 과정을 자동으로 수행)
+"""
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+EMBEDDING_DIM = 1536
+HOUSING_KEYWORDS = (
+    "주거", "주택", "전세", "월세", "임대", "보증금", "이사", "자취", "집", "기숙사", "청약", "신혼", "안심",
+)
+OUT_OF_DOMAIN_KEYWORDS = ("세금", "부동산세", "시장 전망", "집값 전망", "중장년", "주식", "날씨")
+
+class LatencyModel:
+    """"lognormal:0.8:0.3" 형식의 지연 분포 (초 단위)
+
+    - const:a            항상 a
+    - uniform:a:b        a ~ b
+    - normal:mean:std    평균/표준편차 (0 미만은 0)
+    - lognormal:median:sigma  중앙값/로그 표준편차 (꼬리 지연 재현용)
+    """
+
+    def __init__(self, spec, rng):
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [float(p) for p in parts[1:]]
+        self.rng = rng
+        if self.kind not in ("const", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self):
+        if self.kind == "const":
+            return self.params[0]
+        if self.kind == "uniform":
+            return self.rng.uniform(self.params[0], self.params[1])
+        if self.kind == "normal":
+            return max(0.0, self.rng.gauss(self.params[0], self.params[1]))
+        return self.params[0] * math.exp(self.rng.gauss(0.0, self.params[1]))
+
+def hashed_embedding(text, dim=EMBEDDING_DIM):
+    """문자 2/3-gram을 해시해 만든 정규화 벡터 (결정적)"""
+    vector = [0.0] * dim
+    compact = re.sub(r"\s+", "", str(text).lower())
+    grams = [compact[i:i + n] for n in (2, 3) for i in range(max(len(compact) - n + 1, 0))] or [compact]
+    for gram in grams:
+        digest = hashlib.md5(gram.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+def _last_match(pattern, prompt):
+    matches = re.findall(pattern, prompt)
+    return matches[-1].strip() if matches else ""
+
+def _is_housing(text):
+    if any(word in text for word in OUT_OF_DOMAIN_KEYWORDS):
+        return False
+    return any(word in text for word in HOUSING_KEYWORDS)
+
+def _profile_fields(text):
+    age = re.search(r"(\d)0\s*대", text)
+    return {
+        "residence": "Seoul" if "서울" in text else "",
+        "age": f"{age.group(1)}0s" if age else "",
+        "gender": "Female" if "여성" in text or "여자" in text else "Male" if "남성" in text or "남자" in text else "",
+        "marital_status": "Married" if "결혼" in text or "기혼" in text else "Single" if "미혼" in text else "",
+    }
+
+def canned_completion(prompt, answer_chars):
+    """프롬프트 종류별로 정해진 응답 생성. (종류, 응답 문자열) 반환"""
+    if "주거 정책과 관련된 질문인지 판단" in prompt:
+        question = _last_match(r"Q:\s*(.+)", prompt)
+        return "routing", "yes" if _is_housing(question) else "no"
+    if "You rewrite follow-up messages" in prompt:
+        message = _last_match(r"New message:\s*(.+)", prompt)
+        previous = _last_match(r"Previous search query:\s*(.*)", prompt)
+        fields = _profile_fields(message)
+        return "followup", json.dumps({"optimized_search_query": f"{previous} {message}".strip(), **fields}, ensure_ascii=False)
+    if "front-desk triage" in prompt or "expert policy analyst" in prompt:
+        message = _last_match(r"User's Request:\s*(.+)", prompt)
+        fields = _profile_fields(message)
+        summary = " ".join(filter(None, [
+            "서울 거주" if fields["residence"] else "",
+            fields["age"].replace("0s", "0대"),
+            {"Married": "기혼", "Single": "미혼"}.get(fields["marital_status"], ""),
+            {"Female": "여성", "Male": "남성"}.get(fields["gender"], ""),
+        ])) or "정보 없음"
+        body = {
+            **fields,
+            "user_profile": summary,
+            "policy_area_of_interest": "Housing",
+            "specific_keywords": message.split()[:3],
+            "optimized_search_query": f"청년 {message} 정책",
+        }
+        if "front-desk triage" in prompt:
+            return "triage", json.dumps({"is_housing": _is_housing(message), **body}, ensure_ascii=False)
+        return "analysis", json.dumps(body, ensure_ascii=False)
+
+    policy = _last_match(r"정책명:\s*(.+)", prompt) or "청년 주거 지원 정책"
+    kind = "fallback" if "정확하게 대응되는 정책 문서를 찾지 못했지만" in prompt else "qa"
+    answer = f"안녕하세요! 문의하신 내용과 관련해 **{policy}**을(를) 안내드립니다. "
+    filler = "지원대상과 신청방법은 공고문을 꼭 확인해주세요. "
+    while len(answer) < answer_chars:
+        answer += filler
+    return kind, answer[:answer_chars]
+
+class StubState:
+    def __init__(self, chat_latency, embed_latency, token_interval, answer_chars, seed):
+        rng = random.Random(seed)
+        self.chat_latency = LatencyModel(chat_latency, rng)
+        self.embed_latency = LatencyModel(embed_latency, rng)
+        self.token_interval = token_interval
+        self.answer_chars = answer_chars
+        self.counts = {}
+        self.prompt_chars = 0
+        self.embedded_inputs = 0
+
+    def count(self, kind):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+
+def _usage(prompt, completion):
+    # 한국어는 대략 1.5자/토큰으로 근사
+    prompt_tokens = max(1, int(len(prompt) / 1.5))
+    completion_tokens = max(1, int(len(completion) / 1.5))
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+def create_app(state):
+    app = FastAPI(title="OpenAI stub")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        kind, content = canned_completion(prompt, state.answer_chars)
+        state.count(kind)
+        state.prompt_chars += len(prompt)
+        created = int(time.time())
+        completion_id = f"chatcmpl-stub-{hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12]}"
+        await asyncio.sleep(state.chat_latency.sample())
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": _usage(prompt, content),
+            })
+
+        async def stream():
+            # 첫 청크는 chat_latency 이후, 이후 청크는 token_interval 간격
+            for i in range(0, len(content), 4):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "gpt-4o"),
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + 4]}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if state.token_interval > 0:
+                    await asyncio.sleep(state.token_interval)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage_chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body.get("model", "gpt-4o"),
+                    "choices": [],
+                    "usage": _usage(prompt, content),
+                }
+                yield f"data: {json.dumps(usage_chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        state.count("embeddings")
+        state.embedded_inputs += len(inputs)
+        await asyncio.sleep(state.embed_latency.sample())
+        # 토큰 id 목록으로 들어온 경우(check_embedding_ctx_length)에도 결정적인 벡터 생성
+        data = [
+            {"object": "embedding", "index": i, "embedding": hashed_embedding(item if isinstance(item, str) else json.dumps(item))}
+            for i, item in enumerate(inputs)
+        ]
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        })
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": state.counts, "prompt_chars": state.prompt_chars, "embedded_inputs": state.embedded_inputs}
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        state.counts = {}
+        state.prompt_chars = 0
+        state.embedded_inputs = 0
+        return {"ok": True}
+
+    return app
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="오프라인 OpenAI API 스텁")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--chat-latency", default="lognormal:0.8:0.3", help="chat 응답(첫 토큰)까지 지연 분포 (초)")
+    parser.add_argument("--embed-latency", default="normal:0.05:0.01", help="embeddings 응답 지연 분포 (초)")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="스트리밍 청크 간격 (초)")
+    parser.add_argument("--answer-chars", type=int, default=600, help="QA 답변 길이 (글자)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    state = StubState(args.chat_latency, args.embed_latency, args.token_interval, args.answer_chars, args.seed)
+    uvicorn.run(create_app(state), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
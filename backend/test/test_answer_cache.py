@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.answer_cache import SemanticAnswerCache, history_fingerprint, normalize_profile
+
+class Message:
+    def __init__(self, type, content):
+        self.type = type
+        self.content = content
+
+def _cache(**kwargs):
+    kwargs.setdefault("similarity_threshold", 0.95)
+    kwargs.setdefault("ttl_sec", 3600)
+    kwargs.setdefault("max_entries", 10)
+    return SemanticAnswerCache(**kwargs)
+
+def test_hit_on_similar_embedding_in_same_bucket():
+    cache = _cache()
+    cache.put([1.0, 0.0], ["p1"], "대학생", "", "답변", [{"title": "t"}])
+    assert cache.get([0.99, 0.05], ["p1"], "대학생") == ("답변", [{"title": "t"}])
+
+def test_miss_on_dissimilar_embedding():
+    cache = _cache()
+    cache.put([1.0, 0.0], ["p1"], "", "", "답변", [])
+    assert cache.get([0.0, 1.0], ["p1"], "") is None
+
+def test_bucket_separates_docs_profile_and_history():
+    cache = _cache()
+    history = history_fingerprint([Message("human", "월세 지원?"), Message("ai", "네")])
+    cache.put([1.0, 0.0], ["p1"], "대학생", history, "답변", [])
+    assert cache.get([1.0, 0.0], ["p2"], "대학생", history) is None
+    assert cache.get([1.0, 0.0], ["p1"], "직장인", history) is None
+    assert cache.get([1.0, 0.0], ["p1"], "대학생") is None
+    assert cache.get([1.0, 0.0], ["p1"], " 대학생 ", history) is not None
+
+def test_history_fingerprint():
+    assert history_fingerprint([]) == ""
+    assert history_fingerprint(None) == ""
+    first = history_fingerprint([Message("human", "a")])
+    assert first == history_fingerprint([Message("human", "a")])
+    assert first != history_fingerprint([Message("human", "b")])
+
+def test_embedding_free_entries_match_on_doc_ids_only():
+    cache = _cache()
+    cache.put(None, ["p1"], "", "", "정책명 답변", [])
+    assert cache.get(None, ["p1"], "") == ("정책명 답변", [])
+    # 임베딩으로 조회한 질의는 임베딩 없는 항목과 섞이지 않음
+    assert cache.get([1.0, 0.0], ["p1"], "") is None
+
+def test_expired_entries_are_removed():
+    cache = _cache(ttl_sec=-1)
+    cache.put([1.0, 0.0], ["p1"], "", "", "답변", [])
+    assert cache.get([1.0, 0.0], ["p1"], "") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_lru_eviction():
+    cache = _cache(max_entries=2)
+    for i in range(3):
+        cache.put([1.0, 0.0], [f"p{i}"], "", "", f"답변{i}", [])
+    assert cache.get([1.0, 0.0], ["p0"], "") is None
+    assert cache.get([1.0, 0.0], ["p2"], "") is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_corpus_version_change_invalidates():
+    cache = _cache()
+    cache.set_corpus_version("v1")
+    cache.put([1.0, 0.0], ["p1"], "", "", "답변", [])
+    cache.set_corpus_version("v1")
+    assert cache.get([1.0, 0.0], ["p1"], "") is not None
+    cache.set_corpus_version("v2")
+    assert cache.get([1.0, 0.0], ["p1"], "") is None
+
+def test_normalize_profile():
+    assert normalize_profile("정보 없음") == ""
+    assert normalize_profile("  서울   20대 ") == "서울 20대"
@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+from app.context_selector import dedupe_by_policy, find_cutoff, select_context
+
+def _doc(policy_id):
+    return SimpleNamespace(metadata={"id": policy_id}, page_content=policy_id)
+
+def test_find_cutoff_stops_at_large_gap():
+    # 0.91 -> 0.80 하락이 평균 하락보다 훨씬 큼
+    assert find_cutoff([0.92, 0.91, 0.80, 0.79, 0.78], max_docs=3) == 2
+
+def test_find_cutoff_keeps_max_docs_without_gap():
+    assert find_cutoff([0.90, 0.88, 0.86, 0.84, 0.82], max_docs=3) == 3
+
+def test_find_cutoff_without_scores_or_few_candidates():
+    assert find_cutoff([0.9, None, 0.8], max_docs=3) == 3
+    assert find_cutoff([0.9, 0.1], max_docs=3) == 2
+    assert find_cutoff([], max_docs=3) == 0
+
+def test_find_cutoff_respects_min_docs():
+    assert find_cutoff([0.95, 0.60, 0.59, 0.58], max_docs=3, min_docs=2) == 3
+
+def test_dedupe_by_policy_keeps_first_chunk():
+    a1, a2, b = _doc("a"), _doc("a"), _doc("b")
+    assert dedupe_by_policy([(a1, 0.9), (b, 0.8), (a2, 0.7)]) == [(a1, 0.9), (b, 0.8)]
+
+def test_select_context_sorts_by_score_and_splits_remaining():
+    docs = {name: _doc(name) for name in "abcde"}
+    scored = [(docs["c"], 0.70), (docs["a"], 0.93), (docs["b"], 0.92), (docs["d"], 0.69), (docs["e"], 0.68)]
+    selected, remaining = select_context(scored, max_docs=3, max_remaining=2)
+    assert selected == [docs["a"], docs["b"]]
+    assert remaining == [docs["c"], docs["d"]]
+
+def test_select_context_keeps_retriever_order_on_ties():
+    first, second = _doc("x"), _doc("y")
+    selected, _ = select_context([(first, 0.8), (second, 0.8)], max_docs=2)
+    assert selected == [first, second]
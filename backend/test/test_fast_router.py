@@ -0,0 +1,63 @@
+import pytest
+
+from app.fast_router import (
+    EXTRA_EXAMPLES, FastRouter, POSITIVE_LEXICON, lexicon_term_in, parse_prompt_examples,
+)
+
+PROMPT = """
+Q: 청년 월세 지원 받을 수 있나요? → yes
+Q: 전세 보증금 대출 문의 → yes
+Q: 주식 추천해줘 → no
+"""
+
+@pytest.fixture(scope="module")
+def router():
+    return FastRouter.from_routing_prompt(PROMPT)
+
+def _term_in(term, text):
+    return lexicon_term_in(term, text, text.split())
+
+def test_parse_prompt_examples():
+    assert parse_prompt_examples(PROMPT) == [
+        ("청년 월세 지원 받을 수 있나요?", True),
+        ("전세 보증금 대출 문의", True),
+        ("주식 추천해줘", False),
+    ]
+
+@pytest.mark.parametrize("text", ["전세를 구해요", "이사해요", "월세지원 신청", "전세"])
+def test_lexicon_matches_on_word_boundary(text):
+    assert any(_term_in(term, text) for term in POSITIVE_LEXICON)
+
+@pytest.mark.parametrize("term, text", [("전세", "전세계 여행"), ("이사", "이사회 회의록"), ("이사", "이사장 선거")])
+def test_lexicon_ignores_term_inside_other_words(term, text):
+    assert not _term_in(term, text)
+
+def test_multi_word_terms_match_as_phrase():
+    assert lexicon_term_in("시장 전망", "부동산 시장 전망", ["부동산", "시장", "전망"])
+
+@pytest.mark.parametrize("text", ["전세계 여행 추천해줘", "이사회 안건 정리해줘", "이사장 인사말 써줘"])
+def test_substring_lookalikes_are_never_fast_yes(router, text):
+    assert router.classify(text) is not True
+
+def test_clear_housing_question_is_fast_yes(router):
+    assert router.classify("월세 지원 받고 싶어요") is True
+
+def test_clear_out_of_scope_question_is_fast_no(router):
+    assert router.classify("양도소득세 계산 방법 알려줘") is False
+
+def test_lexicon_alone_does_not_decide():
+    # 키워드 점수로 임계값을 넘더라도 n-gram 모델 단독 판단이 반대면 LLM에 맡김
+    router = FastRouter(parse_prompt_examples(PROMPT), yes_threshold=0.5, no_threshold=0.01, epochs=1)
+    router._logit = lambda features: -0.1
+    probability, model_probability, positive, negative = router.score("전세 알려줘")
+    assert probability >= 0.5 and model_probability < 0.5 and positive > 0
+    assert router.classify("전세 알려줘") is None
+
+def test_training_set_contains_hard_negatives():
+    negatives = {text for text, label in EXTRA_EXAMPLES if not label}
+    assert {"전세계 여행 추천해줘", "이사회 회의록 작성법 알려줘"} <= negatives
+
+def test_stats_count_decisions(router):
+    before = router.stats()["total"]
+    router.classify("오늘 날씨 어때요")
+    assert router.stats()["total"] == before + 1
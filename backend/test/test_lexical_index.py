@@ -0,0 +1,95 @@
+import pytest
+
+pytest.importorskip("numpy")
+documents = pytest.importorskip("langchain_core.documents")
+
+from app.lexical_index import (
+    CharNgramBM25Index, HybridRetriever, char_ngrams, reciprocal_rank_fusion,
+)
+
+Document = documents.Document
+
+POLICIES = [
+    ("p1", "청년안심주택", "역세권 청년안심주택 입주 지원. 시세보다 저렴한 임대료로 입주"),
+    ("p2", "청년월세지원", "청년 월세 월 20만원 지원. 무주택 청년 대상 월세 보조"),
+    ("p3", "청년전세자금대출", "전세자금 대출 이자 지원. 전세 보증금 대출 이자 일부를 지원"),
+    ("p4", "신혼부부임차보증금", "신혼부부 임차보증금 대출 이자 지원"),
+]
+
+def _docs():
+    return [
+        Document(page_content=f"정책명: {name}\n설명: {description}", metadata={"id": pid})
+        for pid, name, description in POLICIES
+    ]
+
+class FakeVectorRetriever:
+    """미리 정한 (문서 id, 유사도) 결과를 돌려주는 벡터 리트리버"""
+
+    score_threshold = 0.75
+
+    def __init__(self, docs, results):
+        self.by_id = {doc.metadata["id"]: doc for doc in docs}
+        self.results = results
+        self.calls = 0
+
+    def search_with_scores(self, query):
+        self.calls += 1
+        return [(self.by_id[pid], score) for pid, score in self.results]
+
+def _ids(scored):
+    return [doc.metadata["id"] for doc, _ in scored]
+
+def test_char_ngrams_within_tokens():
+    assert char_ngrams("청년 집") == ["청년", "집"]
+    assert "년안심" in char_ngrams("청년안심주택이")
+
+def test_bm25_ranks_matching_document_first():
+    index = CharNgramBM25Index(_docs())
+    results = index.search("전세자금 대출 이자", k=3)
+    assert _ids(results)[0] == "p3"
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+def test_bm25_min_score_drops_weak_matches():
+    index = CharNgramBM25Index(_docs())
+    assert index.search("전세자금", k=3, min_score=1e6) == []
+    assert index.search("없는단어", k=3) == []
+
+def test_exact_name_matches_ignore_spacing():
+    index = CharNgramBM25Index(_docs())
+    assert [doc.metadata["id"] for doc in index.exact_name_matches("청년 안심주택이 뭐예요?")] == ["p1"]
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = _docs()[:3]
+    fused = reciprocal_rank_fusion([[a, b], [b, c]], rrf_k=60)
+    assert _ids(fused) == ["p2", "p1", "p3"]
+
+def _hybrid(docs, vector_results, **kwargs):
+    vector = FakeVectorRetriever(docs, vector_results)
+    return HybridRetriever(
+        vector_retriever=vector, lexical_index=CharNgramBM25Index(docs), lexical_min_score=0.5, **kwargs
+    ), vector
+
+def test_hybrid_fills_with_lexical_hits_when_vector_search_is_empty():
+    retriever, _ = _hybrid(_docs(), [], lexical_shortcut=False)
+    results = retriever.search_with_scores("전세자금 대출")
+    assert _ids(results)[0] == "p3"
+
+def test_hybrid_returns_empty_only_when_both_are_empty():
+    retriever, _ = _hybrid(_docs(), [], lexical_shortcut=False)
+    assert retriever.search_with_scores("오늘 날씨") == []
+
+def test_hybrid_strong_lexical_hit_is_not_pinned_below_vector_hits():
+    # 벡터 검색은 p1/p2만 찾았지만 질의는 p3 용어와 정확히 겹침
+    retriever, _ = _hybrid(_docs(), [("p1", 0.82), ("p2", 0.80)], lexical_shortcut=False)
+    scores = dict((doc.metadata["id"], score) for doc, score in retriever.search_with_scores("전세자금 대출 이자"))
+    assert scores["p3"] > scores["p2"]
+    assert scores["p3"] == pytest.approx(0.82)
+
+def test_hybrid_shortcut_skips_vector_search():
+    retriever, vector = _hybrid(_docs(), [("p2", 0.9)])
+    assert retriever.is_lexical_shortcut("청년안심주택 신청 방법")
+    results = retriever.search_with_scores("청년안심주택 신청 방법")
+    assert vector.calls == 0
+    assert _ids(results)[0] == "p1"
+    assert results[0][1] == 1.0
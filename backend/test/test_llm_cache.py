@@ -0,0 +1,73 @@
+import itertools
+
+import pytest
+
+from app import llm_cache as llm_cache_module
+from app.llm_cache import PersistentLLMCache, normalize_text, prompt_version
+
+@pytest.fixture
+def clock(monkeypatch):
+    # last_used 순서가 같은 시각으로 겹치지 않도록 호출마다 1초씩 증가
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: float(next(ticks)))
+
+def _cache(tmp_path, **kwargs):
+    kwargs.setdefault("touch_interval", 1e9)
+    return PersistentLLMCache(path=str(tmp_path / "llm_cache.sqlite3"), **kwargs)
+
+def test_normalize_text_collapses_spacing_and_trailing_punct():
+    assert normalize_text("청년안심주택이  무엇인가요?") == normalize_text("청년안심주택이 무엇인가요")
+    assert normalize_text("ＡＢＣ!!") == "abc"
+
+def test_make_key_depends_on_namespace_and_version():
+    key = PersistentLLMCache.make_key("route", "v1", "전세 대출?")
+    assert key == PersistentLLMCache.make_key("route", "v1", "전세 대출")
+    assert key != PersistentLLMCache.make_key("analysis", "v1", "전세 대출")
+    assert key != PersistentLLMCache.make_key("route", "v2", "전세 대출")
+    assert prompt_version("template", "m1") != prompt_version("template", "m2")
+
+def test_put_get_and_persist_across_instances(tmp_path):
+    cache = _cache(tmp_path)
+    assert cache.get("route", "v1", "질문") is None
+    cache.put("route", "v1", "질문", "yes")
+    assert cache.get("route", "v1", "질문?") == "yes"
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    reopened = _cache(tmp_path)
+    assert reopened.contains("route", "v1", "질문")
+    assert reopened.stats()["entries"] == 1
+
+def test_eviction_drops_least_recently_used(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=10, touch_batch=1000)
+    for i in range(10):
+        cache.put("route", "v1", f"q{i}", str(i))
+    # 가장 오래된 q0은 적중만 해 두고 last_used는 아직 보류 상태
+    assert cache.get("route", "v1", "q0") == "0"
+    assert cache.stats()["pending_touches"] == 1
+    cache.put("route", "v1", "q10", "10")
+    # 11 > 10 이므로 90%인 9개까지 줄임: 2건 제거 (q1, q2)
+    assert cache.stats()["evictions"] == 2
+    assert cache.stats()["entries"] == 9
+    assert cache.stats()["pending_touches"] == 0
+    assert cache.contains("route", "v1", "q0")
+    assert not cache.contains("route", "v1", "q1")
+    assert not cache.contains("route", "v1", "q2")
+    assert cache.contains("route", "v1", "q10")
+
+def test_touches_are_written_in_batches(tmp_path, clock):
+    cache = _cache(tmp_path, touch_batch=2)
+    cache.put("route", "v1", "a", "1")
+    cache.put("route", "v1", "b", "2")
+    cache.get("route", "v1", "a")
+    assert cache.stats()["pending_touches"] == 1
+    cache.get("route", "v1", "b")
+    assert cache.stats()["pending_touches"] == 0
+
+def test_flush_writes_pending_touches(tmp_path, clock):
+    cache = _cache(tmp_path, touch_batch=100)
+    cache.put("route", "v1", "a", "1")
+    cache.get("route", "v1", "a")
+    cache.flush()
+    assert cache.stats()["pending_touches"] == 0
+    conn = cache._connect()
+    created_at, last_used = conn.execute("SELECT created_at, last_used FROM llm_cache").fetchone()
+    assert last_used > created_at
@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import policy_fields, prompt_budget
+from app.prompt_budget import build_prompt, estimate_tokens, render_history, render_trimmed_context
+
+TEMPLATE = "지시문\n대화:\n{chat_history}\n문서:\n{context}\n질문: {question}"
+
+@pytest.fixture(autouse=True)
+def heuristic_tokens(monkeypatch):
+    # tiktoken 인코딩 파일을 내려받지 않도록 문자 수 기반 근사만 사용
+    monkeypatch.setattr(prompt_budget, "_encoding", None)
+    monkeypatch.setattr(prompt_budget, "_encoding_loaded", True)
+    monkeypatch.setattr(prompt_budget, "PROMPT_BUDGET_ENABLED", True)
+    monkeypatch.setitem(policy_fields.policy_names, "p1", "청년월세지원")
+
+def _message(type, content):
+    return SimpleNamespace(type=type, content=content)
+
+def _doc(policy_id, description):
+    return SimpleNamespace(
+        metadata={"id": policy_id},
+        page_content=f"정책명: 정책{policy_id}\n설명: {description}\n문의: 120",
+    )
+
+def _history(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(_message("human", f"질문{i}"))
+        messages.append(_message("ai", f"<a href='x'>**청년월세지원**</a> 안내 {'가' * 500}"))
+    return messages
+
+def test_estimate_tokens():
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens("청년") == 2
+
+def test_render_history_compacts_older_turns():
+    text = render_history(_history(3), recent_turns=1, answer_chars=20)
+    lines = text.split("\n")
+    assert lines[0] == "이전 질문: 질문0 / 질문1"
+    assert lines[1] == "이미 안내한 정책: 청년월세지원"
+    assert lines[2] == "사용자: 질문2"
+    assert lines[3].startswith("AI: 청년월세지원 안내") and len(lines[3]) <= len("AI: ") + 20
+    assert "<a" not in text and "**" not in text
+
+def test_render_history_empty():
+    assert render_history([]) == "없음"
+
+def test_render_trimmed_context_dedupes_and_truncates():
+    docs = [_doc("1", "가" * 50), _doc("1", "중복"), _doc("2", "짧음")]
+    text = render_trimmed_context(docs, field_chars=10)
+    assert text.count("정책명: 정책1") == 1
+    assert "설명: " + "가" * 9 + "…" in text
+    assert "정책명: 정책2" in text
+
+def test_under_budget_prompt_is_unchanged(monkeypatch):
+    monkeypatch.setitem(prompt_budget.PROMPT_BUDGETS, "qa", 100000)
+    history = _history(2)
+    docs = [_doc("1", "설명")]
+    prompt, report = build_prompt(TEMPLATE, "qa", history, docs=docs, question="월세?")
+    assert prompt == TEMPLATE.format(
+        chat_history=history, context=policy_fields.render_context(docs), question="월세?"
+    )
+    assert report["saved_tokens"] == 0
+    assert report["tokens"] == report["baseline_tokens"]
+    assert not report["over_budget"]
+
+def test_over_budget_prompt_is_compacted(monkeypatch):
+    monkeypatch.setitem(prompt_budget.PROMPT_BUDGETS, "qa", 800)
+    docs = [_doc(str(i), "나" * 300) for i in range(3)]
+    prompt, report = build_prompt(TEMPLATE, "qa", _history(4), docs=docs, question="월세?")
+    assert report["baseline_tokens"] > 800
+    assert report["saved_tokens"] > 0
+    assert report["tokens"] <= 800 and not report["over_budget"]
+    assert "질문: 월세?" in prompt and "정책명: 정책0" in prompt
+
+def test_unknown_stage_has_no_budget():
+    prompt, report = build_prompt("{chat_history}", "other", [])
+    assert report["budget"] is None and report["saved_tokens"] == 0
+    assert prompt == "[]"
@@ -0,0 +1,115 @@
+import pytest
+
+pytest.importorskip("langchain.memory")
+
+from app.session_store import InMemorySessionStore, SQLiteSessionStore
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.sqlite3")
+
+@pytest.fixture
+def stores(db_path):
+    # 같은 DB 파일을 공유하는 두 워커
+    opened = [SQLiteSessionStore(path=db_path, version_check_interval=0) for _ in range(2)]
+    yield opened
+    for store in opened:
+        store.close()
+
+def _texts(store, session_id):
+    return [message.content for message in store.get_memory(session_id).chat_memory.messages]
+
+def test_memory_store_trims_history_and_evicts_lru():
+    store = InMemorySessionStore(max_sessions=2, history_turns=1)
+    memory = store.get_memory("a")
+    for i in range(3):
+        memory.chat_memory.add_user_message(f"q{i}")
+    assert [m.content for m in store.get_memory("a").chat_memory.messages] == ["q1", "q2"]
+    store.get_memory("b")
+    store.get_memory("c")
+    assert "a" not in store and store.stats()["evictions"] == 1
+
+def test_get_profile_does_not_create_session():
+    store = InMemorySessionStore()
+    assert store.get_profile("missing") == {}
+    assert "missing" not in store
+
+def test_flush_writes_version_back(stores):
+    a, _ = stores
+    a.get_memory("s").chat_memory.add_user_message("안녕")
+    a.update_profile("s", age="25")
+    assert a.flush() == 1
+    assert a._sessions["s"].version == 1
+    a.get_memory("s").chat_memory.add_ai_message("반가워요")
+    a.flush()
+    assert a._sessions["s"].version == 2
+    assert a._db_version("s") == 2
+    assert a.stats()["write_conflicts"] == 0
+
+def test_other_worker_sees_new_version(stores):
+    a, b = stores
+    a.get_memory("s").chat_memory.add_user_message("q1")
+    a.flush()
+    assert _texts(b, "s") == ["q1"]
+    a.get_memory("s").chat_memory.add_ai_message("a1")
+    a.flush()
+    # version_check_interval=0 이므로 다음 접근에서 바로 다시 읽음
+    assert _texts(b, "s") == ["q1", "a1"]
+
+def test_concurrent_flushes_merge_instead_of_losing_updates(stores):
+    a, b = stores
+    a.get_memory("s").chat_memory.add_user_message("q1")
+    a.flush()
+    # 두 워커가 같은 version(1)을 읽은 뒤 각자 변경
+    a.get_memory("s").chat_memory.add_ai_message("from-a")
+    a.update_profile("s", region="서울")
+    b.get_memory("s").chat_memory.add_ai_message("from-b")
+    b.update_profile("s", age="25")
+    a.flush()
+    b.flush()
+    assert b.stats()["write_conflicts"] == 1
+    assert b._sessions["s"].version == 3
+    assert _texts(b, "s") == ["q1", "from-a", "from-b"]
+    assert b.get_profile("s") == {"region": "서울", "age": "25"}
+    assert _texts(a, "s") == ["q1", "from-a", "from-b"]
+    assert a.get_profile("s") == {"region": "서울", "age": "25"}
+
+def test_cleared_history_overrides_db_messages(stores):
+    a, b = stores
+    a.get_memory("s").chat_memory.add_user_message("q1")
+    a.flush()
+    b.get_memory("s")
+    a.get_memory("s").chat_memory.add_ai_message("a1")
+    a.flush()
+    b.get_memory("s").clear()
+    b._sessions["s"].version = 1  # 오래된 version으로 기록하도록 고정
+    b.flush()
+    assert _texts(a, "s") == []
+
+def test_session_recreated_after_db_row_removed(stores):
+    a, _ = stores
+    a.get_memory("s").chat_memory.add_user_message("q1")
+    a.flush()
+    with a._db_lock:
+        a._conn.execute("DELETE FROM sessions")
+    a.get_memory("s").chat_memory.add_ai_message("a1")
+    assert a.flush() == 1
+    assert a._db_version("s") == 2
+    assert a.stats()["write_conflicts"] == 0
+
+def test_version_check_is_throttled(db_path):
+    a = SQLiteSessionStore(path=db_path, version_check_interval=3600)
+    b = SQLiteSessionStore(path=db_path, version_check_interval=3600)
+    try:
+        a.get_memory("s").chat_memory.add_user_message("q1")
+        a.flush()
+        assert _texts(b, "s") == ["q1"]
+        a.get_memory("s").chat_memory.add_ai_message("a1")
+        a.flush()
+        # 확인 간격 안에서는 캐시를 그대로 사용
+        assert _texts(b, "s") == ["q1"]
+        b._sessions["s"].checked_at = 0
+        assert _texts(b, "s") == ["q1", "a1"]
+    finally:
+        a.close()
+        b.close()
@@ -5,6 +5,7 @@ const sendBtn = document.getElementById('send-btn');
 const chatWelcome = document.getElementById('chat-welcome');
 const policyList = document.getElementById('policy-list');
 const policySidebar = document.getElementById('policy-sidebar');
+const API_BASE_URL = 'https://youth-chatbot-backend.onrender.com';
  
  
  
@@ -59,6 +60,9 @@ function addMessage(text, sender = 'user') {
             behavior: 'smooth'
         });
     }, 100);
+ 
+    // 스트리밍 중 내용을 갱신할 수 있도록 말풍선 반환
+    return bubble;
 }
  
 // 마크다운을 HTML로 변환하는 함수
@@ -134,6 +138,30 @@ function displayRemainingPolicies(policies) {
     policySidebar.classList.add('show');
 }
  
+// SSE 응답 본문을 읽어 이벤트({event, data}) 단위로 콜백 호출
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder('utf-8');
+    let buffer = '';
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+ 
 async function sendMessage(message) {
     addMessage(message, 'user');
     userInput.value = '';
@@ -141,8 +169,25 @@ async function sendMessage(message) {
     removeWelcome();
     addLoading();
    
+    let bubble = null;
+    let answer = '';
+    let renderPending = false;
+    let finished = false;
+    const STREAM_BROKEN_NOTICE = '[오류] 답변을 받는 중 연결이 끊겼습니다. 다시 시도해주세요.';
+ 
+    // 토큰이 올 때마다 다시 그리지 않고 프레임당 한 번만 렌더링
+    function renderAnswer() {
+        if (renderPending) return;
+        renderPending = true;
+        requestAnimationFrame(() => {
+            renderPending = false;
+            bubble.innerHTML = parseMarkdown(answer);
+            chatContainer.scrollTop = chatContainer.scrollHeight;
+        });
+    }
+ 
     try {
-        const response = await fetch('https://youth-chatbot-backend.onrender.com/chat', {
+        const response = await fetch(API_BASE_URL + '/chat/stream', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -150,23 +195,72 @@ async function sendMessage(message) {
                 user_message: message
             })
         });
-        const data = await response.json();
-        removeLoading();
-       
-        // 응답이 answer 또는 response에 올 수 있으니 모두 처리
-        addMessage(data.answer || data.response || '[오류] 답변이 없습니다.', 'bot');
-       
-        // 백엔드에서 remaining_docs가 있으면 오른쪽 사이드바에 표시
-        if (data.remaining_docs && data.remaining_docs.length > 0) {
-            displayRemainingPolicies(data.remaining_docs);
-        } else {
-            // remaining_docs가 없으면 사이드바를 숨김
-            policySidebar.classList.remove('show');
+        if (response.status === 503) {
+            // 서버가 막 시작되어 초기화 중 (백엔드가 안내 문구와 Retry-After를 보냄)
+            const data = await response.json().catch(() => ({}));
+            const retryAfter = response.headers.get('Retry-After');
+            removeLoading();
+            addMessage(
+                (data.response || '[안내] 서버가 시작되고 있습니다. 잠시 후 다시 시도해주세요.') +
+                (retryAfter ? ` (약 ${retryAfter}초 후)` : ''),
+                'bot'
+            );
+            return;
+        }
+        if (!response.ok || !response.body) {
+            throw new Error('stream unavailable');
+        }
+ 
+        await readEventStream(response, (event, data) => {
+            if (event === 'token') {
+                // 첫 토큰이 도착하면 로딩 표시를 말풍선으로 교체
+                if (!bubble) {
+                    removeLoading();
+                    bubble = addMessage('', 'bot');
+                }
+                answer += data.text;
+                renderAnswer();
+            } else if (event === 'done') {
+                finished = true;
+                if (data.ttft_sec !== undefined) {
+                    console.log(`[chat] 첫 토큰까지 ${data.ttft_sec}s`);
+                }
+                // 백엔드에서 remaining_docs가 있으면 오른쪽 사이드바에 표시
+                if (data.remaining_docs && data.remaining_docs.length > 0) {
+                    displayRemainingPolicies(data.remaining_docs);
+                } else {
+                    // remaining_docs가 없으면 사이드바를 숨김
+                    policySidebar.classList.remove('show');
+                }
+            } else if (event === 'error') {
+                // 서버가 보낸 오류 안내가 마지막 이벤트 (done 없음)
+                finished = true;
+                answer += (answer ? '\n\n' : '') + data.message;
+                if (!bubble) {
+                    removeLoading();
+                    bubble = addMessage('', 'bot');
+                }
+                renderAnswer();
+            }
+        });
+ 
+        if (!bubble) {
+            removeLoading();
+            addMessage('[오류] 답변이 없습니다.', 'bot');
+        } else if (!finished) {
+            // done 이벤트 없이 스트림이 끝남: 부분 답변 뒤에 안내를 붙임
+            answer += '\n\n' + STREAM_BROKEN_NOTICE;
+            renderAnswer();
         }
        
     } catch (err) {
         removeLoading();
-        addMessage('[오류] 서버와 통신할 수 없습니다.', 'bot');
+        if (!bubble) {
+            addMessage('[오류] 서버와 통신할 수 없습니다.', 'bot');
+        } else {
+            answer += (answer ? '\n\n' : '') + STREAM_BROKEN_NOTICE;
+            renderAnswer();
+        }
     } finally {
         sendBtn.disabled = false;
         userInput.focus();